@@ -1,108 +1,306 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import seaborn as sns
 import matplotlib.pyplot as plt
 from matplotlib.ticker import MaxNLocator
 import sqlite3
-from werkzeug.security import generate_password_hash, check_password_hash
 import psycopg2
 import mysql.connector
 from pymongo import MongoClient
 from datetime import datetime
+import time
+import uuid
+import json
+import base64
+from urllib.parse import quote, unquote
+import streamlit.components.v1 as components
 import plotly.express as px
+from data_loader import load_csv, cache_stats, date_bounds, fingerprint_frame, prepare_dataframe
+from periods import PERIOD_CODES, period_label_for
+from rollup import REGION_LEVELS, CubePushdown
+from streaming import load_csv_streaming
+from column_store import dataset_store
+from encoding import encode_columns
+from compute_graph import build_dashboard_graph
+from engine import AnalyticsEngine, DashboardQuery, previous_range
+from result_cache import shared_cache
+from warmup import warmer
+import charts
+from sql_pushdown import SqlPushdown
+from db_pool import PoolClosedError, pool_manager
+from mongo_backend import MongoPushdown, load_collection
+from query_runner import query_runner
+from incremental import incremental_datasets
+from instrumentation import METRICS_PORT, RerunRecorder, is_admin, metrics
+from auth_store import SESSION_SECRET, SESSION_TTL, get_user_store
 
 # Set Page Config with header and title
 st.set_page_config(page_title="Dashboard Penjualan", page_icon="📊", layout="wide")
 
-# Connect to SQLite as SQL editor choice
-def create_connection(db_file):
-    try:
-        conn = sqlite3.connect(db_file)
-        return conn
-    except sqlite3.Error as e:
-        st.error(f"Gagal membuat koneksi ke SQLite: {e}")
-        return None
-
-# Create User Table for authentication
-def create_user_table(conn):
-    create_table_sql = """
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT NOT NULL UNIQUE,
-        password TEXT NOT NULL,
-        nomor_hp INTEGER NOT NULL UNIQUE,
-        created_at TEXT DEFAULT CURRENT_TIMESTAMP
-    );
-    """
-    try:
-        c = conn.cursor()
-        c.execute(create_table_sql)
-    except sqlite3.Error as e:
-        st.error(f"Gagal membuat tabel pengguna: {e}")
-
-# Adding new USER
-def add_user(conn, username, password, email):
-    hashed_password = generate_password_hash(password)
-    sql = ''' INSERT INTO users(username, password, email)
-              VALUES(?, ?, ?) '''
-    cur = conn.cursor()
-    cur.execute(sql, (username, hashed_password, email))
-    conn.commit()
-    return cur.lastrowid
-
-# Checking USER Credentials
-def verify_user(conn, username, password):
-    sql = "SELECT password FROM users WHERE username = ?"
-    cur = conn.cursor()
-    cur.execute(sql, (username,))
-    result = cur.fetchone()
-    if result and check_password_hash(result[0], password):
-        return True
-    return False
-
-# Database setup
-DATABASE = "users.db"
-conn = create_connection(DATABASE)
-create_user_table(conn)
-
-# Connect to POSTGRESQL
+# Connect to POSTGRESQL (returns a connection pool shared by all sessions)
 def connect_postgresql(host, dbname, user, password):
+    key = pool_manager.make_key("postgresql", host, dbname, user, password)
+    pool = None
     try:
-        conn = psycopg2.connect(
+        pool = pool_manager.get_pool(key, lambda: psycopg2.connect(
             host=host,
             database=dbname,
             user=user,
             password=password
-        )
-        return conn
+        ))
+        # Verify the credentials once; the connection goes back to the pool for reuse
+        with pool.connection():
+            pass
+        return pool
     except Exception as e:
+        # Pool yang sudah dipakai sesi lain tetap dibuka; hanya pool baru yang gagal dibuang
+        if pool is not None:
+            pool_manager.discard_unused(key, pool)
         st.error(f"Gagal terhubung ke PostgreSQL: {e}")
         return None
 
-# Connect to MySQL
+# Connect to MySQL (returns a connection pool shared by all sessions)
 def connect_mysql(host, dbname, user, password):
+    key = pool_manager.make_key("mysql", host, dbname, user, password)
+    pool = None
     try:
-        conn = mysql.connector.connect(
+        pool = pool_manager.get_pool(key, lambda: mysql.connector.connect(
             host=host,
             database=dbname,
             user=user,
             password=password
-        )
-        return conn
+        ))
+        with pool.connection():
+            pass
+        return pool
     except Exception as e:
+        # Pool yang sudah dipakai sesi lain tetap dibuka; hanya pool baru yang gagal dibuang
+        if pool is not None:
+            pool_manager.discard_unused(key, pool)
         st.error(f"Gagal terhubung ke MySQL: {e}")
         return None
 
-# Connect to MongoDB
+# Connect to MongoDB (MongoClient pools internally, so one client per URI is shared)
 def connect_mongodb(uri, dbname):
     try:
-        client = MongoClient(uri)
+        client = pool_manager.get_shared(("mongodb", uri), lambda: MongoClient(uri))
         db = client[dbname]
         return db
     except Exception as e:
         st.error(f"Gagal terhubung ke MongoDB: {e}")
         return None
     
+# Dashboard for PostgreSQL/MySQL: every aggregate is computed by the database server.
+# One pooled connection is borrowed for the whole rerun and returned afterwards.
+def show_sql_dashboard(db_pool, pushdown):
+    try:
+        with db_pool.connection() as db_conn:
+            show_pushdown_dashboard(db_conn, pushdown)
+    except PoolClosedError:
+        st.error("Koneksi database sudah ditutup, silakan hubungkan ulang")
+
+# Follow a background query until it finishes, rendering the rows received so far.
+# Clicking the cancel button reruns the script, which interrupts this loop.
+QUERY_PREVIEW_ROWS = 1000
+
+def show_query_job(job):
+    status = st.empty()
+    preview = st.empty()
+    while True:
+        if job.running:
+            status.info(f"Query berjalan... {job.rows:,} baris diterima")
+        preview.dataframe(job.frame().head(QUERY_PREVIEW_ROWS), use_container_width=True)
+        if not job.running:
+            break
+        time.sleep(0.5)
+    if job.status == 'done':
+        status.success(f"Query selesai: {job.rows:,} baris")
+    elif job.status == 'cancelled':
+        status.warning(f"Query dibatalkan setelah {job.rows:,} baris")
+    else:
+        status.error(f"Query gagal: {job.error}")
+
+# Id of this browser session, for shared background work (warm-up, auto refresh)
+def session_id():
+    return st.session_state.setdefault("session_id", uuid.uuid4().hex)
+
+
+# Withdraw this session's auto-refresh request from the incremental dataset it showed last
+def release_incremental_dataset(keep=None):
+    previous = st.session_state.get("incremental_dataset")
+    if previous is not None and previous is not keep:
+        previous.request_interval(session_id(), 0)
+        del st.session_state["incremental_dataset"]
+
+# Kolom yang dibutuhkan rencana warm-up (pendapatan dari total_penghasilan atau jumlah * harga)
+WARMUP_COLUMNS = ['tgl_transaksi'] + REGION_LEVELS + ['nama_barang', 'jumlah']
+
+# Setelah data dimuat, tampilan drill-down yang umum dihitung di background (df None:
+# tidak ada dataset). Sesi yang membuka dataset lain melepas warm-up sebelumnya; warm-up
+# dibatalkan setelah tidak ada sesi lain yang masih memakainya. Mode perkiraan memakai
+# rencana warm-up dari sketch, tanpa membangun cube persis
+def warm_up(df):
+    # Hasil query SQL bebas belum tentu punya kolom dashboard
+    if df is not None and not set(WARMUP_COLUMNS).issubset(df.columns):
+        df = None
+    approximate = st.session_state.get("approximate_mode", False)
+    warmup_job = warmer.start(df, shared_cache, session_id(), approximate) if df is not None else None
+    warmup_key = warmup_job.key if warmup_job is not None else None
+    previous_key = st.session_state.get("warmup_key")
+    if previous_key is not None and previous_key != warmup_key:
+        warmer.release(previous_key, session_id())
+    st.session_state["warmup_key"] = warmup_key
+    if warmup_job is not None and not warmup_job.finished:
+        st.sidebar.progress(warmup_job.progress(), text=f"Menyiapkan tampilan drill-down ({warmup_job.done}/{warmup_job.total})")
+
+# Load/refresh controls for a table kept up to date incrementally, then its dashboard
+def show_incremental_dataset(dataset):
+    col_refresh, col_interval = st.columns(2)
+    with col_interval:
+        interval = st.number_input("Refresh otomatis (menit, 0 = mati)", min_value=0, value=0, step=1, key="incremental_interval")
+    with col_refresh:
+        refresh = st.button("Muat Tabel" if dataset.df is None else "Refresh Sekarang", key="incremental_refresh")
+    if refresh:
+        try:
+            with recorder.stage("incremental_refresh") as span:
+                dataset.refresh()
+                span['rows'] = dataset.last_delta_rows
+        except Exception as e:
+            st.error(f"Gagal memuat tabel: {e}")
+    # Dataset dipakai bersama oleh semua sesi; refresh otomatis mengikuti interval terpanjang
+    # yang diminta, jadi sesi yang mematikannya tidak menghentikan jadwal sesi lain
+    release_incremental_dataset(keep=dataset)
+    st.session_state["incremental_dataset"] = dataset
+    dataset.request_interval(session_id(), interval * 60 if dataset.df is not None else 0)
+    if dataset.error is not None:
+        st.warning(f"Refresh otomatis gagal: {dataset.error}")
+    if dataset.df is None:
+        return None
+    warm_up(dataset.df)
+    st.caption(
+        f"Versi {dataset.version}: {len(dataset.df):,} baris, {dataset.last_delta_rows:+,} baris pada refresh terakhir "
+        f"({dataset.refreshed_at:%d-%m-%Y %H:%M:%S}), watermark {dataset.watermark}"
+    )
+    show_dataset_dashboard(dataset.df)
+    return dataset.df
+
+
+# Call pushdown.fetch_<name> and record it as an instrumentation stage
+def fetch(pushdown, name, source, *args):
+    with recorder.stage(f"pushdown.{name}") as span:
+        result = getattr(pushdown, f"fetch_{name}")(source, *args)
+        if isinstance(result, (list, pd.DataFrame)):
+            span['rows'] = len(result)
+    return result
+
+# Figure dicts are shared across sessions under the aggregate's engine key. A frame without
+# a dataset fingerprint can't be told apart from another session's, so its figure is built uncached.
+def shared_figure(engine, name, metric, query, build):
+    if engine.df.attrs.get('dataset_key') is None:
+        return build()
+    return shared_cache.figure((name,) + engine.key(metric, query), build)
+
+# Figure dicts keep numeric arrays as plotly typed arrays ({'dtype', 'bdata'})
+def trace_points(x):
+    if isinstance(x, dict):
+        return len(base64.b64decode(x['bdata'])) // np.dtype(x['dtype']).itemsize
+    return len(x)
+
+# Plotly serialization happens inside st.plotly_chart, so that is the timed stage.
+# fig is a plotly Figure or a cached figure dict from shared_figure.
+def plotly_chart(fig):
+    traces = fig['data'] if isinstance(fig, dict) else fig.data
+    with recorder.stage("plotly_chart", sum(trace_points(trace['x']) for trace in traces if trace['x'] is not None)):
+        st.plotly_chart(fig, use_container_width=True)
+
+# Per-rerun breakdown for admins, plus the process-wide totals as Prometheus text
+def show_instrumentation(recorder):
+    with st.sidebar.expander("Instrumentasi"):
+        st.caption(f"Rerun ini: {recorder.seconds:,.3f} detik")
+        if recorder.spans:
+            st.dataframe(pd.DataFrame(recorder.spans), use_container_width=True)
+        st.download_button("Unduh Metrik (Prometheus)", metrics.prometheus_text(), file_name="dashboard_metrics.txt", key="metrics_download")
+
+# Drill-down dashboard rendered from a pushdown backend (SqlPushdown or MongoPushdown)
+def show_pushdown_dashboard(source, pushdown):
+    try:
+        first_date, last_date = fetch(pushdown, 'date_range', source)
+    except Exception as e:
+        st.error(f"Gagal membaca tabel {pushdown.table}: {e}")
+        return
+    if pd.isna(first_date):
+        st.warning("Tabel tidak memiliki data transaksi")
+        return
+
+    st.sidebar.title("Filters")
+    start_date = st.sidebar.date_input("Tanggal Mulai", value=first_date, key="db_start_date")
+    end_date = st.sidebar.date_input("Tanggal Selesai", value=last_date, key="db_end_date")
+    range_start, range_end = date_bounds(start_date, end_date)
+    period_label = period_label_for((end_date - start_date).days)
+
+    # Drill-down region: pilihan tiap level diambil langsung dari server database
+    path = []
+    for level, label in zip(REGION_LEVELS, ["Pilih Provinsi", "Pilih Kabupaten", "Pilih Kelurahan", "Pilih Toko"]):
+        options = fetch(pushdown, 'options', source, path, range_start, range_end)
+        selected = st.sidebar.selectbox(label, ["Pilih"] + options, key=f"db_filter_{level}")
+        if selected == "Pilih":
+            break
+        path.append(selected)
+
+    if len(path) == len(REGION_LEVELS):
+        st.markdown(f"<h1 style='text-align: center; color: #3084da; font-family: Inter;'>DASHBOARD <br> {path[-1]}</h1>", unsafe_allow_html=True)
+        summary = fetch(pushdown, 'summary', source, range_start, range_end, path)
+        col1, col2, col3 = st.columns(3)
+        col1.metric("TOTAL PENJUALAN", f"Rp {summary['total_penghasilan'] or 0:,.0f}")
+        col2.metric(f"PENDAPATAN PER {period_label}", f"Rp {summary['rata_rata_penghasilan'] or 0:,.0f}")
+        col3.metric("BARANG TERJUAL", f"{int(summary['jumlah_barang'] or 0)}")
+
+        top_5_items = fetch(pushdown, 'top_items', source, range_start, range_end, path)
+        revenue_by_period = fetch(pushdown, 'revenue_by_period', source, PERIOD_CODES[period_label], range_start, range_end, path)
+        revenue_by_period, render_mode = charts.prepare_series(revenue_by_period, 'periode', 'total_penghasilan')
+        fig1 = px.bar(top_5_items, x='jumlah', y='nama_barang', orientation='h',
+                      labels={'jumlah': 'jumlah terjual', 'nama_barang': 'nama_barang'}, text='jumlah',
+                      color_discrete_sequence=['#76db43'])
+        fig2 = px.line(revenue_by_period, x='periode', y='total_penghasilan', markers=True,
+                       labels={'total_penghasilan': 'Total Penghasilan (Rp)', 'periode': period_label},
+                       color_discrete_sequence=['#76db43'], render_mode=render_mode)
+    else:
+        region = path[-1] if path else "Semua Wilayah"
+        st.markdown(f"<h2 style='text-align: center;'>Produk Terlaris<br>{region}</h2>", unsafe_allow_html=True)
+        top_5_items = fetch(pushdown, 'top_items', source, range_start, range_end, path)
+        top_5_toko = fetch(pushdown, 'top_stores', source, range_start, range_end, path)
+        fig1 = px.bar(top_5_items, x='jumlah', y='nama_barang', orientation='h',
+                      labels={'jumlah': 'Jumlah Terjual', 'nama_barang': 'Nama Barang'}, text='jumlah',
+                      color_discrete_sequence=['#76db43'])
+        fig2 = px.bar(top_5_toko, x='total_penghasilan', y='nama_toko', orientation='h',
+                      labels={'total_penghasilan': 'Total Penghasilan (Rp)', 'nama_toko': 'Nama Toko'},
+                      text='total_penghasilan', color_discrete_sequence=['#76db43'])
+        fig2.update_traces(texttemplate='%{text:,.0f}', textposition='outside')
+        fig2.update_layout(yaxis=dict(autorange="reversed"))
+
+    col6, col7 = st.columns(2)
+    with col6:
+        plotly_chart(fig1)
+    with col7:
+        plotly_chart(fig2)
+
+# Cookie browser yang menyimpan token sesi, supaya koneksi ulang (session_state baru) tetap login
+SESSION_COOKIE = "dashboard_session"
+
+# Set (or with max_age 0 delete) the session cookie from a zero-height component; its
+# iframe is same-origin, so the script writes the cookie of the dashboard page itself
+def store_session_cookie(token, max_age):
+    cookie = f"{SESSION_COOKIE}={quote(token, safe='')}; Max-Age={int(max_age)}; Path=/; SameSite=Strict"
+    components.html(f"<script>parent.document.cookie = {json.dumps(cookie)};</script>", height=0)
+
+# End the session: the token is revoked in the user database, for every worker process
+def logout():
+    st.session_state["logged_in"] = False
+    release_incremental_dataset()
+    get_user_store().logout(st.session_state.pop("session_token", None))
+    store_session_cookie("", 0)
+
 # User login function
 def login():
     st.markdown("<h1 style='text-align: center; color: #0fb824; font-size: 108px;'>LOGIN <br>PIKKAT</h1>", unsafe_allow_html=True)
@@ -110,8 +308,14 @@ def login():
     username = st.text_input("Username", key="login_username_{}".format(st.session_state["show_login"]))
     password = st.text_input("Password", type="password", key="login_password_{}".format(st.session_state["show_login"]))
     if st.button("LOGIN", key="login_button"):
-        if verify_user(conn, username, password):
+        # Password diverifikasi di worker pool; token sesi bertanda tangan disimpan di
+        # session_state dan cookie (bukan di URL) supaya tidak masuk riwayat browser atau log proxy
+        token = get_user_store().login(username, password)
+        if token is not None:
             st.session_state["logged_in"] = True
+            st.session_state["username"] = username
+            st.session_state["session_token"] = token
+            store_session_cookie(token, SESSION_TTL)
             st.session_state["current_page"] = "data_input"
         else:
             st.error("Username / Password salah")
@@ -154,11 +358,13 @@ def register():
             st.error("Nomor HP Tidak Berlaku, harus diawali dengan 08")
         else:
             try:
-                add_user(conn, new_username, new_password, hp)
+                get_user_store().add_user(new_username, new_password, hp)
                 st.success("Pendaftaran berhasil! Silakan login.")
                 st.session_state["show_login"] = True
             except sqlite3.IntegrityError:
                 st.error("Pendaftaran gagal. Username atau Nomor HP Sudah Digunakan.")
+            except sqlite3.Error as e:
+                st.error(f"Pendaftaran gagal: {e}")
     st.markdown("</div>", unsafe_allow_html=True)
 
 # Login and Register Function
@@ -174,6 +380,321 @@ def show_login_or_register():
         if st.button("LOGIN", key="switch_to_login"):
             st.session_state["show_login"] = True
 
+# Kolom perbandingan periode yang ditampilkan: (ukuran, label, format nilai)
+COMPARISON_MEASURES = [
+    ('total_penghasilan', 'Total Penjualan', 'Rp {:,.0f}'),
+    ('rata_rata_penghasilan', 'Rata-rata per Transaksi', 'Rp {:,.0f}'),
+    ('jumlah', 'Jumlah Terjual', '{:,.0f}'),
+]
+GROWTH_COLUMNS = {
+    'nama_toko': 'Toko',
+    'kelurahan': 'Kelurahan',
+    'total_penghasilan': 'Penjualan',
+    'total_penghasilan_sebelumnya': 'Penjualan Sebelumnya',
+    'pertumbuhan_persen': 'Pertumbuhan (%)',
+}
+
+
+# The selected range against the comparison range, plus the fastest growing stores below a region
+def show_period_comparison(query, comparison, store_growth=None):
+    st.markdown("<h3 style='text-align: center;'>Perbandingan Periode</h3>", unsafe_allow_html=True)
+    st.caption(
+        f"{query.start_date:%d-%m-%Y} s/d {query.end_date:%d-%m-%Y} dibandingkan dengan "
+        f"{query.compare_start:%d-%m-%Y} s/d {query.compare_end:%d-%m-%Y}"
+    )
+    for column, (measure, label, value_format) in zip(st.columns(len(COMPARISON_MEASURES)), COMPARISON_MEASURES):
+        row = comparison.loc[measure]
+        growth = row['pertumbuhan_persen']
+        column.metric(
+            label, value_format.format(row['sekarang']),
+            None if pd.isna(growth) else f"{growth:+.1f}%",
+            help=f"Sebelumnya: {value_format.format(row['sebelumnya'])}",
+        )
+    if store_growth is not None:
+        st.markdown("<h4 style='text-align: center;'>Toko dengan Pertumbuhan Tercepat</h4>", unsafe_allow_html=True)
+        if store_growth.empty:
+            st.caption("Belum ada toko dengan penjualan pada rentang pembanding")
+        else:
+            st.dataframe(store_growth[list(GROWTH_COLUMNS)].rename(columns=GROWTH_COLUMNS), hide_index=True, use_container_width=True)
+
+
+# Error bounds of the approximate (sketch) results shown under the region charts
+def show_approximation_note(results):
+    notes = []
+    for metric, label in (('top_items', 'jumlah terjual'), ('top_stores', 'penjualan toko')):
+        if 'galat' in results[metric].columns and len(results[metric]):
+            notes.append(f"{label} bisa kurang hingga {results[metric]['galat'].iloc[0]:,.0f}")
+    distinct = results.get('distinct_items')
+    if distinct is not None:
+        accuracy = f"±{distinct['relative_error']:.1%}" if distinct['relative_error'] else "persis"
+        notes.append(f"jenis barang terjual {distinct['estimate']:,} ({accuracy})")
+    if notes:
+        st.caption("Mode perkiraan: " + "; ".join(notes))
+
+
+# Drill-down dashboard over a prepared row-level dataset (CSV upload, stored dataset or a table
+# loaded from a database); every aggregate comes from the analytics engine
+def show_dataset_dashboard(df):
+    st.sidebar.title("Filters")
+
+    # Tanggal dan tipe kolom sudah dikonversi sekali oleh load_csv (di-cache per isi file)
+    stats = cache_stats()
+    st.sidebar.caption(f"Cache CSV: {stats['hits']} hit / {stats['misses']} miss")
+    shared_stats = shared_cache.stats()
+    st.sidebar.caption(f"Cache bersama: {shared_stats['hits']} hit / {shared_stats['misses']} miss, {shared_stats['bytes'] / 1e6:,.1f} MB")
+
+    # Semua agregat dihitung oleh analytics engine (tanpa UI) lewat compute graph per sesi:
+    # setiap node di-memo berdasarkan inputnya, jadi hanya node di bawah widget yang berubah
+    # yang dihitung ulang. Agregat dan grafik juga disimpan di cache bersama, sehingga sesi lain
+    # yang membuka dataset dan filter yang sama langsung memakai hasilnya
+    if "compute_graph" not in st.session_state:
+        st.session_state["compute_graph"] = build_dashboard_graph(shared_cache=shared_cache)
+    graph = st.session_state["compute_graph"]
+    graph.recorder = recorder
+    engine = AnalyticsEngine(df, graph=graph)
+
+    # Tambahkan filter tanggal (tanggal selesai ikut dihitung satu hari penuh)
+    first_date, last_date = engine.date_range()
+    start_date = st.sidebar.date_input("Tanggal Mulai", value=first_date, key="start_date")
+    end_date = st.sidebar.date_input("Tanggal Selesai", value=last_date, key="end_date")
+
+    # Rentang pembanding untuk perbandingan periode (default: rentang sebelumnya dengan panjang yang sama)
+    compare_range = None
+    if not st.sidebar.checkbox("Bandingkan dengan rentang sebelumnya", value=True, key="compare_previous"):
+        default_start, default_end = previous_range(start_date, end_date)
+        compare_range = (
+            st.sidebar.date_input("Pembanding Mulai", value=default_start, key="compare_start"),
+            st.sidebar.date_input("Pembanding Selesai", value=default_end, key="compare_end"),
+        )
+
+    # Mode perkiraan: top-5 dan jumlah jenis barang di level nasional/provinsi/kabupaten dari sketch
+    # (tanpa agregasi penuh), persis di level kelurahan dan toko
+    approximate = st.sidebar.checkbox("Mode perkiraan (sketch) untuk data besar", value=False, key="approximate_mode")
+
+    # 'periode' (Harian/Mingguan/Bulanan) ditentukan dari panjang rentang tanggal
+    query = DashboardQuery(start_date, end_date, compare_range=compare_range, approximate=approximate)
+    period_label = query.period_label
+
+    # Pilihan selectbox dari index region (propinsi -> kabupaten -> kelurahan -> toko)
+    selected_propinsi = st.sidebar.selectbox("Pilih Provinsi", ["Pilih"] + engine.options(query), key="filter_propinsi")
+
+    if selected_propinsi != "Pilih":
+        selected_kabupaten = st.sidebar.selectbox("Pilih Kabupaten", ["Pilih"] + engine.options(query.at((selected_propinsi,))), key="filter_kabupaten")
+        
+        if selected_kabupaten != "Pilih":
+            selected_kelurahan = st.sidebar.selectbox("Pilih Kelurahan", ["Pilih"] + engine.options(query.at((selected_propinsi, selected_kabupaten))), key="filter_kelurahan")
+            
+            if selected_kelurahan != "Pilih":
+                selected_toko = st.sidebar.selectbox("Pilih Toko", ["Pilih"] + engine.options(query.at((selected_propinsi, selected_kabupaten, selected_kelurahan))), key="filter_toko")
+                
+                if selected_toko != "Pilih":
+                    store_query = query.at((selected_propinsi, selected_kabupaten, selected_kelurahan, selected_toko))
+                    results = engine.run(store_query)
+
+                    st.markdown(f"<h1 style='text-align: center; color: #3084da; font-family: Inter;'>DASHBOARD <br> {selected_toko}</h1>", unsafe_allow_html=True)
+
+                    # Ringkasan Penghasilan dan Jumlah Jenis Barang Terjual
+                    store_summary = results['store_summary']
+                    total_revenue = store_summary['total_revenue']
+                    avg_revenue_per_transaction = store_summary['avg_revenue_per_transaction']
+                    total_unique_items = store_summary['total_unique_items']
+
+                    # Top 5 Barang Terlaris
+                    top_5_items = results['top_items']
+                    revenue_by_period = results['revenue_by_period']
+
+                    # Membuat baris untuk Ringkasan Penjualan
+                    col1, col2, col3 = st.columns(3)
+                    box_style_small = """
+                        background-color: #76db43;
+                        padding: 10px;
+                        border-radius: 15px;
+                        margin: 10px 0;
+                        display: flex;
+                        flex-direction: column;
+                        justify-content: center;
+                        align-items: center;
+                        text-align: center;
+                        color: #cf3c3e;
+                        font-family: 'Inter';
+                    """
+                    with col1:
+                        st.markdown(
+                            f"<div><h2 style='font-size: 45px; {box_style_small};'>TOTAL<br>PENJUALAN</h2><h3 style='font-size: 40px; color: #76db43; font-family: Inter;'>Rp {total_revenue:,.0f}</h3></div>",
+                            unsafe_allow_html=True
+                        )
+
+                    with col2:
+                        st.markdown(
+                            f"<div><h2 style='font-size: 42px; {box_style_small}'>PENDAPATAN<br>PER {period_label}</h2><h3 style='font-size: 50px; color: #44905f; font-family: Inter;'>Rp {avg_revenue_per_transaction:,.0f}</h3></div>",
+                            unsafe_allow_html=True
+                        )
+
+                    with col3:
+                        st.markdown(
+                            f"<div><h2 style='font-size: 45px; {box_style_small}; '>BARANG<br>TERJUAL</h2><h3 style='font-size: 70px; color: #76db43; font-family: Inter;'>{total_unique_items}</h3></div>",
+                            unsafe_allow_html=True
+                        )
+
+                    # Creating the second row with boxes 4 and 5, making them interactive
+                    col4, col5 = st.columns(2)
+                    box_style_large = """
+                        background-color: #76db43;
+                        padding: 5px;
+                        border-radius: 10px;
+                        margin: 20px 0;
+                        display: flex;
+                        flex-direction: column;
+                        justify-content: center;
+                        align-items: center;
+                        text-align: center;
+                        color: #cf3c3e; 
+                        font-family: 'Inter';
+                    """
+                    with col4:
+                        st.markdown(
+                            f"<div style='{box_style_large}'><h3 style='font-size: 40px; color: #cf3c3e;'>PRODUK TERLARIS</h3></div>",
+                            unsafe_allow_html=True
+                        )
+                        fig = shared_figure(
+                            engine, 'store_items', 'top_items', store_query,
+                            lambda: charts.top_items_bar(top_5_items, labels={'jumlah': 'jumlah terjual', 'nama_barang': 'nama_barang'})
+                        )
+                        plotly_chart(fig)
+
+                    with col5:
+                        st.markdown(
+                            f"<div style='{box_style_large}'><h3 style='font-size: 40px; color: #cf3c3e;'>PENDAPATAN {period_label.upper()}</h3></div>",
+                            unsafe_allow_html=True
+                        )
+                        fig = shared_figure(
+                            engine, 'revenue_line', 'revenue_by_period', store_query,
+                            lambda: charts.revenue_line(revenue_by_period, period_label)
+                        )
+                        plotly_chart(fig)
+
+                    show_period_comparison(store_query, results['period_comparison'])
+
+                    # Button to return to data input page
+                    if st.button("KEMBALI", key="back_home"):
+                        logout()
+                        st.session_state["df"] = None
+                else:
+                    # Menampilkan grafik toko dengan pendapatan terbanyak
+                    st.markdown(f"<h2 style='text-align: center;'>Produk Terlaris Kelurahan<br>{selected_kelurahan}</h2>", unsafe_allow_html=True)
+                    kelurahan_query = query.at((selected_propinsi, selected_kabupaten, selected_kelurahan))
+                    kelurahan_results = engine.run(kelurahan_query)
+                    top_5_items_kelurahan = kelurahan_results['top_items']
+                    fig1 = shared_figure(
+                        engine, 'top_items_bar', 'top_items', kelurahan_query,
+                        lambda: charts.top_items_bar(top_5_items_kelurahan, '%{text:.2s}')
+                    )
+
+                    # Grafik pendapatan terbesar
+                    top_5_toko_kelurahan = kelurahan_results['top_stores']
+                    # Sumbu x tidak dibalik dan range-nya dari 0 ke maksimum nilai total_penghasilan
+                    fig2 = shared_figure(
+                        engine, 'top_stores_bar', 'top_stores', kelurahan_query,
+                        lambda: charts.top_stores_bar(top_5_toko_kelurahan, '%{text:,.0f}', reverse_axis='y', fit_range=True)
+                    )
+                    # Tampilkan kedua grafik berdampingan
+                    col6, col7 = st.columns(2)
+                    with col6:
+                        plotly_chart(fig1)
+                    with col7:
+                        plotly_chart(fig2)
+                    show_approximation_note(kelurahan_results)
+                    show_period_comparison(kelurahan_query, kelurahan_results['period_comparison'], kelurahan_results['store_growth'])
+                    
+
+            else:
+                # Hapus grafik kelurahan dan tampilkan grafik kabupaten
+                st.markdown(f"<h2 style='text-align: center;'>Produk Terlaris Kabupaten<br>{selected_kabupaten}</h2>", unsafe_allow_html=True)
+                kabupaten_query = query.at((selected_propinsi, selected_kabupaten))
+                kabupaten_results = engine.run(kabupaten_query)
+                top_5_items_kabupaten = kabupaten_results['top_items']
+                fig1 = shared_figure(
+                    engine, 'top_items_bar', 'top_items', kabupaten_query,
+                    lambda: charts.top_items_bar(top_5_items_kabupaten, '%{text:.0f}')
+                )
+                
+                # Grafik pendapatan terbesar
+                top_5_toko_kabupaten = kabupaten_results['top_stores']
+                fig2 = shared_figure(
+                    engine, 'top_stores_bar', 'top_stores', kabupaten_query,
+                    lambda: charts.top_stores_bar(top_5_toko_kabupaten, '%{text:,.0f}', fit_range=True)
+                )
+                # Tampilkan kedua grafik berdampingan
+                col6, col7 = st.columns(2)
+                with col6:
+                    plotly_chart(fig1)
+                with col7:
+                    plotly_chart(fig2)
+                show_approximation_note(kabupaten_results)
+                show_period_comparison(kabupaten_query, kabupaten_results['period_comparison'], kabupaten_results['store_growth'])
+
+        else:
+            # Hapus grafik kabupaten dan tampilkan grafik provinsi
+            st.markdown(f"<h2 style='text-align: center;'>Produk Terlaris Provinsi<br>{selected_propinsi}</h2>", unsafe_allow_html=True)
+            propinsi_query = query.at((selected_propinsi,))
+            propinsi_results = engine.run(propinsi_query)
+            top_5_items_propinsi = propinsi_results['top_items']
+            fig1 = shared_figure(
+                engine, 'top_items_bar', 'top_items', propinsi_query,
+                lambda: charts.top_items_bar(top_5_items_propinsi, '%{text:.0f}')
+            )
+
+            # Grafik pendapatan terbesar
+            top_5_toko_propinsi = propinsi_results['top_stores']
+            fig2 = shared_figure(
+                engine, 'top_stores_bar', 'top_stores', propinsi_query,
+                lambda: charts.top_stores_bar(top_5_toko_propinsi, '%{text:,.2s}')
+            )
+
+            # Tampilkan kedua grafik berdampingan
+            col6, col7 = st.columns(2)
+            with col6:
+                plotly_chart(fig1)
+            with col7:
+                plotly_chart(fig2)
+            show_approximation_note(propinsi_results)
+            show_period_comparison(propinsi_query, propinsi_results['period_comparison'], propinsi_results['store_growth'])
+    else:
+        st.markdown("<h3 style='text-align: center;'>Unggah File CSV atau hubungkan dengan Database</h3>", unsafe_allow_html=True)           
+        # Perbandingan seluruh data dan toko dengan pertumbuhan tercepat di semua region
+        overall_results = engine.run(query)
+        show_period_comparison(query, overall_results['period_comparison'], overall_results['store_growth'])
+
+# Dialek query agregasi untuk setiap jenis database SQL
+SQL_SOURCES = {"PostgreSQL": "postgresql", "MySQL": "mysql"}
+
+# Token sesi ditandatangani dengan kunci yang sama di semua proses worker
+if not SESSION_SECRET:
+    st.error("DASHBOARD_SECRET belum diatur. Atur environment variable ini sebelum menjalankan dashboard.")
+    st.stop()
+
+# Setelah koneksi ulang session_state kosong; token dari cookie memulihkan login tanpa
+# memeriksa password lagi (token yang kedaluwarsa atau sudah logout ditolak)
+if not st.session_state.get("logged_in") and st.context.cookies.get(SESSION_COOKIE):
+    cookie_token = unquote(st.context.cookies[SESSION_COOKIE])
+    cookie_user = get_user_store().session_user(cookie_token)
+    if cookie_user is not None:
+        st.session_state["logged_in"] = True
+        st.session_state["username"] = cookie_user
+        st.session_state["session_token"] = cookie_token
+
+# Token sesi diperiksa ulang setiap rerun: sesi yang kedaluwarsa atau sudah logout (juga dari
+# worker lain) langsung keluar, tanpa memeriksa password lagi
+if st.session_state.get("logged_in") and get_user_store().session_user(st.session_state.get("session_token")) is None:
+    st.session_state["logged_in"] = False
+    release_incremental_dataset()
+    st.session_state.pop("session_token", None)
+
+# Setiap rerun dicatat per tahap (waktu, jumlah baris, delta memori) untuk panel admin dan ekspor metrik
+recorder = RerunRecorder(session=st.session_state.get("username"))
+if METRICS_PORT:
+    metrics.serve(METRICS_PORT)
+
 # Main Page
 if "logged_in" not in st.session_state:
     st.session_state["logged_in"] = False
@@ -257,284 +778,53 @@ if st.session_state["logged_in"]:
         data_source = st.radio("Pilih Sumber Data", ["Upload CSV", "Koneksi Database"], key="data_source", horizontal=True)
 
         if data_source == "Upload CSV":
+            release_incremental_dataset()
+            # Dataset yang pernah diunggah tersimpan dalam format kolumnar dan bisa dibuka tanpa upload ulang
+            saved_datasets = {f"{entry['name']} ({entry['rows']:,} baris, {entry['created_at']})": entry['key'] for entry in dataset_store.catalog()}
+            saved_choice = st.selectbox("Buka Dataset Tersimpan", ["Pilih"] + list(saved_datasets), key="saved_dataset")
             uploaded_file = st.file_uploader("Upload file CSV", type=["csv"], key="uploaded_file")
+            # Mode streaming: file dibaca per chunk dan langsung diringkas, tanpa menyimpan semua baris
+            streaming_mode = st.checkbox("Mode streaming untuk file besar (hanya agregat)", key="streaming_mode")
+            streaming_cube = None
+            if streaming_mode:
+                memory_limit_mb = st.number_input("Batas Memori (MB)", min_value=64, value=512, step=64, key="memory_limit_mb")
             if uploaded_file is not None:
-                df = pd.read_csv(uploaded_file)
+                if streaming_mode:
+                    progress = st.progress(0.0, text="Memproses file CSV...")
+                    try:
+                        with recorder.stage("load_csv_streaming"):
+                            streaming_cube = load_csv_streaming(uploaded_file, int(memory_limit_mb), progress=lambda fraction, rows: progress.progress(fraction, text=f"{rows:,} baris diproses"))
+                    except (MemoryError, ValueError) as e:
+                        st.error(f"Gagal memproses file CSV: {e}")
+                    progress.empty()
+                    df = None
+                    st.session_state["df"] = None
+                else:
+                    with recorder.stage("load_csv") as span:
+                        df = load_csv(uploaded_file, store=dataset_store)
+                        span['rows'] = len(df)
+                    st.session_state["df"] = df
+            elif saved_choice != "Pilih":
+                with recorder.stage("open_dataset") as span:
+                    df = dataset_store.open(saved_datasets[saved_choice])
+                    span['rows'] = len(df)
                 st.session_state["df"] = df
                         # Tampilkan tombol kembali di halaman input data
             if st.button("Kembali"):
-                st.session_state["logged_in"] = False
+                logout()
                 st.session_state["current_page"] = "login"
 
-            # Menampilkan dashboard hanya jika data tersedia
-            if df is not None:
-                st.sidebar.title("Filters")
-                
-                # Pastikan tanggal diformat dengan benar
-                df['tgl_transaksi'] = pd.to_datetime(df['tgl_transaksi'], format='%d/%m/%Y %H:%M', dayfirst=True)
+            warm_up(df)
 
-                # Tambahkan filter tanggal
-                start_date = st.sidebar.date_input("Tanggal Mulai", value=df['tgl_transaksi'].min(), key="start_date")
-                end_date = st.sidebar.date_input("Tanggal Selesai", value=df['tgl_transaksi'].max(), key="end_date")
-                
-                # Filter berdasarkan tanggal
-                df_filtered_by_date = df[(df['tgl_transaksi'] >= pd.to_datetime(start_date)) & (df['tgl_transaksi'] <= pd.to_datetime(end_date))]
-
-                # Tambahkan kolom 'periode' berdasarkan panjang rentang tanggal
-                date_range_days = (end_date - start_date).days
-
-                if date_range_days <= 7:  # Jika rentang tanggal <= 7 hari, tampilkan data harian
-                    df_filtered_by_date['periode'] = df_filtered_by_date['tgl_transaksi'].dt.to_period('D').apply(lambda r: r.start_time)
-                    period_label = 'Harian'
-                elif 7 < date_range_days <= 30:  # Jika rentang tanggal antara 7 dan 30 hari, tampilkan data mingguan
-                    df_filtered_by_date['periode'] = df_filtered_by_date['tgl_transaksi'].dt.to_period('W').apply(lambda r: r.start_time)
-                    period_label = 'Mingguan'
-                else:  # Jika rentang tanggal lebih dari 30 hari, tampilkan data bulanan
-                    df_filtered_by_date['periode'] = df_filtered_by_date['tgl_transaksi'].dt.to_period('M').apply(lambda r: r.start_time)
-                    period_label = 'Bulanan'
-
-                # Pastikan total_penghasilan dihitung setelah filtering
-                if 'total_penghasilan' not in df_filtered_by_date.columns:
-                    df_filtered_by_date['total_penghasilan'] = df_filtered_by_date['jumlah'] * df_filtered_by_date['harga']
-
-                # Lakukan agregasi data berdasarkan periode yang baru dibuat
-                revenue_by_period = df_filtered_by_date.groupby('periode')['total_penghasilan'].sum().reset_index()
-                revenue_by_period = revenue_by_period.sort_values(by='periode')  # Pastikan periode diurutkan secara kronologis
-
-                # Grouping data untuk mendapatkan top 5 toko berdasarkan total_penghasilan
-                top_5_toko_propinsi = df_filtered_by_date.groupby('nama_toko')['total_penghasilan'].sum().nlargest(5).reset_index()
-
-                selected_propinsi = st.sidebar.selectbox("Pilih Provinsi", ["Pilih"] + list(df_filtered_by_date['propinsi'].unique()), key="filter_propinsi")
-
-                if selected_propinsi != "Pilih":
-                    filtered_df_propinsi = df_filtered_by_date[df_filtered_by_date['propinsi'] == selected_propinsi]
-                    selected_kabupaten = st.sidebar.selectbox("Pilih Kabupaten", ["Pilih"] + list(filtered_df_propinsi['kabupaten'].unique()), key="filter_kabupaten")
-                    
-                    if selected_kabupaten != "Pilih":
-                        filtered_df_kabupaten = filtered_df_propinsi[df_filtered_by_date['kabupaten'] == selected_kabupaten]
-                        selected_kelurahan = st.sidebar.selectbox("Pilih Kelurahan", ["Pilih"] + list(filtered_df_kabupaten['kelurahan'].unique()), key="filter_kelurahan")
-                        
-                        if selected_kelurahan != "Pilih":
-                            filtered_df_kelurahan = filtered_df_kabupaten[df_filtered_by_date['kelurahan'] == selected_kelurahan]
-                            selected_toko = st.sidebar.selectbox("Pilih Toko", ["Pilih"] + list(filtered_df_kelurahan['nama_toko'].unique()), key="filter_toko")
-                            
-                            if selected_toko != "Pilih":
-                                filtered_df = filtered_df_kelurahan[df_filtered_by_date['nama_toko'] == selected_toko]
-
-                                st.markdown(f"<h1 style='text-align: center; color: #3084da; font-family: Inter;'>DASHBOARD <br> {selected_toko}</h1>", unsafe_allow_html=True)
-
-                                # Data Cleaning and Preparation
-                                filtered_df['total_penghasilan'] = filtered_df['jumlah'] * filtered_df['harga']
-                                
-                                # Ringkasan Penghasilan
-                                total_revenue = filtered_df['total_penghasilan'].sum()
-                                avg_revenue_per_transaction = filtered_df['total_penghasilan'].mean()
-
-                                # Jumlah Jenis Barang Terjual
-                                total_unique_items = filtered_df['nama_barang'].nunique()
-
-                                # Top 5 Barang Terlaris
-                                top_5_items = filtered_df.groupby('nama_barang')['jumlah'].sum().nlargest(5).reset_index()
-
-                                # Membuat baris untuk Ringkasan Penjualan
-                                col1, col2, col3 = st.columns(3)
-                                box_style_small = """
-                                    background-color: #76db43;
-                                    padding: 10px;
-                                    border-radius: 15px;
-                                    margin: 10px 0;
-                                    display: flex;
-                                    flex-direction: column;
-                                    justify-content: center;
-                                    align-items: center;
-                                    text-align: center;
-                                    color: #cf3c3e;
-                                    font-family: 'Inter';
-                                """
-                                with col1:
-                                    st.markdown(
-                                        f"<div><h2 style='font-size: 45px; {box_style_small};'>TOTAL<br>PENJUALAN</h2><h3 style='font-size: 40px; color: #76db43; font-family: Inter;'>Rp {total_revenue:,.0f}</h3></div>",
-                                        unsafe_allow_html=True
-                                    )
-
-                                with col2:
-                                    st.markdown(
-                                        f"<div><h2 style='font-size: 42px; {box_style_small}'>PENDAPATAN<br>PER {period_label}</h2><h3 style='font-size: 50px; color: #44905f; font-family: Inter;'>Rp {avg_revenue_per_transaction:,.0f}</h3></div>",
-                                        unsafe_allow_html=True
-                                    )
-
-                                with col3:
-                                    st.markdown(
-                                        f"<div><h2 style='font-size: 45px; {box_style_small}; '>BARANG<br>TERJUAL</h2><h3 style='font-size: 70px; color: #76db43; font-family: Inter;'>{total_unique_items}</h3></div>",
-                                        unsafe_allow_html=True
-                                    )
-
-                                # Creating the second row with boxes 4 and 5, making them interactive
-                                col4, col5 = st.columns(2)
-                                box_style_large = """
-                                    background-color: #76db43;
-                                    padding: 5px;
-                                    border-radius: 10px;
-                                    margin: 20px 0;
-                                    display: flex;
-                                    flex-direction: column;
-                                    justify-content: center;
-                                    align-items: center;
-                                    text-align: center;
-                                    color: #cf3c3e; 
-                                    font-family: 'Inter';
-                                """
-                                with col4:
-                                    st.markdown(
-                                        f"<div style='{box_style_large}'><h3 style='font-size: 40px; color: #cf3c3e;'>PRODUK TERLARIS</h3></div>",
-                                        unsafe_allow_html=True
-                                    )
-                                    fig = px.bar(
-                                        top_5_items,
-                                        x='jumlah',
-                                        y='nama_barang',
-                                        orientation='h',  # Mengubah posisi ke vertikal
-                                        labels={'jumlah': 'jumlah terjual', 'nama_barang': 'nama_barang'},
-                                        text='jumlah',
-                                        color_discrete_sequence=['#76db43']  # Set the bar color to green
-                                    )
-                                    fig.update_traces(texttemplate='%{text:.2s}', textposition='outside', marker=dict(color='#76db43'))
-                                    fig.update_layout(xaxis=dict(autorange="reversed"))  # Reverse x-axis for better readability
-                                    st.plotly_chart(fig, use_container_width=True)
-
-                                with col5:
-                                    st.markdown(
-                                        f"<div style='{box_style_large}'><h3 style='font-size: 40px; color: #cf3c3e;'>PENDAPATAN {period_label.upper()}</h3></div>",
-                                        unsafe_allow_html=True
-                                    )
-                                    fig = px.line(
-                                        revenue_by_period,
-                                        x='periode',
-                                        y='total_penghasilan',
-                                        markers=True, 
-                                        labels={'total_penghasilan': 'Total Penghasilan (Rp)', 'periode': period_label},
-                                        line_shape='linear',
-                                        color_discrete_sequence=['#76db43']
-                                    )
-                                    fig.update_layout(xaxis_title=f'Penghasilan {period_label}', yaxis_title='Total Penghasilan (Rp)')
-                                    fig.update_xaxes(dtick="M1", tickformat="%d/%m/%Y", tickangle=45)
-                                    st.plotly_chart(fig, use_container_width=True)
-
-                                # Button to return to data input page
-                                if st.button("KEMBALI", key="back_home"):
-                                    st.session_state["logged_in"] = False
-                                    st.session_state["df"] = None
-                            else:
-                                # Menampilkan grafik toko dengan pendapatan terbanyak
-                                st.markdown(f"<h2 style='text-align: center;'>Produk Terlaris Kelurahan<br>{selected_kelurahan}</h2>", unsafe_allow_html=True)
-                                top_5_items_kelurahan = filtered_df_kelurahan.groupby('nama_barang')['jumlah'].sum().nlargest(5).reset_index()
-                                fig1 = px.bar(
-                                    top_5_items_kelurahan,
-                                    x='jumlah',
-                                    y='nama_barang',
-                                    labels={'jumlah': 'Jumlah Terjual', 'nama_barang': 'Nama Barang'},
-                                    text='jumlah',
-                                    color_discrete_sequence=['#76db43']
-                                )
-                                fig1.update_traces(texttemplate='%{text:.2s}', textposition='outside', marker=dict(color='#76db43'))
-                                fig1.update_layout(xaxis=dict(autorange="reversed"))
-
-                                # Grafik pendapatan terbesar
-                                top_5_toko_kelurahan = filtered_df_kelurahan.groupby('nama_toko')['total_penghasilan'].sum().nlargest(5).reset_index()
-                                fig2 = px.bar(
-                                    top_5_toko_kelurahan,
-                                    x='total_penghasilan',
-                                    y='nama_toko',
-                                    orientation='h',  # Tetap gunakan orientasi horizontal
-                                    labels={'total_penghasilan': 'Total Penghasilan (Rp)', 'nama_toko': 'Nama Toko'},
-                                    text='total_penghasilan',
-                                    color_discrete_sequence=['#76db43']
-                                )
-                                fig2.update_traces(texttemplate='%{text:,.0f}', textposition='outside', marker=dict(color='#76db43'))
-                                fig2.update_layout(xaxis=dict(autorange=False), yaxis=dict(autorange="reversed"))  # Mengatur sumbu x agar tidak terbalik
-                                fig2.update_layout(xaxis_range=[0, top_5_toko_kelurahan['total_penghasilan'].max() * 1.1])  # Mengatur range sumbu x dari 0 ke maksimum nilai total_penghasilan
-                                # Tampilkan kedua grafik berdampingan
-                                col6, col7 = st.columns(2)
-                                with col6:
-                                    st.plotly_chart(fig1, use_container_width=True)
-                                with col7:
-                                    st.plotly_chart(fig2, use_container_width=True)
-                                
-
-                        else:
-                            # Hapus grafik kelurahan dan tampilkan grafik kabupaten
-                            st.markdown(f"<h2 style='text-align: center;'>Produk Terlaris Kabupaten<br>{selected_kabupaten}</h2>", unsafe_allow_html=True)
-                            top_5_items_kabupaten = filtered_df_kabupaten.groupby('nama_barang')['jumlah'].sum().nlargest(5).reset_index()
-                            fig1 = px.bar(
-                                top_5_items_kabupaten,
-                                x='jumlah',
-                                y='nama_barang',
-                                labels={'jumlah': 'Jumlah Terjual', 'nama_barang': 'Nama Barang'},
-                                text='jumlah',
-                                color_discrete_sequence=['#76db43']
-                            )
-                            fig1.update_traces(texttemplate='%{text:.of}', textposition='outside', marker=dict(color='#76db43'))
-                            fig1.update_layout(xaxis=dict(autorange="reversed"))
-                            
-                            # Grafik pendapatan terbesar
-                            top_5_toko_kabupaten = filtered_df_kabupaten.groupby('nama_toko')['total_penghasilan'].sum().nlargest(5).reset_index()
-                            fig2 = px.bar(
-                                top_5_toko_kabupaten,
-                                x='total_penghasilan',
-                                y='nama_toko',
-                                labels={'total_penghasilan': 'Total Penghasilan (Rp)', 'nama_toko': 'Nama Toko'},
-                                text='total_penghasilan',
-                                color_discrete_sequence=['#76db43']
-                            )
-                            fig2.update_traces(texttemplate='%{text:,.0f}', textposition='outside', marker=dict(color='#76db43'))
-                            fig2.update_layout(xaxis=dict(autorange="reversed"))
-                            fig2.update_layout(xaxis_range=[0, top_5_toko_kabupaten['total_penghasilan'].max() * 1.1])
-                            # Tampilkan kedua grafik berdampingan
-                            col6, col7 = st.columns(2)
-                            with col6:
-                                st.plotly_chart(fig1, use_container_width=True)
-                            with col7:
-                                st.plotly_chart(fig2, use_container_width=True)
-
-                    else:
-                        # Hapus grafik kabupaten dan tampilkan grafik provinsi
-                        st.markdown(f"<h2 style='text-align: center;'>Produk Terlaris Provinsi<br>{selected_propinsi}</h2>", unsafe_allow_html=True)
-                        top_5_items_propinsi = filtered_df_propinsi.groupby('nama_barang')['jumlah'].sum().nlargest(5).reset_index()
-                        fig1 = px.bar(
-                            top_5_items_propinsi,
-                            x='jumlah',
-                            y='nama_barang',
-                            orientation='h',  # Tetap gunakan orientasi horizontal
-                            labels={'jumlah': 'Jumlah Terjual', 'nama_barang': 'Nama Barang'},
-                            text='jumlah',
-                            color_discrete_sequence=['#76db43']
-                        )
-                        fig1.update_traces(texttemplate='%{text:.0f}', textposition='outside', marker=dict(color='#76db43'))
-                        fig1.update_layout(xaxis=dict(autorange="reversed"))
-
-                        # Grafik pendapatan terbesar
-                        top_5_toko_propinsi = filtered_df_propinsi.groupby('nama_toko')['total_penghasilan'].sum().nlargest(5).reset_index()
-                        fig2 = px.bar(
-                            top_5_toko_propinsi,
-                            x='total_penghasilan',
-                            y='nama_toko',
-                            labels={'total_penghasilan': 'Total Penghasilan (Rp)', 'nama_toko': 'Nama Toko'},
-                            text='total_penghasilan',
-                            color_discrete_sequence=['#76db43']
-                        )
-                        fig2.update_traces(texttemplate='%{text:,.2s}', textposition='outside', marker=dict(color='#76db43'))
-                        fig2.update_layout(xaxis=dict(autorange='reversed'))
-
-                        # Tampilkan kedua grafik berdampingan
-                        col6, col7 = st.columns(2)
-                        with col6:
-                            st.plotly_chart(fig1, use_container_width=True)
-                        with col7:
-                            st.plotly_chart(fig2, use_container_width=True)
-                else:
-                    st.markdown("<h3 style='text-align: center;'>Unggah File CSV atau hubungkan dengan Database</h3>", unsafe_allow_html=True)           
+            # Menampilkan dashboard hanya jika data tersedia
+            if streaming_cube is not None:
+                show_pushdown_dashboard(streaming_cube, CubePushdown())
+            elif df is not None:
+                show_dataset_dashboard(df)
         elif data_source == "Koneksi Database":
             st.session_state["df"] = None  # Clear the previous data if connecting to a database
+            # Dataset yang sedang ditampilkan di halaman database (untuk warm-up)
+            warm_df = None
             db_type = st.selectbox("Pilih Jenis Database", ["PostgreSQL", "MySQL", "MongoDB"], key="db_type")
 
             if db_type == "PostgreSQL":
@@ -543,13 +833,11 @@ if st.session_state["logged_in"]:
                 user = st.text_input("User", key="pg_user")
                 password = st.text_input("Password", type="password", key="pg_password")
                 if st.button("Connect", key="pg_connect"):
-                    db_conn = connect_postgresql(host, dbname, user, password)
-                    if db_conn:
+                    db_pool = connect_postgresql(host, dbname, user, password)
+                    if db_pool:
+                        st.session_state["db_pool"] = db_pool
+                        st.session_state["db_conn_type"] = db_type
                         st.success("Berhasil terhubung ke PostgreSQL!")
-                        query = st.text_area("Query SQL", "SELECT * FROM your_table_name")
-                        if st.button("Execute Query", key="pg_execute"):
-                            df = pd.read_sql(query, db_conn)
-                            st.session_state["df"] = df
 
             elif db_type == "MySQL":
                 host = st.text_input("Host", key="mysql_host")
@@ -557,26 +845,99 @@ if st.session_state["logged_in"]:
                 user = st.text_input("User", key="mysql_user")
                 password = st.text_input("Password", type="password", key="mysql_password")
                 if st.button("Connect", key="mysql_connect"):
-                    db_conn = connect_mysql(host, dbname, user, password)
-                    if db_conn:
+                    db_pool = connect_mysql(host, dbname, user, password)
+                    if db_pool:
+                        st.session_state["db_pool"] = db_pool
+                        st.session_state["db_conn_type"] = db_type
                         st.success("Berhasil terhubung ke MySQL!")
-                        query = st.text_area("Query SQL", "SELECT * FROM your_table_name")
-                        if st.button("Execute Query", key="mysql_execute"):
-                            df = pd.read_sql(query, db_conn)
-                            st.session_state["df"] = df
 
             elif db_type == "MongoDB":
                 uri = st.text_input("MongoDB URI", key="mongodb_uri")
                 dbname = st.text_input("Database Name", key="mongodb_dbname")
                 if st.button("Connect", key="mongodb_connect"):
                     db_conn = connect_mongodb(uri, dbname)
-                    if db_conn:
+                    if db_conn is not None:
+                        st.session_state["mongo_db"] = db_conn
+                        st.session_state["db_conn_type"] = db_type
                         st.success("Berhasil terhubung ke MongoDB!")
-                        collection = st.text_input("Collection Name", key="mongodb_collection")
-                        if collection:
-                            df = pd.DataFrame(list(db_conn[collection].find()))
+
+                mongo_db = st.session_state.get("mongo_db")
+                if mongo_db is not None and st.session_state.get("db_conn_type") == db_type:
+                    collection = st.text_input("Collection Name", key="mongodb_collection")
+                    if collection:
+                        query_mode = st.radio("Mode Query", ["Agregasi di Server", "Muat Data (Inkremental)", "Muat Data"], key="mongo_mode", horizontal=True)
+                        if query_mode == "Agregasi di Server":
+                            revenue_field = st.text_input("Field Total Penghasilan (kosongkan untuk jumlah * harga)", "", key="mongo_revenue_field")
+                            show_pushdown_dashboard(mongo_db[collection], MongoPushdown(collection, revenue_field or None))
+                        elif query_mode == "Muat Data (Inkremental)":
+                            def fetch_since(watermark, documents=mongo_db[collection], pushdown=MongoPushdown(collection)):
+                                return pushdown.fetch_rows_since(documents, watermark)
+                            dataset = incremental_datasets.get(f"mongodb:{uri}:{dbname}:{collection}", fetch_since)
+                            warm_df = show_incremental_dataset(dataset)
+                        elif st.button("Muat Data", key="mongo_load"):
+                            # Hanya field dashboard yang diambil, dibangun per batch dari cursor
+                            progress = st.progress(0, text="Memuat dokumen...")
+                            total = max(mongo_db[collection].estimated_document_count(), 1)
+                            with recorder.stage("load_collection") as span:
+                                df = load_collection(mongo_db[collection], progress=lambda loaded: progress.progress(min(loaded / total, 1.0), text=f"{loaded:,} dokumen"))
+                                span['rows'] = len(df)
+                            progress.progress(1.0, text=f"{len(df):,} dokumen dimuat")
                             st.session_state["df"] = df
 
+            # Pool koneksi disimpan di session_state agar tetap ada setelah rerun Streamlit
+            # Pool yang sudah ditutup diganti dengan pool aktif untuk kredensial yang sama
+            db_pool = st.session_state.get("db_pool")
+            if db_pool is not None:
+                db_pool = st.session_state["db_pool"] = pool_manager.live_pool(db_pool)
+            if db_type in SQL_SOURCES and db_pool is not None and st.session_state.get("db_conn_type") == db_type:
+                with st.sidebar.expander("Pool Koneksi"):
+                    st.json(pool_manager.stats())
+                query_mode = st.radio("Mode Query", ["Agregasi di Server", "Muat Tabel (Inkremental)", "Query SQL"], key="sql_mode", horizontal=True)
+                if query_mode == "Agregasi di Server":
+                    table = st.text_input("Nama Tabel", "your_table_name", key="sql_table")
+                    revenue_column = st.text_input("Kolom Total Penghasilan (kosongkan untuk jumlah * harga)", "", key="sql_revenue_column")
+                    try:
+                        pushdown = SqlPushdown(table, SQL_SOURCES[db_type], revenue_column or None)
+                    except ValueError as e:
+                        st.error(str(e))
+                    else:
+                        show_sql_dashboard(db_pool, pushdown)
+                elif query_mode == "Muat Tabel (Inkremental)":
+                    table = st.text_input("Nama Tabel", "your_table_name", key="sql_incremental_table")
+                    revenue_column = st.text_input("Kolom Total Penghasilan (kosongkan untuk jumlah * harga)", "", key="sql_incremental_revenue")
+                    try:
+                        pushdown = SqlPushdown(table, SQL_SOURCES[db_type], revenue_column or None)
+                    except ValueError as e:
+                        st.error(str(e))
+                    else:
+                        # Tabel dimuat sekali, lalu hanya baris dengan tgl_transaksi >= watermark yang diambil lagi
+                        def fetch_since(watermark, db_pool=db_pool, pushdown=pushdown):
+                            with pool_manager.live_pool(db_pool).connection() as db_conn:
+                                return pushdown.fetch_rows_since(db_conn, watermark)
+                        dataset = incremental_datasets.get(f"{pushdown.dialect}:{db_pool.key}:{table}:{revenue_column}", fetch_since)
+                        warm_df = show_incremental_dataset(dataset)
+                else:
+                    query = st.text_area("Query SQL", "SELECT * FROM your_table_name")
+                    query_timeout = st.number_input("Batas Waktu Query (detik)", min_value=1, value=60, step=10, key="sql_timeout")
+                    # Query dijalankan di background (server-side cursor, diambil per batch),
+                    # jadi halaman tetap responsif dan query bisa dibatalkan
+                    query_job = st.session_state.get("query_job")
+                    if st.button("Execute Query", key="sql_execute"):
+                        if query_job is not None:
+                            query_job.cancel()
+                        query_job = query_runner.submit(db_pool, SQL_SOURCES[db_type], query, timeout=query_timeout)
+                        st.session_state["query_job"] = query_job
+                    if query_job is not None:
+                        if query_job.running and st.button("Batalkan Query", key="sql_cancel"):
+                            query_job.cancel()
+                        show_query_job(query_job)
+                        if query_job.status == 'done':
+                            warm_df = st.session_state["df"] = fingerprint_frame(prepare_dataframe(query_job.frame()))
+                            warm_up(warm_df)
+            # Tanpa dataset di halaman ini, warm-up sebelumnya dilepas
+            if warm_df is None:
+                warm_up(None)
+
         else:
             st.markdown("<h3 style='text-align: center;'>Unggah CSV / Hubungkan Database</h3>", unsafe_allow_html=True)
             if st.button("KEMBALI", key="back"):
@@ -605,6 +966,9 @@ else:
     )
     show_login_or_register()
 
+recorder.finish(metrics)
+if is_admin(st.session_state.get("username")):
+    show_instrumentation(recorder)
 
 
 #---- CHATGPT INTEGRATION ----#
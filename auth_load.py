@@ -0,0 +1,89 @@
+# Concurrency load test for the auth path: registers users in a scratch database, then
+# logs them all in at once (like staff at shift start) and reports latency and failures.
+#
+#     python auth_load.py --users 50 --rounds 3
+import argparse
+import os
+import secrets
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from auth_store import SessionTokens, UserStore
+
+
+def run_load_test(store, users=50, rounds=3, password="rahasia#1"):
+    names = [f"staff{i:04d}" for i in range(users)]
+    with ThreadPoolExecutor(max_workers=users) as sessions:
+        list(sessions.map(lambda i: store.add_user(names[i], password, f"08{i:010d}"), range(users)))
+
+    latencies, failures, tokens = [], [], []
+    lock = threading.Lock()
+    start_gate = threading.Barrier(users)
+
+    def session(name):
+        start_gate.wait()
+        for _ in range(rounds):
+            started = time.perf_counter()
+            try:
+                token = store.login(name, password)
+                ok = token is not None and store.session_user(token) == name
+            except Exception as e:
+                ok, token = False, repr(e)
+            with lock:
+                latencies.append(time.perf_counter() - started)
+                tokens.append(token)
+                if not ok:
+                    failures.append((name, token))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as sessions:
+        list(sessions.map(session, names))
+    elapsed = time.perf_counter() - started
+
+    # A rerun with the session token skips the password check entirely
+    reuse_started = time.perf_counter()
+    for token in tokens:
+        store.session_user(token)
+    reuse_elapsed = time.perf_counter() - reuse_started
+
+    latencies.sort()
+    return {
+        'logins': len(latencies),
+        'failures': len(failures),
+        'seconds': elapsed,
+        'logins_per_second': len(latencies) / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        'token_check_us': reuse_elapsed / max(len(tokens), 1) * 1e6,
+        'pool': store.pool.stats(),
+        'errors': failures[:5],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test login bersamaan pada user store")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--hash-workers", type=int, default=4)
+    parser.add_argument("--connections", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as folder:
+        # Scratch database, so a throwaway signing key is enough
+        tokens = SessionTokens(secrets.token_bytes(32))
+        store = UserStore(os.path.join(folder, "users.db"), max_connections=args.connections, hash_workers=args.hash_workers, tokens=tokens)
+        try:
+            result = run_load_test(store, args.users, args.rounds)
+        finally:
+            store.close()
+    for name, value in result.items():
+        print(f"{name:<20}{value}")
+    if result['failures']:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import base64
+import hashlib
+import hmac
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from db_pool import ConnectionPool
+
+# Lokasi database pengguna dan kunci penandatangan token sesi (lewat environment variable).
+# DASHBOARD_SECRET is required: every worker process signs and checks tokens with it, so a
+# token kept in the browser's cookie stays valid across reconnects, processes and restarts.
+USERS_DB = os.environ.get("DASHBOARD_USERS_DB", "users.db")
+SESSION_SECRET = os.environ.get("DASHBOARD_SECRET", "").encode("utf-8")
+SESSION_TTL = 12 * 60 * 60
+
+# nomor_hp is TEXT so the leading 0 of "08..." numbers is kept
+CREATE_USERS_TABLE = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL UNIQUE,
+    password TEXT NOT NULL,
+    nomor_hp TEXT NOT NULL UNIQUE,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+"""
+# Logged-out tokens (as SHA-256 digests) until they expire, shared by every worker process
+CREATE_REVOKED_TABLE = """
+CREATE TABLE IF NOT EXISTS revoked_sessions (
+    token_hash TEXT PRIMARY KEY,
+    expires_at INTEGER NOT NULL
+);
+"""
+INSERT_USER = "INSERT INTO users(username, password, nomor_hp) VALUES(?, ?, ?)"
+SELECT_PASSWORD = "SELECT password FROM users WHERE username = ?"
+INSERT_REVOKED = "INSERT OR REPLACE INTO revoked_sessions(token_hash, expires_at) VALUES(?, ?)"
+DELETE_EXPIRED_REVOKED = "DELETE FROM revoked_sessions WHERE expires_at <= ?"
+SELECT_REVOKED = "SELECT 1 FROM revoked_sessions WHERE token_hash = ?"
+
+
+# SQLite connection for the pool: WAL lets readers run alongside a writer, and
+# busy_timeout makes concurrent writers wait instead of failing with "database is locked".
+# Each pooled connection keeps its own prepared-statement cache across logins.
+def connect_users_db(path, busy_timeout=30):
+    conn = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False, cached_statements=64)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+# Bring an existing users.db up to the current schema. Databases created by the old app
+# have an `email` column (which held the phone number the form asked for) and no
+# nomor_hp; the table is rebuilt with its rows copied over, since SQLite can't rename a
+# column or drop its NOT NULL/UNIQUE constraints in place.
+def migrate_users_db(conn):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(users)")]
+        if columns and "nomor_hp" not in columns:
+            conn.execute("ALTER TABLE users RENAME TO users_lama")
+            conn.execute(CREATE_USERS_TABLE)
+            conn.execute(
+                "INSERT INTO users(id, username, password, nomor_hp, created_at) "
+                "SELECT id, username, password, email, created_at FROM users_lama"
+            )
+            conn.execute("DROP TABLE users_lama")
+        else:
+            conn.execute(CREATE_USERS_TABLE)
+        conn.execute(CREATE_REVOKED_TABLE)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def token_digest(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+# Signed session tokens "<username>.<expires>.<signature>". A token verified once is kept
+# in a bounded cache, so reruns of the same session skip the HMAC check. Revocation is
+# recorded by the UserStore in the database; forget() only drops the cached entry.
+class SessionTokens:
+    def __init__(self, secret=SESSION_SECRET, ttl=SESSION_TTL, max_entries=10000):
+        if not secret:
+            raise RuntimeError("DASHBOARD_SECRET belum diatur: token sesi butuh kunci yang sama di semua proses")
+        self.secret = secret
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._verified = OrderedDict()  # token -> (username, expires_at)
+        self._lock = threading.Lock()
+
+    def _sign(self, payload):
+        return _b64(hmac.new(self.secret, payload.encode("utf-8"), hashlib.sha256).digest())
+
+    def issue(self, username):
+        expires_at = int(time.time()) + self.ttl
+        payload = f"{_b64(username.encode('utf-8'))}.{expires_at}"
+        token = f"{payload}.{self._sign(payload)}"
+        self._remember(token, username, expires_at)
+        return token
+
+    def _remember(self, token, username, expires_at):
+        with self._lock:
+            self._verified[token] = (username, expires_at)
+            self._verified.move_to_end(token)
+            while len(self._verified) > self.max_entries:
+                self._verified.popitem(last=False)
+
+    # (username, expires_at) of a valid, unexpired token, else None
+    def check(self, token):
+        if not token:
+            return None
+        now = time.time()
+        with self._lock:
+            cached = self._verified.get(token)
+        if cached is not None:
+            return cached if cached[1] > now else None
+        try:
+            encoded_name, expires_at, signature = token.split(".")
+            expires_at = int(expires_at)
+            username = base64.urlsafe_b64decode(encoded_name + "=" * (-len(encoded_name) % 4)).decode("utf-8")
+        except (ValueError, UnicodeDecodeError):
+            return None
+        if expires_at <= now or not hmac.compare_digest(signature, self._sign(f"{encoded_name}.{expires_at}")):
+            return None
+        self._remember(token, username, expires_at)
+        return username, expires_at
+
+    def forget(self, token):
+        with self._lock:
+            self._verified.pop(token, None)
+
+
+# Thread-safe user store shared by every Streamlit session. Database access goes through
+# a small pool of WAL-mode connections, and password hashing/verification (deliberately
+# slow) runs in a bounded worker pool so a burst of logins can't starve the server.
+class UserStore:
+    def __init__(self, path=USERS_DB, max_connections=8, hash_workers=4, tokens=None):
+        self.path = path
+        self.pool = ConnectionPool(lambda: connect_users_db(path), max_size=max_connections)
+        with self.pool.connection() as conn:
+            migrate_users_db(conn)
+        self.tokens = tokens if tokens is not None else SessionTokens()
+        self._hashers = ThreadPoolExecutor(max_workers=hash_workers, thread_name_prefix="auth-hash")
+
+    def add_user(self, username, password, nomor_hp):
+        hashed_password = self._hashers.submit(generate_password_hash, password).result()
+        with self.pool.connection() as conn:
+            cur = conn.execute(INSERT_USER, (username, hashed_password, nomor_hp))
+            conn.commit()
+            return cur.lastrowid
+
+    def verify(self, username, password):
+        with self.pool.connection() as conn:
+            row = conn.execute(SELECT_PASSWORD, (username,)).fetchone()
+        if row is None:
+            return False
+        return self._hashers.submit(check_password_hash, row[0], password).result()
+
+    # Verify credentials and start a session; returns a signed token or None
+    def login(self, username, password):
+        if not self.verify(username, password):
+            return None
+        return self.tokens.issue(username)
+
+    # Username of a valid session token. The revocation lookup goes to the database every
+    # time, so a logout in one worker process is seen by all of them and survives restarts.
+    def session_user(self, token):
+        checked = self.tokens.check(token)
+        if checked is None:
+            return None
+        with self.pool.connection() as conn:
+            revoked = conn.execute(SELECT_REVOKED, (token_digest(token),)).fetchone()
+        if revoked is not None:
+            self.tokens.forget(token)
+            return None
+        return checked[0]
+
+    def logout(self, token):
+        checked = self.tokens.check(token)
+        if checked is None:
+            return
+        self.tokens.forget(token)
+        with self.pool.connection() as conn:
+            conn.execute(DELETE_EXPIRED_REVOKED, (int(time.time()),))
+            conn.execute(INSERT_REVOKED, (token_digest(token), checked[1]))
+            conn.commit()
+
+    def close(self):
+        self._hashers.shutdown(wait=False)
+        self.pool.close()
+
+
+_user_store = None
+_user_store_lock = threading.Lock()
+
+
+# The shared store is opened on first use, not at import, so importing this module
+# doesn't touch users.db or start the hashing threads
+def get_user_store():
+    global _user_store
+    with _user_store_lock:
+        if _user_store is None:
+            _user_store = UserStore()
+        return _user_store
@@ -0,0 +1,270 @@
+# Render the store dashboard of every partner store as static reports, without the UI:
+#
+#     python batch_report.py transaksi.csv --start 2023-01-01 --end 2023-03-31
+#     python batch_report.py transaksi.csv --format html png --workers 8 --output-dir laporan
+#
+# All store aggregates are computed in one pass over the rows in the date range; the
+# HTML/PNG files are then rendered across a process pool. PNG export needs kaleido.
+import argparse
+import hashlib
+import html
+import importlib.util
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from plotly.offline import get_plotlyjs
+
+import charts
+from data_loader import date_bounds, prepare_dataframe
+from parallel import WORKERS
+from periods import PERIOD_CODES, period_label_for, period_starts
+from rollup import REGION_LEVELS
+from time_index import TIME_COLUMN, date_positions, time_range
+
+FORMATS = ['html', 'png']
+# Laporan dikirim ke worker per kelompok agar overhead antar-proses kecil
+REPORTS_PER_TASK = 16
+
+
+# Per-store dashboard contents for [start_date, end_date] (end date inclusive): total
+# penjualan, rata-rata per transaksi, jumlah jenis barang, top-5 produk and revenue per
+# period. Three grouped aggregations over the filtered rows cover every store at once.
+def store_reports(df, start_date, end_date, n=5):
+    period_label = period_label_for((end_date - start_date).days)
+    lo, hi = date_positions(df, *date_bounds(start_date, end_date))
+    rows = df.iloc[lo:hi]
+    revenue = rows['total_penghasilan'] if 'total_penghasilan' in rows.columns else rows['jumlah'] * rows['harga']
+    rows = rows[REGION_LEVELS + ['nama_barang', 'jumlah', TIME_COLUMN]].assign(total_penghasilan=revenue)
+
+    summary = rows.groupby(REGION_LEVELS, observed=True).agg(
+        total_revenue=('total_penghasilan', 'sum'),
+        avg_revenue_per_transaction=('total_penghasilan', 'mean'),
+        total_unique_items=('nama_barang', 'nunique'),
+    )
+    # Stable sort on a key-ordered table keeps ties in nama_barang order, like nlargest
+    items = rows.groupby(REGION_LEVELS + ['nama_barang'], observed=True)['jumlah'].sum().reset_index()
+    items = items.sort_values(REGION_LEVELS + ['jumlah'], ascending=[True] * len(REGION_LEVELS) + [False], kind='stable')
+    items = items[items.groupby(REGION_LEVELS, observed=True, sort=False).cumcount() < n]
+    items['nama_barang'] = items['nama_barang'].astype(str)
+    periode = pd.Series(period_starts(rows[TIME_COLUMN].to_numpy(), PERIOD_CODES[period_label]), index=rows.index, name='periode')
+    periods = rows.groupby(REGION_LEVELS + [periode], observed=True)['total_penghasilan'].sum().reset_index()
+
+    top_items = _store_blocks(items, ['nama_barang', 'jumlah'])
+    revenue_by_period = _store_blocks(periods, ['periode', 'total_penghasilan'])
+    no_items = pd.DataFrame({'nama_barang': pd.Series(dtype=object), 'jumlah': pd.Series(dtype=items['jumlah'].dtype)})
+    return [
+        {
+            'path': tuple(str(name) for name in path),
+            'start_date': start_date,
+            'end_date': end_date,
+            'period_label': period_label,
+            'total_revenue': total_revenue,
+            'avg_revenue_per_transaction': avg_revenue_per_transaction,
+            'total_unique_items': int(total_unique_items),
+            'top_items': top_items.get(path, no_items),
+            'revenue_by_period': revenue_by_period[path],
+        }
+        for path, total_revenue, avg_revenue_per_transaction, total_unique_items in summary.itertuples(name=None)
+    ]
+
+
+# Split a table sorted by store into {store path: frame of columns}, one contiguous block
+# per store, slicing plain arrays instead of indexing the frame once per store
+def _store_blocks(table, columns):
+    ids = table.groupby(REGION_LEVELS, observed=True, sort=False).ngroup().to_numpy()
+    starts = np.flatnonzero(np.concatenate(([True], ids[1:] != ids[:-1])))
+    ends = np.append(starts[1:], len(ids))
+    paths = table[REGION_LEVELS].iloc[starts].itertuples(index=False, name=None)
+    values = {column: table[column].to_numpy() for column in columns}
+    return {
+        path: pd.DataFrame({column: array[start:end] for column, array in values.items()})
+        for path, start, end in zip(paths, starts, ends)
+    }
+
+
+# Readable slug of the store path plus a short hash of the full path, since different
+# paths can reduce to the same slug (e.g. "Toko A/B" and "Toko A-B")
+def report_name(path):
+    slug = re.sub(r'[^A-Za-z0-9_-]+', '_', "__".join(path)).strip('_')
+    digest = hashlib.blake2b("\x1f".join(path).encode("utf-8"), digest_size=4).hexdigest()
+    return f"{slug}_{digest}"
+
+
+REPORT_TEMPLATE = """<!DOCTYPE html>
+<html lang="id">
+<head>
+<meta charset="utf-8">
+<title>Dashboard {toko}</title>
+<style>
+body {{ font-family: 'Inter', sans-serif; margin: 24px; }}
+h1 {{ text-align: center; color: #3084da; }}
+.lokasi {{ text-align: center; color: #555; }}
+.ringkasan {{ display: flex; gap: 16px; }}
+.kotak {{ flex: 1; text-align: center; }}
+.kotak h2 {{ background-color: #76db43; color: #cf3c3e; border-radius: 15px; padding: 10px; }}
+.kotak h3 {{ color: #44905f; font-size: 32px; }}
+.grafik {{ display: flex; gap: 16px; }}
+.grafik > div {{ flex: 1; }}
+</style>
+</head>
+<body>
+<h1>DASHBOARD<br>{toko}</h1>
+<p class="lokasi">{lokasi}<br>{awal} s/d {akhir}</p>
+<div class="ringkasan">
+<div class="kotak"><h2>TOTAL PENJUALAN</h2><h3>Rp {total:,.0f}</h3></div>
+<div class="kotak"><h2>PENDAPATAN PER {periode}</h2><h3>Rp {rata_rata:,.0f}</h3></div>
+<div class="kotak"><h2>BARANG TERJUAL</h2><h3>{barang}</h3></div>
+</div>
+<div class="grafik">
+<div><h2>PRODUK TERLARIS</h2>{grafik_produk}</div>
+<div><h2>PENDAPATAN {periode}</h2>{grafik_pendapatan}</div>
+</div>
+</body>
+</html>
+"""
+
+
+# Building a figure with plotly express costs ~20x more than rendering it, so each worker
+# builds every chart layout once with the charts module and then only swaps the trace data
+_figures = {}
+
+
+def _figure(key, build, **data):
+    fig = _figures.get(key)
+    if fig is None:
+        fig = _figures[key] = build()
+        return fig
+    with fig.batch_update():
+        fig.data[0].update(**data)
+    return fig
+
+
+def store_figures(report):
+    top_items = report['top_items']
+    revenue, render_mode = charts.prepare_series(report['revenue_by_period'], 'periode', 'total_penghasilan')
+    return {
+        'produk': _figure(
+            ('produk',),
+            lambda: charts.top_items_bar(top_items, labels={'jumlah': 'jumlah terjual', 'nama_barang': 'nama_barang'}),
+            x=top_items['jumlah'], y=top_items['nama_barang'], text=top_items['jumlah'],
+        ),
+        'pendapatan': _figure(
+            ('pendapatan', report['period_label'], render_mode),
+            lambda: charts.revenue_line(revenue, report['period_label']),
+            x=revenue['periode'], y=revenue['total_penghasilan'],
+        ),
+    }
+
+
+# Render one store's report; runs in a worker process. HTML pages load plotly.js from
+# the plotly.min.js written once next to them, so the reports also open offline.
+def render_report(report, output_dir, formats):
+    name = report_name(report['path'])
+    figures = store_figures(report)
+    files = []
+    if 'html' in formats:
+        page = REPORT_TEMPLATE.format(
+            toko=html.escape(report['path'][-1]),
+            lokasi=html.escape(" / ".join(report['path'][:-1])),
+            awal=f"{report['start_date']:%d-%m-%Y}",
+            akhir=f"{report['end_date']:%d-%m-%Y}",
+            total=report['total_revenue'],
+            rata_rata=report['avg_revenue_per_transaction'],
+            periode=report['period_label'].upper(),
+            barang=report['total_unique_items'],
+            grafik_produk=figures['produk'].to_html(full_html=False, include_plotlyjs='directory'),
+            grafik_pendapatan=figures['pendapatan'].to_html(full_html=False, include_plotlyjs=False),
+        )
+        path = os.path.join(output_dir, f"{name}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(page)
+        files.append(path)
+    if 'png' in formats:
+        for chart, fig in figures.items():
+            path = os.path.join(output_dir, f"{name}_{chart}.png")
+            fig.write_image(path, width=900, height=500)
+            files.append(path)
+    return files
+
+
+def _render_batch(batch, output_dir, formats):
+    return sum(len(render_report(report, output_dir, formats)) for report in batch)
+
+
+def write_index(reports, output_dir):
+    rows = "\n".join(
+        f"<tr><td>{html.escape(' / '.join(report['path'][:-1]))}</td>"
+        f"<td><a href=\"{report_name(report['path'])}.html\">{html.escape(report['path'][-1])}</a></td>"
+        f"<td style=\"text-align: right;\">Rp {report['total_revenue']:,.0f}</td></tr>"
+        for report in sorted(reports, key=lambda report: report['total_revenue'], reverse=True)
+    )
+    with open(os.path.join(output_dir, "index.html"), "w", encoding="utf-8") as f:
+        f.write(
+            "<!DOCTYPE html>\n<html lang=\"id\">\n<head><meta charset=\"utf-8\"><title>Laporan Toko</title></head>\n<body>\n"
+            f"<h1>Laporan {len(reports):,} Toko</h1>\n<table>\n"
+            "<tr><th>Lokasi</th><th>Toko</th><th>Total Penjualan</th></tr>\n"
+            f"{rows}\n</table>\n</body>\n</html>\n"
+        )
+
+
+# Render every report across a process pool ('spawn', as in parallel.py) and return
+# the number of files written and the throughput in stores per second
+def render_reports(reports, output_dir, formats=('html',), workers=WORKERS):
+    os.makedirs(output_dir, exist_ok=True)
+    if 'html' in formats:
+        with open(os.path.join(output_dir, "plotly.min.js"), "w", encoding="utf-8") as f:
+            f.write(get_plotlyjs())
+        write_index(reports, output_dir)
+
+    batches = [reports[i:i + REPORTS_PER_TASK] for i in range(0, len(reports), REPORTS_PER_TASK)]
+    started = time.perf_counter()
+    if workers <= 1:
+        files = sum(_render_batch(batch, output_dir, formats) for batch in batches)
+    else:
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            files = sum(pool.map(_render_batch, batches, [output_dir] * len(batches), [formats] * len(batches)))
+    seconds = time.perf_counter() - started
+    return {'stores': len(reports), 'files': files, 'seconds': seconds, 'stores_per_second': len(reports) / seconds if seconds else 0.0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render laporan dashboard untuk setiap toko tanpa UI")
+    parser.add_argument("csv", help="File CSV transaksi")
+    parser.add_argument("--start", help="Tanggal mulai (YYYY-MM-DD, default: awal data)")
+    parser.add_argument("--end", help="Tanggal selesai, ikut dihitung (YYYY-MM-DD, default: akhir data)")
+    parser.add_argument("--output-dir", default="laporan", help="Folder hasil laporan")
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=['html'], dest="formats")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Jumlah proses render")
+    parser.add_argument("--limit", type=int, default=None, help="Hanya render N toko pertama")
+    args = parser.parse_args(argv)
+
+    if 'png' in args.formats and importlib.util.find_spec("kaleido") is None:
+        parser.error("format png membutuhkan paket kaleido (pip install kaleido)")
+
+    started = time.perf_counter()
+    df = prepare_dataframe(pd.read_csv(args.csv))
+    first_date, last_date = time_range(df)
+    if first_date is None:
+        parser.error("file CSV tidak berisi data transaksi")
+    start_date = pd.Timestamp(args.start).date() if args.start else first_date.date()
+    end_date = pd.Timestamp(args.end).date() if args.end else last_date.date()
+    loaded = time.perf_counter()
+
+    stores = store_reports(df, start_date, end_date)
+    computed = time.perf_counter()
+    reports = stores[:args.limit]
+    result = render_reports(reports, args.output_dir, args.formats, args.workers)
+
+    print(f"{len(df):,} baris dimuat dalam {loaded - started:.2f} s")
+    print(f"{len(stores):,} toko dihitung dalam {computed - loaded:.2f} s ({len(stores) / max(computed - loaded, 1e-9):,.0f} toko/s)")
+    print(f"{result['files']:,} file dirender dalam {result['seconds']:.2f} s ({result['stores_per_second']:,.1f} toko/s, {args.workers} proses)")
+    print(f"Laporan: {os.path.abspath(args.output_dir)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+# Benchmark the dashboard pipeline on synthetic transaction data:
+#
+#     python benchmark.py --rows 10000 1000000 --output results.json
+#     python benchmark.py --generate transaksi.csv --rows 5000000
+#
+# Each scale writes a synthetic CSV (tgl_transaksi as %d/%m/%Y %H:%M) and times every
+# pipeline stage on it, with the Python heap peak per stage from tracemalloc.
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+import charts
+from compute_graph import build_dashboard_graph
+from data_loader import DATE_FORMAT, prepare_dataframe
+from periods import PERIOD_CODES, PeriodBuckets
+from prefix_sums import get_prefix_index
+from parallel import ParallelAggregator, aggregator as default_aggregator
+from region_index import RegionIndex
+from rollup import RollupCube
+from sketches import SKETCH_LEVELS, SketchIndex
+from time_index import date_positions, time_range
+
+SCALES = [10000, 100000, 1000000, 10000000, 50000000]
+CHUNK_ROWS = 1000000
+
+
+# Synthetic transactions with the dashboard schema. Region names are nested
+# (province -> district -> village -> store) and item popularity follows a Zipf
+# law, so top-N queries have realistic skew. The same seed gives the same data.
+def generate_chunks(rows, seed=0, provinces=10, districts=8, villages=6, stores=3, items=200,
+                    start='2023-01-01', days=365, chunk_rows=CHUNK_ROWS):
+    rng = np.random.default_rng(seed)
+    store_count = provinces * districts * villages * stores
+    store_ids = np.arange(store_count)
+    propinsi = np.array([f"Provinsi {i // (districts * villages * stores):02d}" for i in store_ids])
+    kabupaten = np.array([f"Kabupaten {i // (villages * stores):03d}" for i in store_ids])
+    kelurahan = np.array([f"Kelurahan {i // stores:04d}" for i in store_ids])
+    nama_toko = np.array([f"Toko {i:05d}" for i in store_ids])
+    item_names = np.array([f"Barang {i:04d}" for i in range(items)])
+    item_prices = rng.integers(5, 500, items) * 1000
+    item_weights = 1.0 / np.arange(1, items + 1)
+    item_weights /= item_weights.sum()
+    start_minute = pd.Timestamp(start).value // 60_000_000_000
+
+    for offset in range(0, rows, chunk_rows):
+        n = min(chunk_rows, rows - offset)
+        store = rng.integers(0, store_count, n)
+        item = rng.choice(items, n, p=item_weights)
+        minutes = start_minute + rng.integers(0, days * 24 * 60, n)
+        yield pd.DataFrame({
+            'tgl_transaksi': pd.to_datetime(minutes, unit='m'),
+            'propinsi': propinsi[store],
+            'kabupaten': kabupaten[store],
+            'kelurahan': kelurahan[store],
+            'nama_toko': nama_toko[store],
+            'nama_barang': item_names[item],
+            'jumlah': rng.integers(1, 11, n),
+            'harga': item_prices[item],
+        })
+
+
+def generate_transactions(rows, seed=0, **options):
+    return pd.concat(generate_chunks(rows, seed, **options), ignore_index=True)
+
+
+def write_csv(path, rows, seed=0, **options):
+    for i, chunk in enumerate(generate_chunks(rows, seed, **options)):
+        chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False, date_format=DATE_FORMAT)
+    return path
+
+
+class StageTimer:
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.results = []
+
+    # Time one stage; the peak is the Python heap high-water mark above the level at stage start
+    @contextmanager
+    def stage(self, name, rows=None):
+        if self.trace_memory:
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+        started = time.perf_counter()
+        yield
+        seconds = time.perf_counter() - started
+        result = {'stage': name, 'rows': rows, 'seconds': round(seconds, 4)}
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            result['peak_mb'] = round((peak - before) / 1e6, 2)
+            result['retained_mb'] = round((current - before) / 1e6, 2)
+        self.results.append(result)
+
+
+# Run every pipeline stage once on a CSV file, in the order the dashboard runs them
+def run_pipeline(path, trace_memory=True, aggregator=default_aggregator):
+    timer = StageTimer(trace_memory)
+    with timer.stage('parse'):
+        df = prepare_dataframe(pd.read_csv(path))
+    df.attrs['dataset_key'] = os.path.basename(path)
+    rows = len(df)
+    timer.results[-1]['rows'] = rows
+
+    # The middle half of the data, like a user narrowing the sidebar date range
+    first_date, last_date = time_range(df)
+    span = last_date - first_date
+    start, end = first_date + span / 4, last_date - span / 4
+    with timer.stage('date_filter', rows):
+        lo, hi = date_positions(df, start, end)
+        filtered = df.iloc[lo:hi]
+
+    with timer.stage('bucketing', len(filtered)):
+        buckets = PeriodBuckets(df)
+        for code in PERIOD_CODES.values():
+            buckets.get(code, lo, hi)
+
+    with timer.stage('drill_down_filter', rows):
+        index = RegionIndex(df)
+        path = ()
+        for _ in range(4):
+            path += (index.options(path, lo, hi)[0],)
+        index.subset(path, lo, hi)
+
+    with timer.stage('top_n', rows):
+        cube = RollupCube(df, aggregator=aggregator)
+        for depth in range(4):
+            top_items = cube.top_items(start, end, path[:depth])
+            top_stores = cube.top_stores(start, end, path[:depth])
+
+    # Approximate mode for the same top-n queries down to the district level
+    with timer.stage('sketches', rows):
+        sketch_index = SketchIndex(df)
+        for depth in range(len(SKETCH_LEVELS) + 1):
+            sketch_index.top_items(start, end, path[:depth])
+            sketch_index.top_stores(start, end, path[:depth])
+
+    graph = build_dashboard_graph()
+    ctx = {'df': df, 'dataset_key': df.attrs['dataset_key'], 'date_range': (start, end), 'period_code': 'D', 'path': ()}
+    with timer.stage('prefix_sums', rows):
+        prefix_index = get_prefix_index(df)
+        prefix_index.compare((start, end), (first_date, start), path)
+
+    with timer.stage('revenue_by_period', len(filtered)):
+        revenue_by_period = graph.get('revenue_by_period', ctx)
+
+    with timer.stage('figure_build', len(revenue_by_period)):
+        figures = [
+            charts.revenue_line(revenue_by_period, 'Harian'),
+            charts.top_items_bar(top_items),
+            charts.top_stores_bar(top_stores),
+        ]
+        payload = sum(len(fig.to_json()) for fig in figures)
+    timer.results[-1]['payload_kb'] = round(payload / 1e3, 1)
+    return timer.results
+
+
+def _print_results(rows, results):
+    print(f"\n{rows:,} baris")
+    for result in results:
+        memory = f"{result['peak_mb']:>9.1f} MB" if 'peak_mb' in result else ""
+        print(f"  {result['stage']:<20}{result['seconds']:>10.3f} s{memory}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pipeline dashboard dengan data sintetis")
+    parser.add_argument("--rows", type=int, nargs="+", default=SCALES[:3], help="Jumlah baris per skala")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--generate", metavar="CSV", help="Hanya tulis file CSV sintetis (skala pertama)")
+    parser.add_argument("--csv-dir", default=None, help="Folder untuk file CSV sintetis (default: folder sementara)")
+    parser.add_argument("--keep-csv", action="store_true", help="Jangan hapus file CSV setelah benchmark")
+    parser.add_argument("--no-memory", action="store_true", help="Tanpa tracemalloc (waktu lebih akurat)")
+    parser.add_argument("--workers", type=int, default=None, help="Jumlah proses agregasi paralel")
+    parser.add_argument("--output", help="Simpan hasil sebagai JSON")
+    args = parser.parse_args(argv)
+
+    if args.generate:
+        write_csv(args.generate, args.rows[0], args.seed)
+        return
+
+    aggregator = default_aggregator if args.workers is None else ParallelAggregator(args.workers)
+    # Import plotly's figure machinery once so the first figure_build isn't charged for it
+    charts.top_items_bar(pd.DataFrame({'jumlah': [1], 'nama_barang': ['-']})).to_json()
+
+    report = []
+    csv_dir = args.csv_dir or tempfile.gettempdir()
+    for rows in args.rows:
+        path = os.path.join(csv_dir, f"benchmark_{rows}_{args.seed}.csv")
+        if not os.path.exists(path):
+            write_csv(path, rows, args.seed)
+        try:
+            results = run_pipeline(path, trace_memory=not args.no_memory, aggregator=aggregator)
+        finally:
+            if not args.keep_csv:
+                os.remove(path)
+        _print_results(rows, results)
+        report.append({'rows': rows, 'seed': args.seed, 'stages': results})
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import numpy as np
+import plotly.express as px
+
+BAR_COLOR = '#76db43'
+# Time series longer than this are downsampled: a chart is ~1-2k pixels wide,
+# so more points only add payload without adding visible detail
+POINT_BUDGET = 2000
+# Above this many points the line is drawn with WebGL (scattergl) instead of SVG
+WEBGL_THRESHOLD = 1000
+ITEM_LABELS = {'jumlah': 'Jumlah Terjual', 'nama_barang': 'Nama Barang'}
+STORE_LABELS = {'total_penghasilan': 'Total Penghasilan (Rp)', 'nama_toko': 'Nama Toko'}
+
+
+# Grafik barang terlaris (batang horizontal, sumbu x dibalik)
+def top_items_bar(top_items, texttemplate='%{text:.2s}', labels=ITEM_LABELS):
+    fig = px.bar(
+        top_items,
+        x='jumlah',
+        y='nama_barang',
+        orientation='h',
+        labels=labels,
+        text='jumlah',
+        color_discrete_sequence=[BAR_COLOR]
+    )
+    fig.update_traces(texttemplate=texttemplate, textposition='outside', marker=dict(color=BAR_COLOR))
+    fig.update_layout(xaxis=dict(autorange="reversed"))
+    return fig
+
+
+# Grafik toko dengan pendapatan terbesar. reverse_axis memilih sumbu yang dibalik,
+# fit_range mengatur range sumbu x dari 0 ke 110% nilai total_penghasilan terbesar
+def top_stores_bar(top_stores, texttemplate='%{text:,.0f}', reverse_axis='x', fit_range=False):
+    fig = px.bar(
+        top_stores,
+        x='total_penghasilan',
+        y='nama_toko',
+        orientation='h',
+        labels=STORE_LABELS,
+        text='total_penghasilan',
+        color_discrete_sequence=[BAR_COLOR]
+    )
+    fig.update_traces(texttemplate=texttemplate, textposition='outside', marker=dict(color=BAR_COLOR))
+    if reverse_axis == 'y':
+        fig.update_layout(xaxis=dict(autorange=False), yaxis=dict(autorange="reversed"))
+    else:
+        fig.update_layout(xaxis=dict(autorange="reversed"))
+    if fit_range:
+        fig.update_layout(xaxis_range=[0, top_stores['total_penghasilan'].max() * 1.1])
+    return fig
+
+
+# Largest-Triangle-Three-Buckets: indices of `threshold` points that keep the visual
+# shape of the series (first and last point always kept, one point per bucket between)
+def lttb_indices(x, y, threshold):
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    bucket = (n - 2) / (threshold - 2)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = int(i * bucket) + 1, int((i + 1) * bucket) + 1
+        next_end = min(int((i + 2) * bucket) + 1, n)
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+# Downsample a time series frame to the point budget and pick the render mode for px.line
+def prepare_series(frame, x, y, budget=POINT_BUDGET):
+    if len(frame) > budget:
+        times = frame[x].to_numpy()
+        if np.issubdtype(times.dtype, np.datetime64):
+            times = times.astype('datetime64[ns]').astype(np.int64)
+        frame = frame.iloc[lttb_indices(times, frame[y].to_numpy(), budget)]
+    render_mode = 'webgl' if len(frame) > WEBGL_THRESHOLD else 'svg'
+    return frame, render_mode
+
+
+# Grafik garis pendapatan per periode (Harian/Mingguan/Bulanan)
+def revenue_line(revenue_by_period, period_label):
+    revenue_by_period, render_mode = prepare_series(revenue_by_period, 'periode', 'total_penghasilan')
+    fig = px.line(
+        revenue_by_period,
+        x='periode',
+        y='total_penghasilan',
+        markers=True,
+        labels={'total_penghasilan': 'Total Penghasilan (Rp)', 'periode': period_label},
+        line_shape='linear',
+        color_discrete_sequence=[BAR_COLOR],
+        render_mode=render_mode
+    )
+    fig.update_layout(xaxis_title=f'Penghasilan {period_label}', yaxis_title='Total Penghasilan (Rp)')
+    fig.update_xaxes(dtick="M1", tickformat="%d/%m/%Y", tickangle=45)
+    return fig
@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.ipc
+
+from data_loader import LRUCache
+from encoding import encode_columns
+from time_index import time_range
+
+# Folder penyimpanan dataset kolumnar (bisa diganti lewat environment variable)
+DATA_DIR = os.environ.get("DASHBOARD_DATA_DIR", "datasets")
+CATALOG_FILE = "catalog.json"
+
+
+# On-disk columnar store for prepared datasets. Each dataset is one uncompressed
+# Arrow IPC file that is opened memory-mapped, so numeric/datetime columns are views
+# on the OS page cache shared by every session and process instead of private copies.
+# catalog.json lists stored datasets so they can be reopened without uploading again.
+class ColumnStore:
+    def __init__(self, root=DATA_DIR, max_open=4):
+        self.root = root
+        self._lock = threading.Lock()
+        self._open = LRUCache(max_entries=max_open)
+
+    def _path(self, key):
+        return os.path.join(self.root, f"{key}.arrow")
+
+    def _read_catalog(self):
+        try:
+            with open(os.path.join(self.root, CATALOG_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _write_catalog(self, catalog):
+        path = os.path.join(self.root, CATALOG_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(catalog, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def catalog(self):
+        with self._lock:
+            entries = list(self._read_catalog().values())
+        return sorted(entries, key=lambda entry: entry["created_at"], reverse=True)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._read_catalog() and os.path.exists(self._path(key))
+
+    # Write a prepared frame once; later saves of the same key are no-ops
+    def save(self, df, key, name):
+        if key in self:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+
+        first_date, last_date = time_range(df) if 'tgl_transaksi' in df.columns else (None, None)
+        entry = {
+            "key": key,
+            "name": name,
+            "rows": len(df),
+            "columns": list(df.columns),
+            "size_bytes": os.path.getsize(path),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "start": first_date.isoformat() if first_date is not None else None,
+            "end": last_date.isoformat() if last_date is not None else None,
+        }
+        with self._lock:
+            catalog = self._read_catalog()
+            catalog[key] = entry
+            self._write_catalog(catalog)
+
+    # Open a stored dataset memory-mapped; the frame is shared by all sessions in the process
+    def open(self, key):
+        df = self._open.get(key)
+        if df is None:
+            source = pa.memory_map(self._path(key), "r")
+            table = pa.ipc.open_file(source).read_all()
+            # Arrow dictionary columns come back as categoricals; intern their vocabularies
+            df = encode_columns(table.to_pandas(split_blocks=True))
+            df.attrs['dataset_key'] = key
+            self._open.put(key, df)
+        return df
+
+    def delete(self, key):
+        with self._lock:
+            catalog = self._read_catalog()
+            catalog.pop(key, None)
+            self._write_catalog(catalog)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+dataset_store = ColumnStore()
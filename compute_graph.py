@@ -0,0 +1,164 @@
+from contextlib import nullcontext
+
+from data_loader import LRUCache
+from prefix_sums import get_prefix_index
+from region_index import get_region_index
+from rollup import get_cube, top_by
+from sketches import get_sketch_index
+from time_index import date_positions
+
+_MISSING = object()
+
+
+# Dependency-tracked computation graph. Each node declares the context inputs it reads
+# and the nodes it depends on; its memo key is its own input values plus the keys of its
+# dependencies, so after a widget change only the nodes downstream of it are recomputed.
+# Nodes registered with shared=True are also looked up in a process-wide shared_cache
+# under (name,) + key, so other sessions viewing the same dataset reuse their results.
+# When a recorder is attached, every node that is actually computed is timed as a stage.
+class ComputeGraph:
+    def __init__(self, memo_size=8, shared_cache=None):
+        self.memo_size = memo_size
+        self.shared_cache = shared_cache
+        self.recorder = None
+        self._nodes = {}
+        self._shared = set()
+        self._memo = {}
+        self.computed = {}
+
+    def node(self, name, deps=(), inputs=(), shared=False):
+        def register(func):
+            self._nodes[name] = (func, tuple(deps), tuple(inputs))
+            if shared:
+                self._shared.add(name)
+            self._memo[name] = LRUCache(max_entries=self.memo_size)
+            self.computed[name] = 0
+            return func
+        return register
+
+    def key(self, name, ctx):
+        _, deps, inputs = self._nodes[name]
+        return tuple(ctx[i] for i in inputs) + tuple(self.key(dep, ctx) for dep in deps)
+
+    def get(self, name, ctx):
+        func, deps, _ = self._nodes[name]
+        # Frames without a dataset fingerprint can't be told apart, so their results
+        # are neither memoized nor shared: they are always computed from ctx['df']
+        if ctx.get('dataset_key') is None:
+            return self._compute(name, func, deps, ctx)
+        key = self.key(name, ctx)
+        memo = self._memo[name]
+        result = memo.get(key, _MISSING)
+        if result is _MISSING:
+            shared = self.shared_cache is not None and name in self._shared
+            if shared:
+                result = self.shared_cache.get((name,) + key, _MISSING)
+            if result is _MISSING:
+                result = self._compute(name, func, deps, ctx)
+                if shared:
+                    self.shared_cache.put((name,) + key, result)
+            memo.put(key, result)
+        return result
+
+    def _compute(self, name, func, deps, ctx):
+        results = {dep: self.get(dep, ctx) for dep in deps}
+        stage = self.recorder.stage(f"graph.{name}") if self.recorder is not None else nullcontext({})
+        with stage as span:
+            result = func(ctx, **results)
+            if hasattr(result, '__len__') and not isinstance(result, (dict, tuple)):
+                span['rows'] = len(result)
+        self.computed[name] += 1
+        return result
+
+    def stats(self):
+        return {name: dict(memo.stats(), computed=self.computed[name]) for name, memo in self._memo.items()}
+
+
+# Nodes behind the CSV dashboard. The context holds the dataset ('df', 'dataset_key'),
+# the [start, end) 'date_range' and 'compare_range', the 'period_code' and the selected region 'path'.
+# Everything but the row-level nodes is small enough to share across sessions.
+def build_dashboard_graph(memo_size=8, shared_cache=None):
+    graph = ComputeGraph(memo_size, shared_cache)
+
+    @graph.node('rows', inputs=('dataset_key', 'date_range'))
+    def rows(ctx):
+        return date_positions(ctx['df'], *ctx['date_range'])
+
+    # Range totals come from the per-node prefix sums, so they cost the same for any date range
+    @graph.node('revenue_by_period', inputs=('dataset_key', 'date_range', 'period_code', 'path'), shared=True)
+    def revenue_by_period(ctx):
+        return get_prefix_index(ctx['df']).revenue_by_period(ctx['period_code'], *ctx['date_range'], ctx['path'])
+
+    @graph.node('options', deps=('rows',), inputs=('dataset_key', 'path'), shared=True)
+    def options(ctx, rows):
+        return get_region_index(ctx['df'], ctx['dataset_key']).options(ctx['path'], *rows)
+
+    @graph.node('top_items', inputs=('dataset_key', 'date_range', 'path'), shared=True)
+    def top_items(ctx):
+        return get_cube(ctx['df']).top_items(*ctx['date_range'], ctx['path'])
+
+    @graph.node('top_stores', inputs=('dataset_key', 'date_range', 'path'), shared=True)
+    def top_stores(ctx):
+        return get_cube(ctx['df']).top_stores(*ctx['date_range'], ctx['path'])
+
+    @graph.node('store_summary', inputs=('dataset_key', 'date_range', 'path'), shared=True)
+    def store_summary(ctx):
+        totals = get_prefix_index(ctx['df']).totals(*ctx['date_range'], ctx['path'])
+        return {
+            'total_revenue': totals['total_penghasilan'],
+            'avg_revenue_per_transaction': totals['rata_rata_penghasilan'],
+            'total_unique_items': int(get_cube(ctx['df']).summary(*ctx['date_range'], ctx['path'])['jumlah_barang']),
+        }
+
+    # The selected range against the comparison range ('compare_range'), with growth in percent
+    @graph.node('period_comparison', inputs=('dataset_key', 'date_range', 'compare_range', 'path'), shared=True)
+    def period_comparison(ctx):
+        return get_prefix_index(ctx['df']).compare(ctx['date_range'], ctx['compare_range'], ctx['path'])
+
+    @graph.node('store_growth', inputs=('dataset_key', 'date_range', 'compare_range', 'path'), shared=True)
+    def store_growth(ctx):
+        return get_prefix_index(ctx['df']).store_growth(ctx['date_range'], ctx['compare_range'], ctx['path'])
+
+    # Approximate mode: heavy-hitter and HyperLogLog sketches for the national, province and
+    # district pages, exact aggregates over the selected rows below them (no rollup cube)
+    @graph.node('top_items_approx', inputs=('dataset_key', 'date_range', 'path'), shared=True)
+    def top_items_approx(ctx):
+        return get_sketch_index(ctx['df']).top_items(*ctx['date_range'], ctx['path'])
+
+    @graph.node('top_stores_approx', inputs=('dataset_key', 'date_range', 'path'), shared=True)
+    def top_stores_approx(ctx):
+        return get_sketch_index(ctx['df']).top_stores(*ctx['date_range'], ctx['path'])
+
+    @graph.node('distinct_items_approx', inputs=('dataset_key', 'date_range', 'path'), shared=True)
+    def distinct_items_approx(ctx):
+        return get_sketch_index(ctx['df']).distinct_items(*ctx['date_range'], ctx['path'])
+
+    @graph.node('region_rows', deps=('rows',), inputs=('dataset_key', 'path'))
+    def region_rows(ctx, rows):
+        region_df = get_region_index(ctx['df'], ctx['dataset_key']).subset(ctx['path'], *rows)
+        if 'total_penghasilan' not in region_df.columns:
+            region_df['total_penghasilan'] = region_df['jumlah'] * region_df['harga']
+        return region_df
+
+    @graph.node('top_items_rows', deps=('region_rows',), shared=True)
+    def top_items_rows(ctx, region_rows):
+        return top_by(region_rows, 'nama_barang', 'jumlah')
+
+    @graph.node('top_stores_rows', deps=('region_rows',), shared=True)
+    def top_stores_rows(ctx, region_rows):
+        return top_by(region_rows, 'nama_toko', 'total_penghasilan')
+
+    @graph.node('distinct_items_rows', deps=('region_rows',), shared=True)
+    def distinct_items_rows(ctx, region_rows):
+        return {'estimate': int(region_rows['nama_barang'].nunique()), 'relative_error': 0.0}
+
+    @graph.node('store_summary_rows', deps=('region_rows',), inputs=('date_range', 'path'), shared=True)
+    def store_summary_rows(ctx, region_rows):
+        totals = get_prefix_index(ctx['df']).totals(*ctx['date_range'], ctx['path'])
+        return {
+            'total_revenue': totals['total_penghasilan'],
+            'avg_revenue_per_transaction': totals['rata_rata_penghasilan'],
+            'total_unique_items': int(region_rows['nama_barang'].nunique()),
+        }
+
+    return graph
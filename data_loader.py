@@ -0,0 +1,148 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from encoding import encode_columns
+from time_index import sort_by_time
+
+# Format tanggal pada file CSV transaksi
+DATE_FORMAT = '%d/%m/%Y %H:%M'
+NUMERIC_COLUMNS = ['jumlah', 'harga']
+
+
+# Bounded LRU cache with hit/miss counters, shared by every session in the process
+class LRUCache:
+    def __init__(self, max_entries=4):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._building = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    # Value for key, built by build() on a miss. Callers missing the same key at the same
+    # time (e.g. the warm-up thread and a UI rerun right after a load) wait for the first
+    # caller's build instead of running it again; a failed build lets the next one retry.
+    def get_or_build(self, key, build):
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            building = self._building.setdefault(key, threading.Lock())
+        try:
+            with building:
+                with self._lock:
+                    value = self._entries.get(key)
+                if value is None:
+                    value = build()
+                    self.put(key, value)
+                return value
+        finally:
+            with self._lock:
+                if self._building.get(key) is building:
+                    del self._building[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+
+_csv_cache = LRUCache(max_entries=4)
+
+
+# Hash the raw bytes of an uploaded file so identical uploads share one cache entry
+def content_hash(uploaded_file):
+    if hasattr(uploaded_file, "getvalue"):
+        data = uploaded_file.getvalue()
+    else:
+        position = uploaded_file.tell()
+        data = uploaded_file.read()
+        uploaded_file.seek(position)
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+# Coerce column dtypes once so later reruns don't repeat the conversion,
+# and sort by transaction time so date filters become binary-searched slices
+def prepare_dataframe(df):
+    if 'tgl_transaksi' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['tgl_transaksi']):
+        df['tgl_transaksi'] = pd.to_datetime(df['tgl_transaksi'], format=DATE_FORMAT, dayfirst=True)
+    for column in NUMERIC_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+    df = encode_columns(df)
+    if 'tgl_transaksi' in df.columns:
+        df = sort_by_time(df)
+    return df
+
+
+# Parse an uploaded CSV once per unique content and serve it from the cache afterwards.
+# With a columnar store, the prepared frame is persisted and served memory-mapped,
+# and a file that was converted before is reopened from the store without parsing.
+def load_csv(uploaded_file, cache=_csv_cache, store=None):
+    key = content_hash(uploaded_file)
+    df = cache.get(key)
+    if df is None:
+        if store is not None and key in store:
+            df = store.open(key)
+        else:
+            if hasattr(uploaded_file, "seek"):
+                uploaded_file.seek(0)
+            df = prepare_dataframe(pd.read_csv(uploaded_file))
+            df.attrs['dataset_key'] = key
+            if store is not None:
+                store.save(df, key, getattr(uploaded_file, "name", key))
+                df = store.open(key)
+        cache.put(key, df)
+    return df
+
+
+# Content fingerprint for frames that don't come from an uploaded file (database loads),
+# so every cache keyed on dataset_key can tell them apart. Set once per frame.
+def fingerprint_frame(df):
+    if df.attrs.get('dataset_key') is None:
+        digest = hashlib.blake2b(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes(), digest_size=16)
+        digest.update("\x1f".join(map(str, df.columns)).encode("utf-8"))
+        df.attrs['dataset_key'] = digest.hexdigest()
+    return df
+
+
+# Convert the sidebar dates to [start, end) timestamps; the end date is included as a whole day
+def date_bounds(start_date, end_date):
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+    return start, end
+
+
+def cache_stats(cache=_csv_cache):
+    return cache.stats()
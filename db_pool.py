@@ -0,0 +1,290 @@
+import atexit
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+# Raised by acquire() on a pool that was closed; the manager can hand out a live one
+class PoolClosedError(RuntimeError):
+    pass
+
+
+# Default health check for DB-API connections
+def ping_sql(conn):
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT 1")
+        cur.fetchall()
+    finally:
+        cur.close()
+
+
+# Bounded, thread-safe pool of DB-API connections shared by every Streamlit session.
+# Idle connections are health-checked before reuse and closed after idle_timeout seconds.
+class ConnectionPool:
+    def __init__(self, factory, max_size=5, idle_timeout=300, acquire_timeout=30,
+                 health_check=ping_sql, health_check_interval=30, key=None):
+        self.factory = factory
+        self.key = key
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.health_check = health_check
+        self.health_check_interval = health_check_interval
+        self._idle = []  # (conn, released_at), most recently released last
+        self._in_use = 0
+        self._closed = False
+        self._last_used = time.monotonic()
+        self._cond = threading.Condition()
+        self._stats = {"created": 0, "reused": 0, "closed": 0, "waits": 0, "health_check_failures": 0}
+
+    def _evict_idle_locked(self, now):
+        keep = []
+        for conn, released_at in self._idle:
+            if now - released_at > self.idle_timeout:
+                _close_quietly(conn)
+                self._stats["closed"] += 1
+            else:
+                keep.append((conn, released_at))
+        self._idle = keep
+
+    def _healthy(self, conn, released_at):
+        if self.health_check is None or time.monotonic() - released_at < self.health_check_interval:
+            return True
+        try:
+            self.health_check(conn)
+            return True
+        except Exception:
+            return False
+
+    def acquire(self):
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            conn = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolClosedError("Connection pool sudah ditutup")
+                    now = time.monotonic()
+                    self._evict_idle_locked(now)
+                    # Reserve the slot before the health check / handshake so the lock can be released
+                    if self._idle:
+                        conn, released_at = self._idle.pop()
+                        self._in_use += 1
+                        self._last_used = now
+                        break
+                    if self._in_use < self.max_size:
+                        self._in_use += 1
+                        self._last_used = now
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise TimeoutError(f"Tidak ada koneksi tersedia dalam {self.acquire_timeout} detik")
+                    self._stats["waits"] += 1
+                    self._cond.wait(remaining)
+
+            if conn is None:
+                try:
+                    conn = self.factory()
+                except Exception:
+                    with self._cond:
+                        self._in_use -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._stats["created"] += 1
+                return conn
+
+            if self._healthy(conn, released_at):
+                with self._cond:
+                    self._stats["reused"] += 1
+                return conn
+
+            _close_quietly(conn)
+            with self._cond:
+                self._in_use -= 1
+                self._stats["closed"] += 1
+                self._stats["health_check_failures"] += 1
+                self._cond.notify()
+
+    def release(self, conn, discard=False):
+        if not discard and hasattr(conn, "rollback"):
+            # Don't leave a read transaction open on an idle pooled connection
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+        with self._cond:
+            self._in_use -= 1
+            self._last_used = time.monotonic()
+            if discard or self._closed:
+                _close_quietly(conn)
+                self._stats["closed"] += 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            self.release(conn, discard=True)
+            raise
+        else:
+            self.release(conn)
+
+    def evict_idle(self):
+        with self._cond:
+            self._evict_idle_locked(time.monotonic())
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            for conn, _ in self._idle:
+                _close_quietly(conn)
+                self._stats["closed"] += 1
+            self._idle = []
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    # Whether the pool holds no connections and nobody borrowed one for `idle_for` seconds
+    def abandoned(self, idle_for):
+        with self._cond:
+            return self._in_use == 0 and not self._idle and time.monotonic() - self._last_used > idle_for
+
+    # Whether the pool never opened a connection and nobody is acquiring one
+    def unused(self):
+        with self._cond:
+            return self._stats["created"] == 0 and self._in_use == 0
+
+    def stats(self):
+        with self._cond:
+            return dict(self._stats, in_use=self._in_use, idle=len(self._idle), max_size=self.max_size)
+
+
+# Process-wide registry of pools keyed on (type, host, database, user, password fingerprint).
+# The password fingerprint keeps a wrong password from borrowing an authenticated connection.
+# A reaper thread (started with the first pool) closes idle connections past idle_timeout
+# every reap_interval seconds, also in pools nobody borrows from any more, and drops pools
+# left without connections; sessions still holding a dropped pool get a new one from live_pool().
+class PoolManager:
+    def __init__(self, max_size=5, idle_timeout=300, reap_interval=60):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.reap_interval = reap_interval
+        self._pools = {}
+        self._shared = {}
+        self._lock = threading.Lock()
+        self._reaper_stop = None
+
+    @staticmethod
+    def make_key(kind, host, dbname, user, password=""):
+        fingerprint = hashlib.sha256((password or "").encode("utf-8")).hexdigest()[:16]
+        return (kind, host, dbname, user, fingerprint)
+
+    def get_pool(self, key, factory, **options):
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None or pool._closed:
+                options.setdefault("max_size", self.max_size)
+                options.setdefault("idle_timeout", self.idle_timeout)
+                pool = self._pools[key] = ConnectionPool(factory, key=key, **options)
+            self._start_reaper_locked()
+            return pool
+
+    # The open pool for the key a pool was registered under: the pool itself while it is
+    # open, otherwise the one registered since or a new one with the same factory/settings
+    def live_pool(self, pool):
+        if not pool.closed:
+            return pool
+        return self.get_pool(pool.key, pool.factory, max_size=pool.max_size, idle_timeout=pool.idle_timeout,
+                             acquire_timeout=pool.acquire_timeout, health_check=pool.health_check,
+                             health_check_interval=pool.health_check_interval)
+
+    # One shared client per key for drivers that pool internally and are thread-safe (MongoClient)
+    def get_shared(self, key, factory):
+        with self._lock:
+            client = self._shared.get(key)
+            if client is None:
+                client = self._shared[key] = factory()
+            return client
+
+    def close_pool(self, key):
+        with self._lock:
+            pool = self._pools.pop(key, None)
+        if pool is not None:
+            pool.close()
+
+    # Drop a pool after a failed first connect, but only if it is still the registered pool
+    # and never opened a connection; a pool other sessions already use stays open
+    def discard_unused(self, key, pool):
+        with self._lock:
+            if self._pools.get(key) is not pool or not pool.unused():
+                return False
+            del self._pools[key]
+        pool.close()
+        return True
+
+    def _start_reaper_locked(self):
+        if self._reaper_stop is not None or not self.reap_interval:
+            return
+        stop = self._reaper_stop = threading.Event()
+
+        def loop():
+            while not stop.wait(self.reap_interval):
+                self.reap()
+
+        threading.Thread(target=loop, name="pool-reaper", daemon=True).start()
+
+    # Close expired idle connections everywhere, then drop pools with no connections left
+    # that nobody has borrowed from for idle_timeout seconds
+    def reap(self):
+        with self._lock:
+            items = list(self._pools.items())
+        for _, pool in items:
+            pool.evict_idle()
+        dropped = []
+        with self._lock:
+            for key, pool in items:
+                if self._pools.get(key) is pool and pool.abandoned(self.idle_timeout):
+                    del self._pools[key]
+                    dropped.append(pool)
+        for pool in dropped:
+            pool.close()
+        return len(dropped)
+
+    def close_all(self):
+        with self._lock:
+            if self._reaper_stop is not None:
+                self._reaper_stop.set()
+                self._reaper_stop = None
+            pools = list(self._pools.values())
+            shared = list(self._shared.values())
+            self._pools.clear()
+            self._shared.clear()
+        for pool in pools:
+            pool.close()
+        for client in shared:
+            _close_quietly(client)
+
+    def stats(self):
+        with self._lock:
+            items = list(self._pools.items())
+        return {"/".join(str(part) for part in key[:4]): pool.stats() for key, pool in items}
+
+
+pool_manager = PoolManager()
+atexit.register(pool_manager.close_all)
@@ -0,0 +1,69 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Kolom teks berulang yang disimpan sebagai kode integer + vocabulary
+ENCODED_COLUMNS = ['propinsi', 'kabupaten', 'kelurahan', 'nama_toko', 'nama_barang']
+
+
+# Process-wide registry of category vocabularies. Datasets from any source whose
+# column has the same set of values share one CategoricalDtype (and categories Index),
+# so reloading the same partner data in another session doesn't duplicate it.
+# Kept as an LRU (same scheme as data_loader.LRUCache) so vocabularies of datasets
+# nobody loads anymore are dropped; frames already using an evicted dtype keep it.
+class VocabularyRegistry:
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._dtypes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def intern(self, column, dtype):
+        key = (column, len(dtype.categories), hash(tuple(dtype.categories)))
+        with self._lock:
+            shared = self._dtypes.setdefault(key, dtype)
+            self._dtypes.move_to_end(key)
+            while len(self._dtypes) > self.max_entries:
+                self._dtypes.popitem(last=False)
+        if shared is not dtype and not shared.categories.equals(dtype.categories):
+            return dtype
+        return shared
+
+    def stats(self):
+        with self._lock:
+            dtypes = list(self._dtypes.values())
+        return {
+            "vocabularies": len(dtypes),
+            "categories": sum(len(dtype.categories) for dtype in dtypes),
+        }
+
+
+vocabularies = VocabularyRegistry()
+
+
+# Dictionary-encode the text columns: integer codes (int8/16/32 depending on the
+# vocabulary size) with lexically sorted categories, so groupby order and top-5
+# tie-breaking stay the same as on plain strings
+def encode_columns(df, columns=ENCODED_COLUMNS):
+    for column in columns:
+        if column not in df.columns:
+            continue
+        values = df[column]
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype('category')
+        shared = vocabularies.intern(column, values.dtype)
+        if shared is not values.dtype:
+            values = pd.Series(pd.Categorical.from_codes(values.cat.codes, dtype=shared), index=df.index, name=column)
+        df[column] = values
+    return df
+
+
+# Equality filter that compares integer codes when the column is encoded
+def match_mask(values, value):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        code = values.cat.categories.get_indexer([value])[0]
+        if code < 0:
+            return np.zeros(len(values), dtype=bool)
+        return values.cat.codes.to_numpy() == code
+    return (values == value).to_numpy()
@@ -0,0 +1,109 @@
+from datetime import timedelta
+
+from compute_graph import build_dashboard_graph
+from data_loader import date_bounds
+from periods import PERIOD_CODES, period_label_for
+from rollup import REGION_LEVELS
+from sketches import SKETCH_LEVELS
+from time_index import time_range
+
+# Aggregat yang ditampilkan dashboard di halaman toko dan di halaman region
+STORE_METRICS = ('store_summary', 'top_items', 'revenue_by_period', 'period_comparison')
+REGION_METRICS = ('top_items', 'top_stores', 'period_comparison', 'store_growth')
+
+# Mode perkiraan: sketch sampai level kabupaten, agregat persis dari baris data di bawahnya
+APPROXIMATE_NODES = {'top_items': 'top_items_approx', 'top_stores': 'top_stores_approx', 'distinct_items': 'distinct_items_approx'}
+ROW_NODES = {
+    'top_items': 'top_items_rows',
+    'top_stores': 'top_stores_rows',
+    'distinct_items': 'distinct_items_rows',
+    'store_summary': 'store_summary_rows',
+}
+
+
+def default_metrics(path, approximate=False):
+    if len(path) == len(REGION_LEVELS):
+        return STORE_METRICS
+    return REGION_METRICS + ('distinct_items',) if approximate else REGION_METRICS
+
+
+# The comparison range of the same length that ends the day before start_date
+def previous_range(start_date, end_date):
+    compare_end = start_date - timedelta(days=1)
+    return compare_end - (end_date - start_date), compare_end
+
+
+# What the dashboard asks for: the sidebar dates (end date inclusive), the range they are
+# compared against (the previous range of the same length by default), the selected region
+# path and the aggregates to return. The period granularity (a PERIOD_CODES label) follows
+# the range length unless one is given.
+# An approximate query answers top-n and distinct counts from sketches where they exist.
+class DashboardQuery:
+    def __init__(self, start_date, end_date, path=(), metrics=None, compare_range=None, approximate=False, period_label=None):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.compare_start, self.compare_end = compare_range or previous_range(start_date, end_date)
+        self.path = tuple(path)
+        self.approximate = approximate
+        if period_label is not None and period_label not in PERIOD_CODES:
+            raise ValueError(f"Granularitas periode tidak dikenal: {period_label}")
+        self.period_label = period_label or period_label_for((end_date - start_date).days)
+        self.metrics = tuple(metrics) if metrics is not None else default_metrics(self.path, approximate)
+
+    # The same date ranges and granularity at another region path
+    def at(self, path, metrics=None):
+        return DashboardQuery(self.start_date, self.end_date, path, metrics, (self.compare_start, self.compare_end), self.approximate, self.period_label)
+
+    # The same query with another period granularity
+    def with_period(self, period_label):
+        return DashboardQuery(self.start_date, self.end_date, self.path, self.metrics, (self.compare_start, self.compare_end), self.approximate, period_label)
+
+
+# UI-free analytics over one prepared dataset. Every aggregate goes through a dashboard
+# compute graph, so repeated and overlapping queries reuse memoized (and, with a shared
+# cache, other sessions') results. Importing this module has no side effects.
+class AnalyticsEngine:
+    def __init__(self, df, graph=None, shared_cache=None):
+        self.df = df
+        self.graph = graph if graph is not None else build_dashboard_graph(shared_cache=shared_cache)
+
+    def date_range(self):
+        return time_range(self.df)
+
+    # The full date range with no region selected, where the dashboard starts
+    def default_query(self, approximate=False):
+        first_date, last_date = self.date_range()
+        return DashboardQuery(first_date.date(), last_date.date(), approximate=approximate)
+
+    def context(self, query):
+        return {
+            'df': self.df,
+            'dataset_key': self.df.attrs.get('dataset_key'),
+            'date_range': date_bounds(query.start_date, query.end_date),
+            'compare_range': date_bounds(query.compare_start, query.compare_end),
+            'period_code': PERIOD_CODES[query.period_label],
+            'path': query.path,
+        }
+
+    # Graph node answering a metric: the exact one, or in approximate mode the sketch
+    # node down to the district level and the row-level node below it
+    def node(self, metric, query):
+        if not query.approximate:
+            return metric
+        nodes = APPROXIMATE_NODES if len(query.path) <= len(SKETCH_LEVELS) else ROW_NODES
+        return nodes.get(metric, metric)
+
+    # Node name and memo key of one aggregate, also usable as a cache key for figures built from it
+    def key(self, metric, query):
+        return (self.node(metric, query),) + self.graph.key(self.node(metric, query), self.context(query))
+
+    # Regions (or stores) one level below the query path that have rows in the date range
+    def options(self, query):
+        return self.graph.get('options', self.context(query))
+
+    def get(self, metric, query):
+        return self.graph.get(self.node(metric, query), self.context(query))
+
+    def run(self, query):
+        ctx = self.context(query)
+        return {metric: self.graph.get(self.node(metric, query), ctx) for metric in query.metrics}
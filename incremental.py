@@ -0,0 +1,144 @@
+import hashlib
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from data_loader import prepare_dataframe
+from encoding import encode_columns
+from periods import cache_period_buckets, cached_period_buckets
+from prefix_sums import cache_prefix_index, cached_prefix_index
+from region_index import cache_region_index, cached_region_index
+from rollup import cache_cube, cached_cube
+from sketches import cache_sketch_index, cached_sketch_index
+from time_index import TIME_COLUMN, sort_by_time, time_range
+
+
+# Row-level dataset loaded from a database table and kept up to date with deltas.
+# fetch_since(watermark) returns the rows with tgl_transaksi >= watermark (everything for
+# None). Rows at exactly the watermark are fetched again and replace the loaded ones, so
+# transactions committed later with that same timestamp aren't lost. Each refresh gets a
+# new dataset_key; the indexes the previous version already had (rollup cube, region
+# index, period buckets, prefix sums, sketches) are derived from it plus the delta
+# instead of being rebuilt from every row.
+class IncrementalDataset:
+    def __init__(self, name, fetch_since):
+        self.name = name
+        self.fetch_since = fetch_since
+        self.df = None
+        self.watermark = None
+        self.version = 0
+        self.last_delta_rows = 0
+        self.refreshed_at = None
+        self.error = None
+        self.interval = None
+        self._base_key = hashlib.blake2b(name.encode("utf-8"), digest_size=8).hexdigest()
+        self._lock = threading.Lock()
+        self._stop = None
+        self._requests = {}
+        self._schedule_lock = threading.Lock()
+
+    def refresh(self):
+        with self._lock:
+            delta = prepare_dataframe(self.fetch_since(self.watermark))
+            previous = self.df
+            if previous is None:
+                df, replaced, lo = delta, None, 0
+            else:
+                times = previous[TIME_COLUMN].to_numpy()
+                watermark = np.datetime64(self.watermark, 'ns').astype(times.dtype)
+                lo, hi = np.searchsorted(times, watermark, side='left'), np.searchsorted(times, watermark, side='right')
+                replaced = previous.iloc[lo:hi]
+                # Rows after hi have no timestamp (NaT sorts last) and are never refetched
+                df = pd.concat([previous.iloc[:lo], delta, previous.iloc[hi:]], ignore_index=True)
+                df = encode_columns(sort_by_time(df))
+
+            self.version += 1
+            df.attrs['dataset_key'] = f"{self._base_key}-v{self.version}"
+            if previous is not None:
+                self._carry_indexes(previous, df, delta, replaced, int(lo))
+
+            self.df = df
+            last_date = time_range(df)[1]
+            self.watermark = last_date if last_date is not None else self.watermark
+            self.last_delta_rows = len(delta) - (len(replaced) if replaced is not None else 0)
+            self.refreshed_at = datetime.now()
+            return df
+
+    # Rows [lo, lo + len(replaced)) of previous were replaced by the delta's rows at
+    # [lo, lo + len(delta)) of df; everything before lo is unchanged
+    def _carry_indexes(self, previous, df, delta, replaced, lo):
+        cube = cached_cube(previous)
+        if cube is not None:
+            cache_cube(df, cube.updated(delta, replaced))
+        regions = cached_region_index(previous)
+        if regions is not None:
+            cache_region_index(df, regions.updated(df, lo, len(replaced), len(delta)))
+        buckets = cached_period_buckets(previous)
+        if buckets is not None:
+            cache_period_buckets(df, buckets.updated(df, lo))
+        prefix = cached_prefix_index(previous)
+        if prefix is not None:
+            cache_prefix_index(df, prefix.updated(df, self.watermark))
+        sketch = cached_sketch_index(previous)
+        if sketch is not None:
+            cache_sketch_index(df, sketch.updated(df, self.watermark))
+
+    # Ask for a refresh every `interval` seconds on behalf of a session (0 withdraws the
+    # request). The dataset is shared, so it refreshes at the longest interval still
+    # requested and stops only when no session wants automatic refreshes any more.
+    def request_interval(self, session, interval):
+        with self._schedule_lock:
+            if interval:
+                self._requests[session] = interval
+            else:
+                self._requests.pop(session, None)
+            wanted = max(self._requests.values(), default=None)
+            if wanted is None:
+                self.stop()
+            elif wanted != self.interval:
+                self.schedule(wanted)
+
+    # Refresh every `interval` seconds on a background thread until stop() is called
+    def schedule(self, interval):
+        self.stop()
+        stop = self._stop = threading.Event()
+        self.interval = interval
+
+        def loop():
+            while not stop.wait(interval):
+                try:
+                    self.refresh()
+                    self.error = None
+                except Exception as e:
+                    self.error = e
+
+        threading.Thread(target=loop, name=f"refresh-{self._base_key}", daemon=True).start()
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+            self._stop = None
+            self.interval = None
+
+    @property
+    def scheduled(self):
+        return self._stop is not None
+
+
+# One incremental dataset per source, shared by every session reading it
+class IncrementalRegistry:
+    def __init__(self):
+        self._datasets = {}
+        self._lock = threading.Lock()
+
+    def get(self, name, fetch_since):
+        with self._lock:
+            dataset = self._datasets.get(name)
+            if dataset is None:
+                dataset = self._datasets[name] = IncrementalDataset(name, fetch_since)
+            return dataset
+
+
+incremental_datasets = IncrementalRegistry()
@@ -0,0 +1,154 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Tujuan ekspor metrik (opsional, lewat environment variable)
+METRICS_FILE = os.environ.get("DASHBOARD_METRICS_FILE")
+METRICS_PORT = os.environ.get("DASHBOARD_METRICS_PORT")
+# Username yang boleh melihat panel instrumentasi, dipisah koma
+ADMIN_USERS = {name.strip() for name in os.environ.get("DASHBOARD_ADMINS", "").split(",") if name.strip()}
+
+
+def is_admin(username):
+    return username in ADMIN_USERS
+
+
+# Resident set size of the process in bytes (Linux); None where /proc isn't available
+def current_rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+# Stage timings of one script rerun. Memory deltas are process RSS differences, so with
+# several sessions running at once they include the other sessions' allocations.
+class RerunRecorder:
+    def __init__(self, session=None):
+        self.session = session
+        self.spans = []
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self._started = time.perf_counter()
+        self.seconds = None
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        span = {'stage': name, 'rows': rows}
+        rss_before = current_rss()
+        started = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span['seconds'] = time.perf_counter() - started
+            rss_after = current_rss()
+            if rss_before is not None and rss_after is not None:
+                span['memory_delta_mb'] = (rss_after - rss_before) / 1e6
+            self.spans.append(span)
+
+    def finish(self, registry=None):
+        self.seconds = time.perf_counter() - self._started
+        if registry is not None:
+            registry.observe(self)
+        return self
+
+    def as_dict(self):
+        return {
+            'session': self.session,
+            'started_at': self.started_at,
+            'seconds': self.seconds,
+            'spans': self.spans,
+        }
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = None
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Process-wide aggregation of every session's reruns: per-stage call counts, total and
+# max seconds and row counts. Each rerun can be appended to a JSON-lines file, and the
+# totals can be scraped as Prometheus text from a small HTTP endpoint.
+class MetricsRegistry:
+    def __init__(self, path=METRICS_FILE):
+        self.path = path
+        self._stages = {}
+        self._reruns = 0
+        self._rerun_seconds = 0.0
+        self._lock = threading.Lock()
+        self._server = None
+
+    def observe(self, recorder):
+        with self._lock:
+            self._reruns += 1
+            self._rerun_seconds += recorder.seconds or 0.0
+            for span in recorder.spans:
+                stage = self._stages.setdefault(span['stage'], {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'rows': 0})
+                stage['calls'] += 1
+                stage['seconds'] += span['seconds']
+                stage['max_seconds'] = max(stage['max_seconds'], span['seconds'])
+                stage['rows'] += span['rows'] or 0
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(recorder.as_dict(), default=str) + "\n")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'reruns': self._reruns,
+                'rerun_seconds': self._rerun_seconds,
+                'stages': {name: dict(stage) for name, stage in self._stages.items()},
+            }
+
+    def prometheus_text(self):
+        stats = self.stats()
+        lines = [
+            "# HELP dashboard_reruns_total Script reruns observed.",
+            "# TYPE dashboard_reruns_total counter",
+            f"dashboard_reruns_total {stats['reruns']}",
+            "# HELP dashboard_rerun_seconds_total Time spent in script reruns.",
+            "# TYPE dashboard_rerun_seconds_total counter",
+            f"dashboard_rerun_seconds_total {stats['rerun_seconds']:.6f}",
+        ]
+        series = [
+            ('dashboard_stage_calls_total', 'counter', 'Calls per pipeline stage.', 'calls'),
+            ('dashboard_stage_seconds_total', 'counter', 'Time spent per pipeline stage.', 'seconds'),
+            ('dashboard_stage_seconds_max', 'gauge', 'Slowest call per pipeline stage.', 'max_seconds'),
+            ('dashboard_stage_rows_total', 'counter', 'Rows processed per pipeline stage.', 'rows'),
+        ]
+        for metric, kind, help_text, field in series:
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+            for name, stage in sorted(stats['stages'].items()):
+                label = name.replace("\\", "\\\\").replace('"', '\\"')
+                lines.append(f'{metric}{{stage="{label}"}} {stage[field]}')
+        return "\n".join(lines) + "\n"
+
+    # Serve /metrics on a background thread; later calls are no-ops
+    def serve(self, port, host="0.0.0.0"):
+        with self._lock:
+            if self._server is not None:
+                return self._server
+            handler = type("MetricsHandler", (_MetricsHandler,), {"registry": self})
+            self._server = ThreadingHTTPServer((host, int(port)), handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        return self._server
+
+
+metrics = MetricsRegistry()
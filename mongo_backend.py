@@ -0,0 +1,147 @@
+import pandas as pd
+
+from data_loader import NUMERIC_COLUMNS, fingerprint_frame, prepare_dataframe
+from rollup import REGION_LEVELS
+
+# Kolom yang dipakai dashboard; field lain tidak perlu diambil dari MongoDB
+DASHBOARD_COLUMNS = ['tgl_transaksi'] + REGION_LEVELS + ['nama_barang', 'jumlah', 'harga', 'total_penghasilan']
+PERIOD_UNITS = {'D': 'day', 'W': 'week', 'M': 'month'}
+
+
+# Expresses the dashboard filters and aggregates as MongoDB aggregation pipelines.
+# Expects tgl_transaksi stored as a BSON date; $dateTrunc needs MongoDB 5.0 or newer.
+# The fetch_* methods mirror SqlPushdown so the same dashboard can render either source.
+class MongoPushdown:
+    def __init__(self, collection_name, revenue_field=None, time_field='tgl_transaksi'):
+        self.table = collection_name
+        self.time_field = time_field
+        # Tanpa field total_penghasilan, pendapatan dihitung dari jumlah * harga seperti pada CSV
+        self.revenue = f"${revenue_field}" if revenue_field else {'$multiply': ['$jumlah', '$harga']}
+
+    def _match(self, start=None, end=None, path=()):
+        match = {}
+        time_range = {}
+        if start is not None:
+            time_range['$gte'] = pd.Timestamp(start).to_pydatetime()
+        if end is not None:
+            time_range['$lt'] = pd.Timestamp(end).to_pydatetime()
+        if time_range:
+            match[self.time_field] = time_range
+        for field, value in zip(REGION_LEVELS, path):
+            match[field] = value
+        return [{'$match': match}] if match else []
+
+    def date_range_pipeline(self):
+        return [{'$group': {'_id': None, 'awal': {'$min': f"${self.time_field}"}, 'akhir': {'$max': f"${self.time_field}"}}}]
+
+    # Pilihan selectbox untuk level di bawah region path
+    def options_pipeline(self, path=(), start=None, end=None):
+        field = REGION_LEVELS[len(path)]
+        return self._match(start, end, path) + [
+            {'$group': {'_id': f"${field}"}},
+            {'$sort': {'_id': 1}},
+        ]
+
+    def top_items_pipeline(self, start=None, end=None, path=(), n=5):
+        return self._match(start, end, path) + [
+            {'$group': {'_id': '$nama_barang', 'jumlah': {'$sum': '$jumlah'}}},
+            {'$sort': {'jumlah': -1, '_id': 1}},
+            {'$limit': int(n)},
+        ]
+
+    def top_stores_pipeline(self, start=None, end=None, path=(), n=5):
+        return self._match(start, end, path) + [
+            {'$group': {'_id': '$nama_toko', 'total_penghasilan': {'$sum': self.revenue}}},
+            {'$sort': {'total_penghasilan': -1, '_id': 1}},
+            {'$limit': int(n)},
+        ]
+
+    def revenue_by_period_pipeline(self, code, start=None, end=None, path=()):
+        period = {'$dateTrunc': {'date': f"${self.time_field}", 'unit': PERIOD_UNITS[code], 'startOfWeek': 'monday'}}
+        return self._match(start, end, path) + [
+            {'$group': {'_id': period, 'total_penghasilan': {'$sum': self.revenue}}},
+            {'$sort': {'_id': 1}},
+        ]
+
+    # Total penjualan, rata-rata per transaksi dan jumlah jenis barang
+    def summary_pipeline(self, start=None, end=None, path=()):
+        return self._match(start, end, path) + [
+            {'$group': {
+                '_id': None,
+                'total_penghasilan': {'$sum': self.revenue},
+                'rata_rata_penghasilan': {'$avg': self.revenue},
+                'barang': {'$addToSet': '$nama_barang'},
+            }},
+            {'$project': {'_id': 0, 'total_penghasilan': 1, 'rata_rata_penghasilan': 1, 'jumlah_barang': {'$size': '$barang'}}},
+        ]
+
+    @staticmethod
+    def run(collection, pipeline):
+        return list(collection.aggregate(pipeline, allowDiskUse=True))
+
+    def fetch_date_range(self, collection):
+        result = self.run(collection, self.date_range_pipeline())
+        if not result:
+            return pd.NaT, pd.NaT
+        return pd.to_datetime(result[0]['awal']), pd.to_datetime(result[0]['akhir'])
+
+    def fetch_options(self, collection, path=(), start=None, end=None):
+        return [doc['_id'] for doc in self.run(collection, self.options_pipeline(path, start, end)) if doc['_id'] is not None]
+
+    def fetch_top_items(self, collection, start=None, end=None, path=(), n=5):
+        result = self.run(collection, self.top_items_pipeline(start, end, path, n))
+        return pd.DataFrame(result, columns=['_id', 'jumlah']).rename(columns={'_id': 'nama_barang'})
+
+    def fetch_top_stores(self, collection, start=None, end=None, path=(), n=5):
+        result = self.run(collection, self.top_stores_pipeline(start, end, path, n))
+        return pd.DataFrame(result, columns=['_id', 'total_penghasilan']).rename(columns={'_id': 'nama_toko'})
+
+    def fetch_revenue_by_period(self, collection, code, start=None, end=None, path=()):
+        result = self.run(collection, self.revenue_by_period_pipeline(code, start, end, path))
+        result = pd.DataFrame(result, columns=['_id', 'total_penghasilan']).rename(columns={'_id': 'periode'})
+        result['periode'] = pd.to_datetime(result['periode'])
+        return result
+
+    def fetch_summary(self, collection, start=None, end=None, path=()):
+        result = self.run(collection, self.summary_pipeline(start, end, path))
+        if not result:
+            return pd.Series({'total_penghasilan': 0, 'rata_rata_penghasilan': 0, 'jumlah_barang': 0})
+        return pd.Series(result[0])
+
+    # Dashboard fields of documents at or after the watermark (all documents without one)
+    def fetch_rows_since(self, collection, watermark=None):
+        query = {self.time_field: {'$gte': pd.Timestamp(watermark).to_pydatetime()}} if watermark is not None else None
+        return load_collection(collection, query=query)
+
+
+# Load only the dashboard fields, building the frame batch by batch from the cursor
+# so at most batch_size documents are held as Python dicts at any time
+def load_collection(collection, batch_size=50000, columns=DASHBOARD_COLUMNS, progress=None, query=None):
+    projection = {column: 1 for column in columns}
+    projection['_id'] = 0
+    cursor = collection.find(query or {}, projection=projection, batch_size=batch_size)
+
+    frames, batch = [], []
+    for document in cursor:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            frames.append(_batch_frame(batch, columns))
+            batch = []
+            if progress is not None:
+                progress(sum(len(frame) for frame in frames))
+    if batch:
+        frames.append(_batch_frame(batch, columns))
+    if not frames:
+        return pd.DataFrame(columns=[column for column in columns if column != 'total_penghasilan'])
+
+    df = pd.concat(frames, ignore_index=True)
+    return fingerprint_frame(prepare_dataframe(df))
+
+
+def _batch_frame(batch, columns):
+    frame = pd.DataFrame.from_records(batch)
+    frame = frame[[column for column in columns if column in frame.columns]]
+    for column in NUMERIC_COLUMNS:
+        if column in frame.columns:
+            frame[column] = pd.to_numeric(frame[column], errors='coerce')
+    return frame
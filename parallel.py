@@ -0,0 +1,70 @@
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Jumlah proses worker untuk agregasi paralel (bisa diganti lewat environment variable)
+WORKERS = int(os.environ.get("DASHBOARD_WORKERS", os.cpu_count() or 1))
+# Partitions smaller than this cost more to ship to a worker than to aggregate in place
+MIN_PARTITION_ROWS = 200000
+
+
+# Split a sorted key array into at most `parts` contiguous row ranges whose cuts fall
+# where the key changes, so no key value (e.g. a day) is spread over two ranges
+def key_partitions(keys, parts):
+    n = len(keys)
+    cuts = [0]
+    for i in range(1, parts):
+        cut = int(np.searchsorted(keys, keys[n * i // parts], side='left'))
+        if cut > cuts[-1]:
+            cuts.append(cut)
+    cuts.append(n)
+    return [(lo, hi) for lo, hi in zip(cuts[:-1], cuts[1:]) if hi > lo]
+
+
+# Runs a groupby-style function over key-aligned partitions of a frame in a process pool
+# and concatenates the partial results. Because every group lies entirely inside one
+# partition and the partitions keep row order, the concatenation is exactly what the
+# function returns on the whole frame (same sums, same first-appearance group order).
+# The pool uses 'spawn' since forking the multi-threaded Streamlit server is unsafe.
+class ParallelAggregator:
+    def __init__(self, workers=WORKERS, min_rows=MIN_PARTITION_ROWS):
+        self.workers = workers
+        self.min_rows = min_rows
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def partitions(self, keys):
+        parts = min(self.workers, len(keys) // self.min_rows)
+        if parts <= 1:
+            return [(0, len(keys))]
+        return key_partitions(keys, parts)
+
+    # func must be picklable (module-level function or functools.partial of one);
+    # keys is the frame's sort key as a numpy array, e.g. the transaction day
+    def concat_partitions(self, func, frame, keys):
+        ranges = self.partitions(keys)
+        if len(ranges) == 1:
+            return func(frame)
+        parts = self._pool().map(func, [frame.iloc[lo:hi] for lo, hi in ranges])
+        return pd.concat(list(parts), ignore_index=True)
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+aggregator = ParallelAggregator()
+atexit.register(aggregator.close)
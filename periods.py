@@ -0,0 +1,75 @@
+import numpy as np
+
+from data_loader import LRUCache
+from time_index import TIME_COLUMN
+
+# Label periode di dashboard -> kode granularitas
+PERIOD_CODES = {'Harian': 'D', 'Mingguan': 'W', 'Bulanan': 'M'}
+
+
+# Pilih granularitas berdasarkan panjang rentang tanggal
+def period_label_for(date_range_days):
+    if date_range_days <= 7:  # Jika rentang tanggal <= 7 hari, tampilkan data harian
+        return 'Harian'
+    elif date_range_days <= 30:  # Jika rentang tanggal antara 7 dan 30 hari, tampilkan data mingguan
+        return 'Mingguan'
+    return 'Bulanan'  # Jika rentang tanggal lebih dari 30 hari, tampilkan data bulanan
+
+
+# Vectorized period start times; same values as .dt.to_period(code).apply(lambda r: r.start_time)
+def period_starts(times, code):
+    if code == 'D':
+        starts = times.astype('datetime64[D]')
+    elif code == 'W':
+        # to_period('W') weeks end on Sunday, so they start on Monday (1970-01-01 was a Thursday)
+        days = times.astype('datetime64[D]')
+        weekday = (days.astype(np.int64) + 3) % 7
+        starts = np.where(np.isnat(days), days, days - weekday.astype('timedelta64[D]'))
+    elif code == 'M':
+        starts = times.astype('datetime64[M]')
+    else:
+        raise ValueError(f"Granularitas periode tidak dikenal: {code}")
+    return starts.astype(times.dtype)
+
+
+# Period buckets for a whole time-sorted dataset, computed lazily once per granularity.
+# A date filter is a [lo, hi) row range, so the buckets for it are a slice of these arrays.
+class PeriodBuckets:
+    def __init__(self, df):
+        self.times = df[TIME_COLUMN].to_numpy()
+        self._starts = {}
+
+    def get(self, code, lo=0, hi=None):
+        if code not in self._starts:
+            self._starts[code] = period_starts(self.times, code)
+        return self._starts[code][lo:hi]
+
+    # Buckets for `df`, the dataset after the rows from position `lo` on changed; the
+    # granularities computed so far keep their starts before lo and only the rest is redone
+    def updated(self, df, lo):
+        buckets = PeriodBuckets(df)
+        for code, starts in self._starts.items():
+            buckets._starts[code] = np.concatenate([starts[:lo], period_starts(buckets.times[lo:], code)])
+        return buckets
+
+
+_bucket_cache = LRUCache(max_entries=4)
+
+
+# Register buckets built elsewhere (e.g. updated incrementally) for a dataset
+def cache_period_buckets(df, buckets, cache=_bucket_cache):
+    key = df.attrs.get('dataset_key')
+    if key is not None:
+        cache.put(key, buckets)
+
+
+def cached_period_buckets(df, cache=_bucket_cache):
+    key = df.attrs.get('dataset_key')
+    return cache.get(key) if key is not None else None
+
+
+def get_period_buckets(df, cache=_bucket_cache):
+    key = df.attrs.get('dataset_key')
+    if key is None:
+        return PeriodBuckets(df)
+    return cache.get_or_build(key, lambda: PeriodBuckets(df))
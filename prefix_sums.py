@@ -0,0 +1,212 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+from data_loader import LRUCache
+from periods import period_starts
+from rollup import REGION_LEVELS
+from time_index import TIME_COLUMN, time_range
+
+# Kolom ukuran pada array kumulatif (transaksi = baris dengan total_penghasilan terisi)
+PREFIX_MEASURES = ['total_penghasilan', 'jumlah', 'transaksi']
+ONE_DAY = pd.Timedelta(days=1)
+# Lower 32 bits of a (node << 32 | day) key
+DAY_MASK = (1 << 32) - 1
+
+
+# Number of leading rows with a timestamp (NaT sorts last)
+def _timed_rows(df):
+    return int(np.searchsorted(df[TIME_COLUMN].to_numpy(), np.datetime64('NaT'), side='left'))
+
+
+def growth_percent(current, previous):
+    return (current - previous) / previous * 100 if previous else np.nan
+
+
+# Sorted (node << 32 | day) keys of the rows and the measures summed per key
+def _day_sums(nodes, day, measures):
+    keys, inverse = np.unique((nodes << 32) | day, return_inverse=True)
+    sums = np.column_stack([np.bincount(inverse, weights=measures[:, m], minlength=len(keys)) for m in range(measures.shape[1])])
+    return keys, sums.reshape(len(keys), measures.shape[1])
+
+
+# Cumulative daily totals for every node of the region tree (the whole dataset, each
+# propinsi, kabupaten, kelurahan and store), built in one pass over the rows at load.
+# Only the days on which a node has rows are stored: `keys` holds (node << 32 | day) for
+# each such (node, day) pair in sorted order, and `cumulative` the node's running sums
+# through that day, with a zero row in front of every node's run. The total of any date
+# range is then two binary searches per node, whatever the number of rows or the range
+# length. Range bounds are resolved to whole days, as the dashboard's date_bounds always are.
+# Memory is 32 bytes per (node, day) pair that has transactions. Each row adds at most one
+# pair per level, and the upper levels have far fewer pairs than the stores, so the size
+# follows the store-days: about 13 MB for 1,000 stores trading every day of a year, and
+# 1.5 GB for 40,000 stores trading every day for 3 years. Stores that don't sell every
+# day cost proportionally less.
+class PrefixSumIndex:
+    def __init__(self, df):
+        first_date, last_date = time_range(df)
+        self.first_day = np.datetime64(first_date, 'D') if first_date is not None else None
+        self.days = int((np.datetime64(last_date, 'D') - self.first_day).astype(np.int64)) + 1 if first_date is not None else 0
+        self._nodes = {(): 0}
+        self._set_entries(*self._pairs(df.iloc[:_timed_rows(df)]))
+        self._set_stores()
+
+    # Index for `df`, the dataset after the rows from `since` on were refetched. Days before
+    # the day of `since` keep their (node, day) sums; only the rows from that day on are
+    # summed again and merged in, so a refresh costs the delta plus a pass over the pairs.
+    def updated(self, df, since):
+        if self.first_day is None or since is None:
+            return PrefixSumIndex(df)
+        index = copy.copy(self)
+        index._nodes = dict(self._nodes)
+        last_date = time_range(df)[1]
+        index.days = int((np.datetime64(last_date, 'D') - self.first_day).astype(np.int64)) + 1
+        since_day = np.datetime64(since, 'D')
+        times = df[TIME_COLUMN].to_numpy()
+        lo = int(np.searchsorted(times, since_day.astype(times.dtype), side='left'))
+        added_keys, added_sums = index._pairs(df.iloc[lo:_timed_rows(df)])
+
+        positions = np.arange(len(self.keys)) + (self.keys >> 32)
+        kept = (self.keys & DAY_MASK) < int((since_day - self.first_day).astype(np.int64))
+        kept_sums = (self.cumulative[positions + 1] - self.cumulative[positions])[kept]
+        keys = np.concatenate([self.keys[kept], added_keys])
+        order = np.argsort(keys, kind='stable')
+        index._set_entries(keys[order], np.concatenate([kept_sums, added_sums])[order])
+        index._set_stores()
+        return index
+
+    # (node, day) keys and measure sums of the rows in `frame` (all with a timestamp), at
+    # every level of the region tree. Paths not seen before get the next node ids.
+    def _pairs(self, frame):
+        rows = len(frame)
+        day = (frame[TIME_COLUMN].to_numpy().astype('datetime64[D]') - self.first_day).astype(np.int64) if rows else np.zeros(0, np.int64)
+        if 'total_penghasilan' in frame.columns:
+            revenue = frame['total_penghasilan'].to_numpy(dtype=np.float64)
+        else:
+            revenue = (frame['jumlah'] * frame['harga']).to_numpy(dtype=np.float64)
+        measures = np.column_stack([np.nan_to_num(revenue), np.nan_to_num(frame['jumlah'].to_numpy(dtype=np.float64)), (~np.isnan(revenue)).astype(np.float64)])
+
+        # Node ids per level; rows with a missing region value are left out of that level.
+        # Each level is summed to its (node, day) pairs right away, so only one level's
+        # row-length temporaries exist at a time; on a fresh index node ids grow by level,
+        # so the concatenated pairs are already in key order.
+        pairs = [_day_sums(np.zeros(rows, dtype=np.int64), day, measures)]
+        for depth in range(1, len(REGION_LEVELS) + 1):
+            columns = REGION_LEVELS[:depth]
+            group_ids = frame.groupby(columns, observed=True, sort=False).ngroup().fillna(-1).to_numpy(dtype=np.int64)
+            valid = group_ids >= 0
+            groups = int(group_ids.max()) + 1 if rows else 0
+            first_rows = np.full(groups, rows, dtype=np.int64)
+            np.minimum.at(first_rows, group_ids[valid], np.flatnonzero(valid))
+            node_ids = np.array([self._nodes.setdefault(key, len(self._nodes)) for key in frame[columns].take(first_rows).itertuples(index=False, name=None)], dtype=np.int64)
+            pairs.append(_day_sums(node_ids[group_ids[valid]], day[valid], measures[valid]))
+        return np.concatenate([keys for keys, _ in pairs]), np.concatenate([sums for _, sums in pairs])
+
+    def _set_stores(self):
+        store_paths = [path for path in self._nodes if len(path) == len(REGION_LEVELS)]
+        self.stores = pd.DataFrame(store_paths, columns=REGION_LEVELS)
+        self.stores['node'] = np.array([self._nodes[path] for path in store_paths], dtype=np.int64)
+
+    # Lay out the per-node running sums of (node, day) pairs given in key order
+    def _set_entries(self, keys, sums):
+        self.keys = keys
+        nodes = keys >> 32
+        starts = np.flatnonzero(np.concatenate(([True], nodes[1:] != nodes[:-1]))) if len(nodes) else np.zeros(0, np.int64)
+        running = np.cumsum(sums, axis=0)
+        before = np.concatenate([np.zeros((1, len(PREFIX_MEASURES))), running])[starts]
+        counts = np.diff(np.append(starts, len(nodes)))
+        self.cumulative = np.zeros((len(keys) + len(starts), len(PREFIX_MEASURES)))
+        self.cumulative[np.arange(len(keys)) + nodes + 1] = running - np.repeat(before, counts, axis=0)
+
+    # Number of whole days before `when`, i.e. the prefix position of a [start, end) bound
+    def _position(self, when, default):
+        if when is None:
+            return default
+        offset = np.ceil((pd.Timestamp(when) - pd.Timestamp(self.first_day)) / ONE_DAY)
+        return int(min(max(offset, 0), self.days))
+
+    def _span(self, start, end):
+        if self.first_day is None:
+            return 0, 0
+        lo, hi = self._position(start, 0), self._position(end, self.days)
+        return lo, max(lo, hi)
+
+    # Positions in `keys` of the first pair at or after day `day` of each node
+    def _search(self, nodes, day):
+        return np.searchsorted(self.keys, (nodes << 32) | day, side='left')
+
+    def _sums(self, nodes, start, end):
+        lo, hi = self._span(start, end)
+        nodes = np.asarray(nodes, dtype=np.int64)
+        if not len(self.keys):
+            return np.zeros(nodes.shape + (len(PREFIX_MEASURES),))
+        return self.cumulative[self._search(nodes, hi) + nodes] - self.cumulative[self._search(nodes, lo) + nodes]
+
+    # Total penjualan, rata-rata per transaksi, jumlah terjual dan transaksi untuk region path
+    def totals(self, start, end, path=()):
+        node = self._nodes.get(tuple(path))
+        revenue, jumlah, transactions = self._sums(node, start, end) if node is not None else (0.0, 0.0, 0.0)
+        return pd.Series({
+            'total_penghasilan': revenue,
+            'rata_rata_penghasilan': revenue / transactions if transactions else 0,
+            'jumlah': jumlah,
+            'transaksi': transactions,
+        })
+
+    # Two date ranges side by side, e.g. this month against last month
+    def compare(self, current, previous, path=()):
+        comparison = pd.DataFrame({'sekarang': self.totals(*current, path), 'sebelumnya': self.totals(*previous, path)})
+        comparison['pertumbuhan_persen'] = [growth_percent(now, before) for now, before in comparison.itertuples(index=False)]
+        return comparison
+
+    # Stores under the region path ranked by revenue growth between two date ranges.
+    # Stores without revenue in the previous range have no growth rate and are left out.
+    def store_growth(self, current, previous, path=(), n=10):
+        stores = self.stores
+        for column, value in zip(REGION_LEVELS, path):
+            stores = stores[stores[column] == value]
+        nodes = stores['node'].to_numpy()
+        now = self._sums(nodes, *current)[:, 0]
+        before = self._sums(nodes, *previous)[:, 0]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            growth = np.where(before > 0, (now - before) / before * 100, np.nan)
+        ranked = stores[REGION_LEVELS].assign(total_penghasilan=now, total_penghasilan_sebelumnya=before, pertumbuhan_persen=growth)
+        return ranked.dropna(subset=['pertumbuhan_persen']).nlargest(n, 'pertumbuhan_persen').reset_index(drop=True)
+
+    # Revenue per period start over [start, end); only periods with transactions are listed
+    def revenue_by_period(self, code, start, end, path=()):
+        node = self._nodes.get(tuple(path))
+        lo, hi = self._span(start, end)
+        first, last = (self._search(np.int64(node), lo), self._search(np.int64(node), hi)) if node is not None else (0, 0)
+        if first == last:
+            return pd.DataFrame({'periode': pd.Series(dtype='datetime64[ns]'), 'total_penghasilan': pd.Series(dtype=np.float64)})
+        days = (self.first_day + (self.keys[first:last] & DAY_MASK)).astype('datetime64[ns]')
+        starts = period_starts(days, code)
+        edges = np.flatnonzero(np.concatenate(([True], starts[1:] != starts[:-1])))
+        sums = np.diff(self.cumulative[np.append(edges + first, last) + node], axis=0)
+        keep = sums[:, 2] > 0
+        return pd.DataFrame({'periode': starts[edges][keep], 'total_penghasilan': sums[keep, 0]})
+
+
+_prefix_cache = LRUCache(max_entries=4)
+
+
+# Register an index built elsewhere (e.g. updated incrementally) for a dataset
+def cache_prefix_index(df, index, cache=_prefix_cache):
+    key = df.attrs.get('dataset_key')
+    if key is not None:
+        cache.put(key, index)
+
+
+def cached_prefix_index(df, cache=_prefix_cache):
+    key = df.attrs.get('dataset_key')
+    return cache.get(key) if key is not None else None
+
+
+# Build the arrays once per loaded dataset and reuse them for every date range
+def get_prefix_index(df, cache=_prefix_cache):
+    key = df.attrs.get('dataset_key')
+    if key is None:
+        return PrefixSumIndex(df)
+    return cache.get_or_build(key, lambda: PrefixSumIndex(df))
@@ -0,0 +1,144 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+# Ukuran batch baris yang diambil dari server per fetch
+BATCH_SIZE = 10000
+# Session-scoped statement timeout per dialect (milliseconds); reset before the
+# connection goes back to the pool. PostgreSQL uses SET LOCAL, which ends with the transaction.
+STATEMENT_TIMEOUTS = {
+    'postgresql': ("SET LOCAL statement_timeout = {ms}", None),
+    'mysql': ("SET SESSION MAX_EXECUTION_TIME = {ms}", "SET SESSION MAX_EXECUTION_TIME = DEFAULT"),
+}
+
+
+class QueryCancelled(Exception):
+    pass
+
+
+# Server-side cursor: a named cursor on PostgreSQL, an unbuffered cursor on MySQL,
+# so rows are streamed in batches instead of materialized by the driver first
+def open_cursor(conn, dialect):
+    if dialect == 'postgresql':
+        return conn.cursor(name=f"dashboard_{uuid.uuid4().hex}")
+    if dialect == 'mysql':
+        return conn.cursor(buffered=False)
+    return conn.cursor()
+
+
+def _execute(conn, statement):
+    cur = conn.cursor()
+    try:
+        cur.execute(statement)
+    finally:
+        cur.close()
+
+
+# A user-entered query running on a pooled connection in a background thread.
+# Fetched batches are kept as they arrive so the UI can render partial results;
+# cancel() stops fetching and interrupts a statement still running on the server.
+class QueryJob:
+    def __init__(self, db_pool, dialect, query, batch_size=BATCH_SIZE, timeout=60):
+        self.db_pool = db_pool
+        self.dialect = dialect
+        self.query = query
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.status = 'running'
+        self.error = None
+        self.columns = None
+        self.rows = 0
+        self.future = None
+        self._batches = []
+        self._result = None
+        self._conn = None
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self.status == 'running'
+
+    def run(self):
+        try:
+            # The connection is discarded instead of reused if the query fails or is cancelled
+            with self.db_pool.connection() as conn:
+                self._conn = conn
+                self._fetch(conn)
+            self.status = 'cancelled' if self._cancelled.is_set() else 'done'
+        except Exception as e:
+            if self._cancelled.is_set():
+                self.status = 'cancelled'
+            else:
+                self.error = e
+                self.status = 'error'
+        finally:
+            self._conn = None
+
+    def _fetch(self, conn):
+        set_timeout, reset_timeout = STATEMENT_TIMEOUTS.get(self.dialect, (None, None))
+        if set_timeout is not None and self.timeout:
+            _execute(conn, set_timeout.format(ms=int(self.timeout * 1000)))
+        cur = open_cursor(conn, self.dialect)
+        try:
+            cur.execute(self.query)
+            while not self._cancelled.is_set():
+                rows = cur.fetchmany(self.batch_size)
+                if self.columns is None and cur.description is not None:
+                    self.columns = [column[0] for column in cur.description]
+                if not rows:
+                    break
+                batch = pd.DataFrame.from_records(rows, columns=self.columns, coerce_float=True)
+                with self._lock:
+                    self._batches.append(batch)
+                    self.rows += len(batch)
+            if self._cancelled.is_set():
+                raise QueryCancelled()
+        finally:
+            cur.close()
+        if reset_timeout is not None and self.timeout:
+            _execute(conn, reset_timeout)
+
+    def cancel(self):
+        self._cancelled.set()
+        conn = self._conn
+        if conn is None:
+            return
+        try:
+            if self.dialect == 'postgresql':
+                conn.cancel()
+            elif self.dialect == 'mysql':
+                with self.db_pool.connection() as other:
+                    _execute(other, f"KILL QUERY {int(conn.connection_id)}")
+        except Exception:
+            pass
+
+    # Rows received so far (the full result once the job is done)
+    def frame(self):
+        with self._lock:
+            if self._result is not None:
+                return self._result
+            batches = list(self._batches)
+        if not batches:
+            return pd.DataFrame(columns=self.columns)
+        frame = pd.concat(batches, ignore_index=True) if len(batches) > 1 else batches[0]
+        if not self.running:
+            with self._lock:
+                self._result, self._batches = frame, [frame]
+        return frame
+
+
+# Background executor for database queries, decoupled from the Streamlit script thread
+class QueryRunner:
+    def __init__(self, workers=4):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="query")
+
+    def submit(self, db_pool, dialect, query, batch_size=BATCH_SIZE, timeout=60):
+        job = QueryJob(db_pool, dialect, query, batch_size, timeout)
+        job.future = self._executor.submit(job.run)
+        return job
+
+
+query_runner = QueryRunner()
@@ -0,0 +1,160 @@
+import numpy as np
+
+from data_loader import LRUCache
+from rollup import REGION_LEVELS
+
+
+# One node of the propinsi -> kabupaten -> kelurahan -> nama_toko tree. A store (leaf)
+# holds its ascending row positions; first_row/last_row bound the node's row positions.
+class RegionNode:
+    __slots__ = ('positions', 'first_row', 'last_row', 'children')
+
+    def __init__(self, positions=None):
+        self.positions = positions
+        self.first_row = int(positions[0]) if positions is not None else 0
+        self.last_row = int(positions[-1]) if positions is not None else -1
+        self.children = {}
+
+
+_NO_ROWS = np.empty(0, dtype=np.int64)
+
+
+# Ascending row positions (offset by `base`) of every store path in the frame
+def _positions_by_leaf(frame, base=0):
+    group_ids = frame.groupby(REGION_LEVELS, observed=True, sort=False).ngroup().fillna(-1).to_numpy(dtype=np.int64)
+    # Rows with a missing region value get group id -1 and are left out of the tree
+    valid = np.flatnonzero(group_ids >= 0)
+    order = valid[np.argsort(group_ids[valid], kind='stable')]
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(group_ids[valid]))))
+    leaf_keys = frame[REGION_LEVELS].take(order[offsets[:-1]]).itertuples(index=False, name=None)
+    return {key: order[offsets[group]:offsets[group + 1]] + base for group, key in enumerate(leaf_keys)}
+
+
+# Copy of `node` with the stores under it replaced by `changes` ({path below node:
+# positions}, empty positions remove the store). Nodes off the changed paths are shared
+# with the old tree, so an update costs the changed paths, not the whole tree. Children
+# stay in order of first appearance in the data, like Series.unique().
+def _rebuilt(node, changes):
+    if () in changes:
+        positions = changes[()]
+        return RegionNode(positions) if len(positions) else None
+    children = dict(node.children) if node is not None else {}
+    grouped = {}
+    for path, positions in changes.items():
+        grouped.setdefault(path[0], {})[path[1:]] = positions
+    for name, below in grouped.items():
+        child = _rebuilt(children.get(name), below)
+        if child is None:
+            children.pop(name, None)
+        else:
+            children[name] = child
+    if not children:
+        return None
+    parent = RegionNode()
+    parent.children = dict(sorted(children.items(), key=lambda item: item[1].first_row))
+    parent.first_row = min(child.first_row for child in children.values())
+    parent.last_row = max(child.last_row for child in children.values())
+    return parent
+
+
+# Hierarchical region index: every store keeps the sorted positions of its rows, so
+# selectbox options and subsets are lookups instead of masks over the whole frame.
+# The dataset is sorted by tgl_transaksi, so a date filter is a [lo, hi) row range.
+class RegionIndex:
+    def __init__(self, df, root=None):
+        self.df = df
+        if root is None:
+            root = _rebuilt(None, _positions_by_leaf(df))
+        self.root = root if root is not None else RegionNode()
+
+    # Index for `df`, the dataset after rows [lo, lo + removed) of this one were replaced by
+    # `added` rows at [lo, lo + added) and the rows after them (no timestamp) moved along.
+    # Only the stores with rows from lo on are touched.
+    def updated(self, df, lo, removed, added):
+        shift = added - removed
+        moved = _positions_by_leaf(self.df.iloc[lo:], lo)
+        new_rows = _positions_by_leaf(df.iloc[lo:lo + added], lo)
+        changes = {}
+        for path in moved.keys() | new_rows.keys():
+            leaf = self._node(path)
+            current = leaf.positions if leaf is not None else _NO_ROWS
+            kept, after = np.searchsorted(current, lo), np.searchsorted(current, lo + removed)
+            changes[path] = np.concatenate([current[:kept], new_rows.get(path, _NO_ROWS), current[after:] + shift])
+        return RegionIndex(df, _rebuilt(self.root, changes) if changes else self.root)
+
+    def _node(self, path):
+        node = self.root
+        for name in path:
+            node = node.children.get(name)
+            if node is None:
+                return None
+        return node
+
+    # Whether the node has at least one row inside [lo, hi); the row bounds settle most nodes in O(1)
+    def _has_rows(self, node, lo, hi):
+        if node.last_row < lo or node.first_row >= hi:
+            return False
+        if lo <= node.first_row and node.last_row < hi:
+            return True
+        if not node.children:
+            i = np.searchsorted(node.positions, lo, side='left')
+            return i < len(node.positions) and node.positions[i] < hi
+        return any(self._has_rows(child, lo, hi) for child in node.children.values())
+
+    # Position arrays of the stores under the node that may have rows inside [lo, hi)
+    def _leaf_positions(self, node, lo, hi, out):
+        if node.last_row < lo or node.first_row >= hi:
+            return out
+        if not node.children:
+            out.append(node.positions)
+        for child in node.children.values():
+            self._leaf_positions(child, lo, hi, out)
+        return out
+
+    def _bounds(self, lo, hi):
+        return lo, len(self.df) if hi is None else hi
+
+    # Pilihan untuk selectbox level berikutnya di bawah region path, dibatasi rentang baris [lo, hi)
+    def options(self, path=(), lo=0, hi=None):
+        lo, hi = self._bounds(lo, hi)
+        node = self._node(path)
+        if node is None:
+            return []
+        return [name for name, child in node.children.items() if self._has_rows(child, lo, hi)]
+
+    # Posisi baris (urut naik) untuk region path di dalam rentang [lo, hi)
+    def rows(self, path=(), lo=0, hi=None):
+        lo, hi = self._bounds(lo, hi)
+        node = self._node(path)
+        if node is None:
+            return _NO_ROWS
+        if node.children:
+            positions = np.concatenate(self._leaf_positions(node, lo, hi, [_NO_ROWS]))
+            return np.sort(positions[(positions >= lo) & (positions < hi)])
+        positions = node.positions
+        return positions[np.searchsorted(positions, lo):np.searchsorted(positions, hi)]
+
+    def subset(self, path=(), lo=0, hi=None):
+        return self.df.take(self.rows(path, lo, hi))
+
+
+_index_cache = LRUCache(max_entries=8)
+
+
+# Register an index built elsewhere (e.g. updated incrementally) for a dataset
+def cache_region_index(df, index, cache=_index_cache):
+    key = df.attrs.get('dataset_key')
+    if key is not None:
+        cache.put(key, index)
+
+
+def cached_region_index(df, cache=_index_cache):
+    key = df.attrs.get('dataset_key')
+    return cache.get(key) if key is not None else None
+
+
+# Build the index once per dataset and reuse it on later reruns and date changes
+def get_region_index(df, key=None, cache=_index_cache):
+    if key is None:
+        return RegionIndex(df)
+    return cache.get_or_build(key, lambda: RegionIndex(df))
@@ -0,0 +1,103 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+_MISSING = object()
+
+
+# Approximate memory footprint of a cached value, used for the memory budget
+def estimate_size(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True, index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True, index=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+# Process-wide cache for computed aggregates and serialized figures, shared by all
+# sessions. Keys are built from (dataset fingerprint, date range, region path, metric).
+# Entries expire after ttl seconds and the least recently used ones are evicted once
+# the estimated size passes max_bytes.
+class SharedResultCache:
+    def __init__(self, max_bytes=256 * 1024 * 1024, ttl=600):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def _drop_locked(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] < time.monotonic():
+                self._drop_locked(key)
+                self._stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return default
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop_locked(key)
+            now = time.monotonic()
+            for stale in [k for k, (_, _, expires_at) in self._entries.items() if expires_at < now]:
+                self._drop_locked(stale)
+                self._stats["expirations"] += 1
+            while self._entries and self._bytes + size > self.max_bytes:
+                self._drop_locked(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+            self._entries[key] = (value, size, now + self.ttl)
+            self._bytes += size
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    # Plotly figures are cached as their plain dict, built once for every session. The dict
+    # goes to st.plotly_chart as is, so a hit doesn't turn it back into a Figure object.
+    def figure(self, key, build):
+        return self.get_or_compute(('figure',) + tuple(key), lambda: build().to_dict())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), bytes=self._bytes, max_bytes=self.max_bytes, ttl=self.ttl)
+
+
+shared_cache = SharedResultCache(
+    max_bytes=int(os.environ.get("DASHBOARD_CACHE_MB", 256)) * 1024 * 1024,
+    ttl=int(os.environ.get("DASHBOARD_CACHE_TTL", 600)),
+)
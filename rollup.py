@@ -0,0 +1,189 @@
+from functools import partial
+
+import pandas as pd
+
+from data_loader import LRUCache
+from encoding import encode_columns, match_mask
+from parallel import aggregator as default_aggregator
+from periods import period_starts
+from time_index import search_range
+
+# Urutan level drill-down pada sidebar
+REGION_LEVELS = ['propinsi', 'kabupaten', 'kelurahan', 'nama_toko']
+MEASURES = ['jumlah', 'total_penghasilan', 'transaksi']
+FINEST_KEYS = ['tanggal'] + REGION_LEVELS + ['nama_barang']
+
+
+def _sum_by(table, keys):
+    return table.groupby(keys, observed=True, sort=False)[MEASURES].sum().reset_index()
+
+
+# Fold raw transaction rows into the finest cube grain: daily sums per (store path, item)
+def fold_rows(df):
+    revenue = df['total_penghasilan'] if 'total_penghasilan' in df.columns else df['jumlah'] * df['harga']
+    base = pd.DataFrame({
+        'tanggal': df['tgl_transaksi'].dt.normalize(),
+        'jumlah': df['jumlah'],
+        'total_penghasilan': revenue,
+        'transaksi': 1,
+    })
+    for column in REGION_LEVELS + ['nama_barang']:
+        base[column] = df[column]
+    return _sum_by(base, FINEST_KEYS)
+
+
+# Merge partial folds (e.g. one per CSV chunk) into a single finest-grain table
+def merge_folds(folds):
+    if len(folds) == 1:
+        return folds[0]
+    return _sum_by(pd.concat(folds, ignore_index=True), FINEST_KEYS)
+
+
+# Top-n table with the label column decoded back to plain strings for the charts
+def top_by(selected, label, measure, n=5):
+    top = selected.groupby(label, observed=True)[measure].sum().nlargest(n).reset_index()
+    top[label] = top[label].astype(str)
+    return top
+
+
+# Pre-aggregated daily sums of jumlah/total_penghasilan for every drill-down level.
+# Item tables are keyed on (tanggal, region path up to the level, nama_barang) and the
+# store table on (tanggal, full region path), so a top-5 query only touches the
+# already rolled-up rows for the selected dates instead of the raw transactions.
+# The coarser tables are derived from the finest one, which can also be built chunk by chunk.
+# With an aggregator every groupby runs on day-aligned partitions in its process pool;
+# all keys include the day, so the result is identical to the single-process one.
+class RollupCube:
+    def __init__(self, df=None, finest=None, aggregator=None):
+        if finest is None:
+            finest = self._by_days(aggregator, fold_rows, df, df['tgl_transaksi'].to_numpy().astype('datetime64[D]'))
+        if aggregator is not None and finest['tanggal'].is_monotonic_increasing:
+            days = finest['tanggal'].to_numpy()
+        else:
+            aggregator = None
+            days = None
+        self.item_levels = [
+            self._sorted(self._by_days(aggregator, partial(_sum_by, keys=['tanggal'] + REGION_LEVELS[:level] + ['nama_barang']), finest, days))
+            for level in range(len(REGION_LEVELS))
+        ]
+        self.item_levels.append(self._sorted(finest))
+        self.stores = self._sorted(self._by_days(aggregator, partial(_sum_by, keys=['tanggal'] + REGION_LEVELS), finest, days))
+
+    # Cube for the dataset after appending `added` rows and dropping `removed` ones, built
+    # from this cube's finest table plus the folded delta instead of from all raw rows
+    def updated(self, added, removed=None):
+        folds = [self.item_levels[-1][0], fold_rows(added)]
+        if removed is not None and len(removed):
+            negative = fold_rows(removed)
+            negative[MEASURES] = -negative[MEASURES]
+            folds.append(negative)
+        finest = merge_folds(folds)
+        finest = finest[finest['transaksi'] != 0].reset_index(drop=True)
+        return RollupCube(finest=encode_columns(finest))
+
+    @staticmethod
+    def _by_days(aggregator, func, frame, days):
+        if aggregator is None:
+            return func(frame)
+        # Partial results come back from the workers with their own copies of the vocabularies
+        return encode_columns(aggregator.concat_partitions(func, frame, days))
+
+    # Keep each table sorted by day for binary-search date slicing
+    @staticmethod
+    def _sorted(table):
+        table = table.sort_values('tanggal', kind='stable').reset_index(drop=True)
+        return table, table['tanggal'].to_numpy()
+
+    # Rows of a rolled-up table that fall inside [start, end) and under the region path
+    @staticmethod
+    def _select(table_and_days, start, end, path):
+        table, days = table_and_days
+        lo, hi = search_range(days, start, end)
+        selected = table.iloc[lo:hi]
+        for column, value in zip(REGION_LEVELS, path):
+            selected = selected[match_mask(selected[column], value)]
+        return selected
+
+    # Top-n produk berdasarkan jumlah terjual untuk region path (0-4 level)
+    def top_items(self, start, end, path=(), n=5):
+        selected = self._select(self.item_levels[len(path)], start, end, path)
+        return top_by(selected, 'nama_barang', 'jumlah', n)
+
+    # Top-n toko berdasarkan total_penghasilan untuk region path (0-3 level)
+    def top_stores(self, start, end, path=(), n=5):
+        selected = self._select(self.stores, start, end, path)
+        return top_by(selected, 'nama_toko', 'total_penghasilan', n)
+
+    def date_range(self):
+        days = self.stores[1]
+        if len(days) == 0:
+            return pd.NaT, pd.NaT
+        return pd.Timestamp(days[0]), pd.Timestamp(days[-1])
+
+    # Pilihan selectbox untuk level di bawah region path
+    def options(self, path=(), start=None, end=None):
+        selected = self._select(self.stores, start, end, path)
+        return list(selected[REGION_LEVELS[len(path)]].unique())
+
+    def revenue_by_period(self, code, start, end, path=()):
+        selected = self._select(self.stores, start, end, path)
+        periode = pd.Series(period_starts(selected['tanggal'].to_numpy(), code), index=selected.index, name='periode')
+        return selected['total_penghasilan'].groupby(periode).sum().reset_index()
+
+    # Total penjualan, rata-rata per transaksi dan jumlah jenis barang
+    def summary(self, start, end, path=()):
+        selected = self._select(self.item_levels[len(path)], start, end, path)
+        total = selected['total_penghasilan'].sum()
+        transactions = selected['transaksi'].sum()
+        return pd.Series({
+            'total_penghasilan': total,
+            'rata_rata_penghasilan': total / transactions if transactions else 0,
+            'jumlah_barang': selected['nama_barang'].nunique(),
+        })
+
+
+# Adapter with the SqlPushdown/MongoPushdown fetch_* interface, so the shared
+# pushdown dashboard can render a cube that was built without a row-level frame
+class CubePushdown:
+    table = 'dataset'
+
+    def fetch_date_range(self, cube):
+        return cube.date_range()
+
+    def fetch_options(self, cube, path=(), start=None, end=None):
+        return cube.options(path, start, end)
+
+    def fetch_top_items(self, cube, start=None, end=None, path=(), n=5):
+        return cube.top_items(start, end, path, n)
+
+    def fetch_top_stores(self, cube, start=None, end=None, path=(), n=5):
+        return cube.top_stores(start, end, path, n)
+
+    def fetch_revenue_by_period(self, cube, code, start=None, end=None, path=()):
+        return cube.revenue_by_period(code, start, end, path)
+
+    def fetch_summary(self, cube, start=None, end=None, path=()):
+        return cube.summary(start, end, path)
+
+
+_cube_cache = LRUCache(max_entries=4)
+
+
+# Register a cube built elsewhere (e.g. updated incrementally) for a dataset
+def cache_cube(df, cube, cache=_cube_cache):
+    key = df.attrs.get('dataset_key')
+    if key is not None:
+        cache.put(key, cube)
+
+
+def cached_cube(df, cache=_cube_cache):
+    key = df.attrs.get('dataset_key')
+    return cache.get(key) if key is not None else None
+
+
+# Build the cube once per loaded dataset (keyed on the content hash set by load_csv)
+def get_cube(df, cache=_cube_cache, aggregator=default_aggregator):
+    key = df.attrs.get('dataset_key')
+    if key is None:
+        return RollupCube(df, aggregator=aggregator)
+    return cache.get_or_build(key, lambda: RollupCube(df, aggregator=aggregator))
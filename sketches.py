@@ -0,0 +1,264 @@
+import numpy as np
+import pandas as pd
+
+from data_loader import LRUCache
+from region_index import get_region_index
+from rollup import REGION_LEVELS
+from time_index import TIME_COLUMN, date_positions
+
+# Sketch per (kabupaten, bulan); level di bawahnya dihitung persis dari baris datanya
+SKETCH_LEVELS = REGION_LEVELS[:2]
+# Counters per heavy-hitter summary and HyperLogLog precision (2^10 registers, about 3.2% error)
+HEAVY_HITTER_CAPACITY = 64
+HLL_PRECISION = 10
+# Rows folded into the sketches at a time; only one chunk is ever aggregated exactly
+CHUNK_ROWS = 500_000
+
+
+def _codes(values):
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype('category')
+    return values.cat.codes.to_numpy(dtype=np.int64), values.cat.categories
+
+
+# Codes of values in an existing vocabulary (-1 for missing or unknown values)
+def _lookup(labels, values):
+    if isinstance(values.dtype, pd.CategoricalDtype) and values.cat.categories.equals(labels):
+        return values.cat.codes.to_numpy(dtype=np.int64)
+    return labels.get_indexer(values)
+
+
+def _bit_length(values):
+    values = values.copy()
+    length = np.zeros(values.shape, dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        large = values >= (np.uint64(1) << np.uint64(shift))
+        length[large] += shift
+        values[large] >>= np.uint64(shift)
+    return length + (values > 0)
+
+
+# HyperLogLog register index and rank (position of the first set bit) of 64-bit hashes
+def hll_positions(hashes, precision=HLL_PRECISION):
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    rest = hashes & np.uint64((1 << (64 - precision)) - 1)
+    rank = (64 - precision) - _bit_length(rest) + 1
+    return index, rank.astype(np.uint8)
+
+
+def hll_estimate(registers):
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)))
+    zeros = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * m and zeros:
+        estimate = m * np.log(m / zeros)
+    return estimate
+
+
+# Merge per-cell heavy-hitter summaries (Misra-Gries form of Space-Saving, which is
+# mergeable): sum the counters, subtract each cell's (capacity+1)-th largest counter
+# and keep the positive ones. Counters are lower bounds of the true weights; every
+# weight in a cell is underestimated by at most (total - sum of counters) / (capacity + 1).
+def merge_summaries(summaries, capacity=HEAVY_HITTER_CAPACITY):
+    merged = pd.concat(summaries, ignore_index=True).groupby(['cell', 'key'], sort=False)['weight'].sum().reset_index()
+    merged = merged.sort_values(['cell', 'weight'], ascending=[True, False], kind='stable', ignore_index=True)
+    rank = merged.groupby('cell', sort=False).cumcount()
+    threshold = merged['weight'].where(rank == capacity).groupby(merged['cell']).transform('max').fillna(0)
+    merged['weight'] -= threshold
+    return merged[(rank < capacity) & (merged['weight'] > 0)].reset_index(drop=True)
+
+
+# Approximate top-n and distinct counts for the national, province and district levels.
+# The rows are folded chunk by chunk into one heavy-hitter summary for items (by jumlah),
+# one for stores (by total_penghasilan) and one HyperLogLog of nama_barang per
+# (kabupaten, month) cell, so no full-data hash aggregation is ever built. A query merges
+# the cells of the whole months in its range under the region path; the partial months at
+# either end are counted exactly from their rows, which adds no error.
+# With a `base` index of the same dataset whose rows from `since` on were replaced or
+# appended (an incremental refresh), the cells of the months before since's month are
+# carried over and only the rows from that month on are folded. Summaries can take in
+# new rows but can't give replaced ones back, so that month is folded again in full.
+class SketchIndex:
+    def __init__(self, df, capacity=HEAVY_HITTER_CAPACITY, precision=HLL_PRECISION, chunk_rows=CHUNK_ROWS, base=None, since=None):
+        self.df = df
+        self.capacity = capacity
+        self.precision = precision
+        times = df[TIME_COLUMN].to_numpy()
+        rows = int(np.searchsorted(times, np.datetime64('NaT'), side='left')) if len(times) else 0
+        self.first_month = times[0].astype('datetime64[M]') if rows else None
+        self.months = int((times[rows - 1].astype('datetime64[M]') - self.first_month).astype(np.int64)) + 1 if rows else 0
+
+        kept = 0
+        if (base is not None and since is not None and rows and base.first_month == self.first_month
+                and all(isinstance(df[column].dtype, pd.CategoricalDtype) for column in ('nama_barang', 'nama_toko'))):
+            kept = min(max(self._month_of(since), 0), base.months)
+        start = date_positions(df, self._month_start(kept), None)[0] if kept else 0
+        frame = df.iloc[start:rows]
+        months = (frame[TIME_COLUMN].to_numpy().astype('datetime64[M]') - self.first_month).astype(np.int64) if rows else np.zeros(0, np.int64)
+
+        # Leaf ids continue the base's; kabupaten first seen in the folded rows are appended
+        known = {} if not kept else {leaf: i for i, leaf in enumerate(base.leaves.itertuples(index=False, name=None))}
+        local_ids = frame.groupby(SKETCH_LEVELS, observed=True, sort=False).ngroup().fillna(-1).to_numpy(dtype=np.int64)
+        local_leaves = int(local_ids.max()) + 1 if len(frame) else 0
+        first_rows = np.full(local_leaves, len(frame), dtype=np.int64)
+        np.minimum.at(first_rows, local_ids[local_ids >= 0], np.flatnonzero(local_ids >= 0))
+        leaves = list(known)
+        to_leaf = np.empty(local_leaves + 1, dtype=np.int64)
+        to_leaf[-1] = -1
+        for local, leaf in enumerate(frame[SKETCH_LEVELS].take(first_rows).itertuples(index=False, name=None)):
+            if leaf not in known:
+                known[leaf] = len(leaves)
+                leaves.append(leaf)
+            to_leaf[local] = known[leaf]
+        leaf_ids = to_leaf[local_ids]
+        self.leaves = pd.DataFrame(leaves, columns=SKETCH_LEVELS)
+
+        # On categorical columns these are the dataset's whole vocabularies, not just the folded rows'
+        item_codes, self.item_labels = _codes(frame['nama_barang'])
+        store_codes, self.store_labels = _codes(frame['nama_toko'])
+        self.item_hashes = pd.util.hash_array(self.item_labels.to_numpy(dtype=object))
+        revenue = frame['total_penghasilan'] if 'total_penghasilan' in frame.columns else frame['jumlah'] * frame['harga']
+        quantity = np.nan_to_num(frame['jumlah'].to_numpy(dtype=np.float64))
+        revenue = np.nan_to_num(revenue.to_numpy(dtype=np.float64))
+
+        cells = len(leaves) * self.months
+        self.item_totals = np.zeros(cells)
+        self.store_totals = np.zeros(cells)
+        self.registers = np.zeros((cells, 1 << precision), dtype=np.uint8)
+        self.items = pd.DataFrame({'cell': pd.Series(dtype=np.int64), 'key': pd.Series(dtype=np.int64), 'weight': pd.Series(dtype=np.float64)})
+        self.stores = self.items
+        if kept:
+            self._carry(base, kept)
+        for chunk_start in range(0, len(frame), chunk_rows):
+            chunk = slice(chunk_start, min(chunk_start + chunk_rows, len(frame)))
+            cell = np.where(leaf_ids[chunk] >= 0, leaf_ids[chunk] * self.months + months[chunk], -1)
+            self.items, self.item_totals = self._fold(self.items, self.item_totals, cell, item_codes[chunk], quantity[chunk])
+            self.stores, self.store_totals = self._fold(self.stores, self.store_totals, cell, store_codes[chunk], revenue[chunk])
+            self._add_items(self.registers, cell, item_codes[chunk])
+
+    # Copy the base's cells of the first `kept` months into this index's cell layout
+    # (more months per leaf) and vocabularies
+    def _carry(self, base, kept):
+        leaf, month = np.divmod(np.arange(len(base.leaves) * base.months), base.months)
+        carried = month < kept
+        target = np.where(carried, leaf * self.months + month, -1)
+        self.item_totals[target[carried]] = base.item_totals[carried]
+        self.store_totals[target[carried]] = base.store_totals[carried]
+        self.registers[target[carried]] = base.registers[carried]
+
+        def remap(summary, keys):
+            cell, key = target[summary['cell'].to_numpy()], keys[summary['key'].to_numpy()]
+            valid = (cell >= 0) & (key >= 0)
+            return pd.DataFrame({'cell': cell[valid], 'key': key[valid], 'weight': summary['weight'].to_numpy()[valid]})
+
+        self.items = remap(base.items, self.item_labels.get_indexer(base.item_labels))
+        self.stores = remap(base.stores, self.store_labels.get_indexer(base.store_labels))
+
+    # The index after an incremental refresh replaced or appended the rows from `since` on
+    def updated(self, df, since):
+        return SketchIndex(df, self.capacity, self.precision, base=self, since=since)
+
+    def _fold(self, summary, totals, cell, keys, weights):
+        valid = (cell >= 0) & (keys >= 0)
+        part = pd.DataFrame({'cell': cell[valid], 'key': keys[valid], 'weight': weights[valid]})
+        part = part.groupby(['cell', 'key'], sort=False)['weight'].sum().reset_index()
+        totals = totals + np.bincount(cell[valid], weights=weights[valid], minlength=len(totals))
+        return merge_summaries([summary, part], self.capacity), totals
+
+    def _add_items(self, registers, cell, keys):
+        valid = (cell >= 0) & (keys >= 0)
+        pairs = np.unique(np.stack([cell[valid], keys[valid]]), axis=1)
+        index, rank = hll_positions(self.item_hashes[pairs[1]], self.precision)
+        np.maximum.at(registers, (pairs[0], index), rank)
+
+    def _month_start(self, month):
+        return pd.Timestamp(self.first_month + np.timedelta64(month, 'M'))
+
+    def _month_of(self, when):
+        return int((np.datetime64(pd.Timestamp(when), 'M') - self.first_month).astype(np.int64))
+
+    # Cells of the whole months inside [start, end) under the path, and the partial day ranges left over
+    def _plan(self, start, end, path):
+        if self.first_month is None:
+            return np.zeros(0, dtype=np.int64), []
+        start = self._month_start(0) if start is None else pd.Timestamp(start)
+        end = self._month_start(self.months) if end is None else pd.Timestamp(end)
+        first_full = start.to_period('M').start_time
+        if first_full < start:
+            first_full += pd.offsets.MonthBegin(1)
+        last_full = end.to_period('M').start_time
+        if first_full >= last_full:
+            return np.zeros(0, dtype=np.int64), [(start, end)]
+
+        m0 = min(max(self._month_of(first_full), 0), self.months)
+        m1 = min(max(self._month_of(last_full), 0), self.months)
+        leaves = self.leaves
+        for column, value in zip(SKETCH_LEVELS, path):
+            leaves = leaves[leaves[column] == value]
+        cells = (leaves.index.to_numpy()[:, None] * self.months + np.arange(m0, m1)[None, :]).ravel()
+        return cells, [(start, first_full), (last_full, end)]
+
+    def _partial_rows(self, partial, path):
+        index = get_region_index(self.df, self.df.attrs.get('dataset_key'))
+        frames = [index.subset(path, *date_positions(self.df, a, b)) for a, b in partial if a < b]
+        return pd.concat(frames) if frames else self.df.iloc[:0]
+
+    def _top(self, summary, totals, labels, cells, rows, key_column, weights, label, measure, n):
+        selected = summary[summary['cell'].isin(cells)]
+        counted = selected.groupby('cell')['weight'].sum().reindex(cells, fill_value=0).to_numpy()
+        error = float(np.sum(totals[cells] - counted)) / (self.capacity + 1)
+        counts = selected.groupby('key')['weight'].sum()
+        if len(rows):
+            keys = _lookup(labels, rows[key_column])
+            exact = pd.Series(weights.to_numpy(dtype=np.float64), index=keys).groupby(level=0).sum()
+            counts = counts.add(exact[exact.index >= 0], fill_value=0)
+        top = counts.nlargest(n)
+        return pd.DataFrame({label: labels.take(top.index).astype(str), measure: top.to_numpy(), 'galat': max(error, 0.0)})
+
+    # Top-n produk berdasarkan jumlah terjual; 'galat' is the most any count may be underestimated by
+    def top_items(self, start, end, path=(), n=5):
+        cells, partial = self._plan(start, end, path)
+        rows = self._partial_rows(partial, path)
+        return self._top(self.items, self.item_totals, self.item_labels, cells, rows, 'nama_barang', rows['jumlah'], 'nama_barang', 'jumlah', n)
+
+    # Top-n toko berdasarkan total_penghasilan
+    def top_stores(self, start, end, path=(), n=5):
+        cells, partial = self._plan(start, end, path)
+        rows = self._partial_rows(partial, path)
+        revenue = rows['total_penghasilan'] if 'total_penghasilan' in rows.columns else rows['jumlah'] * rows['harga']
+        return self._top(self.stores, self.store_totals, self.store_labels, cells, rows, 'nama_toko', revenue, 'nama_toko', 'total_penghasilan', n)
+
+    # Perkiraan jumlah jenis barang terjual dengan galat relatif (standard error) HyperLogLog
+    def distinct_items(self, start, end, path=()):
+        cells, partial = self._plan(start, end, path)
+        registers = self.registers[cells].max(axis=0) if len(cells) else np.zeros(1 << self.precision, dtype=np.uint8)
+        rows = self._partial_rows(partial, path)
+        if len(rows):
+            keys = _lookup(self.item_labels, rows['nama_barang'])
+            keys = np.unique(keys[keys >= 0])
+            index, rank = hll_positions(self.item_hashes[keys], self.precision)
+            np.maximum.at(registers, index, rank)
+        return {'estimate': int(round(hll_estimate(registers))), 'relative_error': float(1.04 / np.sqrt(registers.shape[-1]))}
+
+
+_sketch_cache = LRUCache(max_entries=4)
+
+
+# Register an index built elsewhere (e.g. updated incrementally) for a dataset
+def cache_sketch_index(df, index, cache=_sketch_cache):
+    key = df.attrs.get('dataset_key')
+    if key is not None:
+        cache.put(key, index)
+
+
+def cached_sketch_index(df, cache=_sketch_cache):
+    key = df.attrs.get('dataset_key')
+    return cache.get(key) if key is not None else None
+
+
+def get_sketch_index(df, cache=_sketch_cache):
+    key = df.attrs.get('dataset_key')
+    if key is None:
+        return SketchIndex(df)
+    return cache.get_or_build(key, lambda: SketchIndex(df))
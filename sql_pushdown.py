@@ -0,0 +1,164 @@
+import re
+
+import pandas as pd
+
+from rollup import REGION_LEVELS
+
+IDENTIFIER_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)?$')
+
+
+# SQL differences between the supported servers: placeholder style and period truncation.
+# The period expressions avoid literal % signs, which clash with the %s paramstyle.
+SQL_DIALECTS = {
+    'postgresql': {
+        'placeholder': '%s',
+        'periods': {
+            'D': "date_trunc('day', {column})",
+            'W': "date_trunc('week', {column})",
+            'M': "date_trunc('month', {column})",
+        },
+    },
+    'mysql': {
+        'placeholder': '%s',
+        'periods': {
+            'D': "DATE({column})",
+            'W': "DATE_SUB(DATE({column}), INTERVAL WEEKDAY({column}) DAY)",
+            'M': "DATE_SUB(DATE({column}), INTERVAL DAYOFMONTH({column}) - 1 DAY)",
+        },
+    },
+    'sqlite': {
+        'placeholder': '?',
+        'periods': {
+            'D': "date({column})",
+            'W': "date({column}, '-6 days', 'weekday 1')",
+            'M': "date({column}, 'start of month')",
+        },
+    },
+}
+
+
+def _check_identifier(name):
+    if not IDENTIFIER_PATTERN.match(name or ''):
+        raise ValueError(f"Nama tabel/kolom tidak valid: {name!r}")
+    return name
+
+
+# Generates parameterized aggregate queries for the dashboard so only the small
+# results (options, top-5 rows, revenue per period) leave the database server
+class SqlPushdown:
+    def __init__(self, table, dialect='postgresql', revenue_column=None, time_column='tgl_transaksi'):
+        if dialect not in SQL_DIALECTS:
+            raise ValueError(f"Dialek SQL tidak didukung: {dialect}")
+        self.table = _check_identifier(table)
+        self.dialect = dialect
+        self.time_column = _check_identifier(time_column)
+        # Tanpa kolom total_penghasilan, pendapatan dihitung dari jumlah * harga seperti pada CSV
+        self.revenue = _check_identifier(revenue_column) if revenue_column else 'jumlah * harga'
+        self._placeholder = SQL_DIALECTS[dialect]['placeholder']
+
+    def _param(self, value):
+        if isinstance(value, pd.Timestamp):
+            value = value.to_pydatetime()
+        if self.dialect == 'sqlite' and hasattr(value, 'isoformat'):
+            value = value.isoformat(sep=' ')
+        return value
+
+    # WHERE clause for the date range [start, end) and the selected region path
+    def _where(self, start=None, end=None, path=()):
+        clauses, params = [], []
+        if start is not None:
+            clauses.append(f"{self.time_column} >= {self._placeholder}")
+            params.append(self._param(start))
+        if end is not None:
+            clauses.append(f"{self.time_column} < {self._placeholder}")
+            params.append(self._param(end))
+        for column, value in zip(REGION_LEVELS, path):
+            clauses.append(f"{column} = {self._placeholder}")
+            params.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def date_range_query(self):
+        return f"SELECT MIN({self.time_column}) AS awal, MAX({self.time_column}) AS akhir FROM {self.table}", []
+
+    # Pilihan selectbox untuk level di bawah region path
+    def options_query(self, path=(), start=None, end=None):
+        column = REGION_LEVELS[len(path)]
+        where, params = self._where(start, end, path)
+        return f"SELECT DISTINCT {column} FROM {self.table}{where} ORDER BY {column}", params
+
+    def top_items_query(self, start=None, end=None, path=(), n=5):
+        where, params = self._where(start, end, path)
+        sql = (
+            f"SELECT nama_barang, SUM(jumlah) AS jumlah FROM {self.table}{where} "
+            f"GROUP BY nama_barang ORDER BY SUM(jumlah) DESC, nama_barang LIMIT {int(n)}"
+        )
+        return sql, params
+
+    def top_stores_query(self, start=None, end=None, path=(), n=5):
+        where, params = self._where(start, end, path)
+        sql = (
+            f"SELECT nama_toko, SUM({self.revenue}) AS total_penghasilan FROM {self.table}{where} "
+            f"GROUP BY nama_toko ORDER BY SUM({self.revenue}) DESC, nama_toko LIMIT {int(n)}"
+        )
+        return sql, params
+
+    def revenue_by_period_query(self, code, start=None, end=None, path=()):
+        period = SQL_DIALECTS[self.dialect]['periods'][code].format(column=self.time_column)
+        where, params = self._where(start, end, path)
+        sql = (
+            f"SELECT {period} AS periode, SUM({self.revenue}) AS total_penghasilan FROM {self.table}{where} "
+            f"GROUP BY {period} ORDER BY periode"
+        )
+        return sql, params
+
+    # Total penjualan, rata-rata per transaksi dan jumlah jenis barang
+    def summary_query(self, start=None, end=None, path=()):
+        where, params = self._where(start, end, path)
+        sql = (
+            f"SELECT SUM({self.revenue}) AS total_penghasilan, AVG({self.revenue}) AS rata_rata_penghasilan, "
+            f"COUNT(DISTINCT nama_barang) AS jumlah_barang FROM {self.table}{where}"
+        )
+        return sql, params
+
+    # Row-level dashboard columns of transactions at or after the watermark (all rows
+    # without one), used to load a table once and then append only the new rows
+    def rows_since_query(self, watermark=None):
+        columns = REGION_LEVELS + ['nama_barang', 'jumlah', 'harga']
+        select = [f"{self.time_column} AS tgl_transaksi"] + columns
+        if self.revenue != 'jumlah * harga':
+            select.append(f"{self.revenue} AS total_penghasilan")
+        where, params = self._where(start=watermark)
+        return f"SELECT {', '.join(select)} FROM {self.table}{where} ORDER BY {self.time_column}", params
+
+    @staticmethod
+    def run(conn, query):
+        sql, params = query
+        return pd.read_sql(sql, conn, params=params or None)
+
+    def fetch_date_range(self, conn):
+        result = self.run(conn, self.date_range_query())
+        return pd.to_datetime(result['awal'].iloc[0]), pd.to_datetime(result['akhir'].iloc[0])
+
+    def fetch_options(self, conn, path=(), start=None, end=None):
+        result = self.run(conn, self.options_query(path, start, end))
+        return result.iloc[:, 0].dropna().tolist()
+
+    def fetch_top_items(self, conn, start=None, end=None, path=(), n=5):
+        return self.run(conn, self.top_items_query(start, end, path, n))
+
+    def fetch_top_stores(self, conn, start=None, end=None, path=(), n=5):
+        return self.run(conn, self.top_stores_query(start, end, path, n))
+
+    def fetch_revenue_by_period(self, conn, code, start=None, end=None, path=()):
+        result = self.run(conn, self.revenue_by_period_query(code, start, end, path))
+        result['periode'] = pd.to_datetime(result['periode'])
+        return result
+
+    def fetch_summary(self, conn, start=None, end=None, path=()):
+        return self.run(conn, self.summary_query(start, end, path)).iloc[0]
+
+    def fetch_rows_since(self, conn, watermark=None):
+        result = self.run(conn, self.rows_since_query(watermark))
+        result['tgl_transaksi'] = pd.to_datetime(result['tgl_transaksi'])
+        return result
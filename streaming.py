@@ -0,0 +1,77 @@
+import pandas as pd
+
+from data_loader import DATE_FORMAT, LRUCache, content_hash
+from encoding import ENCODED_COLUMNS, encode_columns
+from rollup import REGION_LEVELS, RollupCube, fold_rows, merge_folds
+
+# Hanya kolom ini yang di-parse saat streaming; kolom lain di file dilewati
+STREAM_COLUMNS = ['tgl_transaksi'] + REGION_LEVELS + ['nama_barang', 'jumlah', 'harga', 'total_penghasilan']
+STREAM_DTYPES = dict(
+    {column: 'category' for column in ENCODED_COLUMNS},
+    jumlah='float64', harga='float64', total_penghasilan='float64',
+)
+# Rough in-memory size of one parsed row, used to size chunks from the memory ceiling
+ROW_BYTES_ESTIMATE = 300
+
+
+def _frames_bytes(frames):
+    return sum(int(frame.memory_usage(deep=True).sum()) for frame in frames)
+
+
+def _file_size(uploaded_file):
+    if hasattr(uploaded_file, "size"):
+        return uploaded_file.size
+    if hasattr(uploaded_file, "getbuffer"):
+        return uploaded_file.getbuffer().nbytes
+    return None
+
+
+# Read a CSV upload in chunks and fold every chunk straight into the rollup cube,
+# so memory stays bounded by memory_limit_mb instead of by the file size.
+# Raw chunks use at most a quarter of the ceiling and the partial folds at most half;
+# when the folds grow past that they are merged, and if the merged aggregates
+# alone still exceed it a MemoryError is raised instead of exhausting the host.
+def stream_csv_cube(uploaded_file, memory_limit_mb=512, chunksize=None, progress=None):
+    limit = memory_limit_mb * 1024 * 1024
+    if chunksize is None:
+        chunksize = max(10000, limit // 4 // ROW_BYTES_ESTIMATE)
+    total_bytes = _file_size(uploaded_file)
+    uploaded_file.seek(0)
+    reader = pd.read_csv(
+        uploaded_file,
+        usecols=lambda column: column in STREAM_COLUMNS,
+        dtype=STREAM_DTYPES,
+        chunksize=chunksize,
+    )
+
+    folds, rows = [], 0
+    for chunk in reader:
+        chunk['tgl_transaksi'] = pd.to_datetime(chunk['tgl_transaksi'], format=DATE_FORMAT, dayfirst=True)
+        folds.append(fold_rows(chunk))
+        rows += len(chunk)
+        if _frames_bytes(folds) > limit // 2:
+            folds = [merge_folds(folds)]
+            if _frames_bytes(folds) > limit // 2:
+                raise MemoryError(f"Agregat data melebihi batas memori {memory_limit_mb} MB")
+        if progress is not None:
+            fraction = min(uploaded_file.tell() / total_bytes, 1.0) if total_bytes else 0.0
+            progress(fraction, rows)
+
+    if not folds:
+        raise ValueError("File CSV tidak berisi data transaksi")
+    # Chunks with different vocabularies merge into plain strings; encode the result once
+    finest = encode_columns(merge_folds(folds))
+    return RollupCube(finest=finest)
+
+
+_stream_cache = LRUCache(max_entries=4)
+
+
+# Streamed cubes are cached on the upload's content hash like load_csv frames
+def load_csv_streaming(uploaded_file, memory_limit_mb=512, progress=None, cache=_stream_cache):
+    key = (content_hash(uploaded_file), memory_limit_mb)
+    cube = cache.get(key)
+    if cube is None:
+        cube = stream_csv_cube(uploaded_file, memory_limit_mb, progress=progress)
+        cache.put(key, cube)
+    return cube
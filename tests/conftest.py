@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The modules live at the repository root, next to app.py; reference.py next to the tests
+TESTS = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(TESTS), TESTS]
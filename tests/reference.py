@@ -0,0 +1,54 @@
+# Small generated sales frames and plain-pandas reference aggregates the indexes are checked against
+import numpy as np
+import pandas as pd
+
+from rollup import REGION_LEVELS
+
+STORES = [
+    ('Jawa Barat', 'Bandung', 'Coblong', 'Toko A'),
+    ('Jawa Barat', 'Bandung', 'Coblong', 'Toko B'),
+    ('Jawa Barat', 'Bandung', 'Sukajadi', 'Toko C'),
+    ('Jawa Barat', 'Bogor', 'Tanah Sareal', 'Toko D'),
+    ('Jawa Timur', 'Surabaya', 'Genteng', 'Toko E'),
+    ('Jawa Timur', 'Malang', 'Klojen', 'Toko F'),
+]
+
+
+# Raw transaction rows like a database table or parsed CSV: n rows over `days` days from
+# 2023-01-01 with whole-minute timestamps. Non-integer quantities and prices keep sums
+# (and so top-n rankings) free of ties; `item_skew` > 0 makes a few items dominate.
+def raw_sales(n=2000, seed=7, days=90, items=25, item_skew=0.0, stores=STORES):
+    rng = np.random.default_rng(seed)
+    picked = rng.integers(0, len(stores), n)
+    times = pd.Timestamp('2023-01-01') + pd.to_timedelta(np.sort(rng.integers(0, days * 24 * 60, n)), unit='min')
+    frame = pd.DataFrame([stores[i] for i in picked], columns=REGION_LEVELS)
+    frame.insert(0, 'tgl_transaksi', times)
+    weights = 1.0 / np.arange(1, items + 1) ** item_skew
+    frame['nama_barang'] = rng.choice([f'Barang {i:03d}' for i in range(items)], n, p=weights / weights.sum())
+    frame['jumlah'] = rng.uniform(1, 10, n).round(3)
+    frame['harga'] = rng.uniform(1000, 50000, n).round(2)
+    return frame
+
+
+# Rows of a prepared frame inside [start, end) and under the region path, the plain-pandas
+# way the dashboard filtered before any index existed; revenue is jumlah * harga
+def reference_rows(df, start=None, end=None, path=()):
+    # Rows without a timestamp fall in no date range, as with the dashboard's date filter
+    mask = df['tgl_transaksi'].notna()
+    if start is not None:
+        mask &= df['tgl_transaksi'] >= start
+    if end is not None:
+        mask &= df['tgl_transaksi'] < end
+    for column, value in zip(REGION_LEVELS, path):
+        mask &= df[column] == value
+    rows = df[mask].copy()
+    rows['total_penghasilan'] = rows['jumlah'] * rows['harga']
+    return rows
+
+
+# Revenue per period start the way the dashboard computed it with to_period
+def reference_revenue_by_period(rows, code):
+    periode = rows['tgl_transaksi'].dt.to_period(code).dt.start_time.rename('periode')
+    result = rows['total_penghasilan'].groupby(periode).sum().reset_index()
+    result['periode'] = result['periode'].astype('datetime64[ns]')
+    return result
@@ -0,0 +1,18 @@
+# Scaled-down run of the auth load test: concurrent logins on a scratch user store
+# must all succeed and their session tokens must resolve back to the user.
+import pytest
+
+pytest.importorskip('werkzeug')
+
+from auth_load import run_load_test
+from auth_store import SessionTokens, UserStore
+
+
+def test_concurrent_logins(tmp_path):
+    store = UserStore(str(tmp_path / 'users.db'), max_connections=4, hash_workers=2, tokens=SessionTokens(b'test-secret'))
+    try:
+        result = run_load_test(store, users=8, rounds=2)
+    finally:
+        store.close()
+    assert result['failures'] == 0, result['errors']
+    assert result['logins'] == 16
@@ -0,0 +1,8 @@
+from batch_report import report_name
+
+
+def test_report_names_stay_distinct_for_colliding_slugs():
+    paths = [('Jawa Barat', 'Bandung', 'Coblong', name) for name in ('Toko A/B', 'Toko A-B', 'Toko A_B', 'Toko A B')]
+    names = [report_name(path) for path in paths]
+    assert len(set(names)) == len(paths)
+    assert all(name.startswith('Jawa_Barat__Bandung__Coblong__Toko_A') for name in names)
@@ -0,0 +1,23 @@
+import pandas as pd
+
+from encoding import VocabularyRegistry
+
+
+def test_registry_shares_equal_vocabularies():
+    registry = VocabularyRegistry()
+    first = pd.CategoricalDtype(['a', 'b'])
+    assert registry.intern('nama_toko', first) is first
+    assert registry.intern('nama_toko', pd.CategoricalDtype(['a', 'b'])) is first
+
+
+def test_registry_evicts_least_recently_used():
+    registry = VocabularyRegistry(max_entries=2)
+    kept = pd.CategoricalDtype(['a'])
+    registry.intern('nama_toko', kept)
+    registry.intern('nama_toko', pd.CategoricalDtype(['b']))
+    registry.intern('nama_toko', pd.CategoricalDtype(['a']))
+    registry.intern('nama_toko', pd.CategoricalDtype(['c']))
+    assert registry.stats()['vocabularies'] == 2
+    assert registry.intern('nama_toko', pd.CategoricalDtype(['a'])) is kept
+    fresh = pd.CategoricalDtype(['b'])
+    assert registry.intern('nama_toko', fresh) is fresh
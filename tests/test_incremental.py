@@ -0,0 +1,141 @@
+# IncrementalDataset refreshes against a growing source table: the frame must hold every
+# visible row once, and the cube and indexes carried over from the previous version must
+# answer exactly like ones built from scratch on the refreshed frame.
+import numpy as np
+import pandas as pd
+import pytest
+
+from incremental import IncrementalDataset
+from periods import PeriodBuckets, cached_period_buckets, get_period_buckets
+from prefix_sums import PrefixSumIndex, cached_prefix_index, get_prefix_index
+from reference import STORES, raw_sales
+from region_index import RegionIndex, cached_region_index, get_region_index
+from rollup import REGION_LEVELS, RollupCube, cached_cube, get_cube
+from sketches import SketchIndex, cached_sketch_index, get_sketch_index
+
+RANGES = [(None, None), (pd.Timestamp('2023-01-20'), pd.Timestamp('2023-02-27')), (pd.Timestamp('2023-03-10'), None)]
+# Refreshes that add nothing, a few rows, rows of a store not seen before and the rest
+VISIBLE = [3000, 3000, 3400, 5200, 6000]
+
+
+# The source table; fetch_since returns the rows visible so far from the watermark on
+class Source:
+    def __init__(self, rows):
+        self.rows = rows
+        self.visible = 0
+
+    def fetch_since(self, watermark):
+        rows = self.rows.iloc[:self.visible]
+        if watermark is not None:
+            rows = rows[rows['tgl_transaksi'] >= watermark]
+        return rows.copy()
+
+
+@pytest.fixture(scope='module')
+def source():
+    rows = raw_sales(6000, days=120, stores=STORES + [('Jawa Timur', 'Malang', 'Klojen', 'Toko Baru')])
+    # Hourly timestamps, so rows sharing the watermark's timestamp are refetched and replaced
+    rows['tgl_transaksi'] = rows['tgl_transaksi'].dt.floor('h')
+    rows.loc[rows.index[:5000], 'nama_toko'] = rows['nama_toko'].where(rows['nama_toko'] != 'Toko Baru', 'Toko F')
+    # Rows without a store or without a timestamp in the first load
+    rows.loc[7, 'kabupaten'] = None
+    rows.loc[[11, 900], 'tgl_transaksi'] = pd.NaT
+    return Source(rows)
+
+
+def region_paths(index, path=()):
+    yield path
+    if len(path) < len(REGION_LEVELS):
+        for name in index.options(path):
+            yield from region_paths(index, path + (name,))
+
+
+def check_region_index(df, carried):
+    fresh = RegionIndex(df)
+    bounds = [(0, None), (500, 2500), (len(df) // 2, len(df))]
+    for path in region_paths(fresh):
+        for lo, hi in bounds:
+            assert carried.options(path, lo, hi) == fresh.options(path, lo, hi)
+            np.testing.assert_array_equal(carried.rows(path, lo, hi), fresh.rows(path, lo, hi))
+
+
+def check_prefix_index(df, carried, paths):
+    fresh = PrefixSumIndex(df)
+    for start, end in RANGES:
+        for path in paths:
+            pd.testing.assert_series_equal(carried.totals(start, end, path), fresh.totals(start, end, path))
+            for code in ('D', 'W', 'M'):
+                pd.testing.assert_frame_equal(carried.revenue_by_period(code, start, end, path), fresh.revenue_by_period(code, start, end, path))
+        key = REGION_LEVELS
+        previous = (pd.Timestamp('2023-01-01'), pd.Timestamp('2023-02-01'))
+        pd.testing.assert_frame_equal(carried.store_growth((start, end), previous, n=20).sort_values(key, ignore_index=True),
+                                      fresh.store_growth((start, end), previous, n=20).sort_values(key, ignore_index=True))
+
+
+def check_cube(df, carried, paths):
+    fresh = RollupCube(df)
+    for start, end in RANGES:
+        for path in paths:
+            pd.testing.assert_frame_equal(carried.top_items(start, end, path), fresh.top_items(start, end, path), check_categorical=False)
+            pd.testing.assert_series_equal(carried.summary(start, end, path), fresh.summary(start, end, path))
+            if len(path) < len(REGION_LEVELS):
+                pd.testing.assert_frame_equal(carried.top_stores(start, end, path), fresh.top_stores(start, end, path), check_categorical=False)
+
+
+def check_sketch_index(df, carried):
+    fresh = SketchIndex(df)
+    for start, end in RANGES:
+        for path in [(), ('Jawa Timur',), ('Jawa Timur', 'Malang')]:
+            pd.testing.assert_frame_equal(carried.top_items(start, end, path), fresh.top_items(start, end, path))
+            pd.testing.assert_frame_equal(carried.top_stores(start, end, path), fresh.top_stores(start, end, path))
+            assert carried.distinct_items(start, end, path) == fresh.distinct_items(start, end, path)
+
+
+def test_refresh_carries_indexes(source):
+    dataset = IncrementalDataset('test-refresh-carries-indexes', source.fetch_since)
+    for step, visible in enumerate(VISIBLE):
+        source.visible = visible
+        df = dataset.refresh()
+        assert len(df) == visible
+        assert df['tgl_transaksi'].dropna().is_monotonic_increasing
+        if step == 0:
+            # What the dashboard builds on first use of the loaded version
+            get_region_index(df, df.attrs['dataset_key'])
+            get_prefix_index(df)
+            buckets = get_period_buckets(df)
+            buckets.get('D')
+            buckets.get('W')
+            get_cube(df)
+            get_sketch_index(df)
+            continue
+        paths = [(), ('Jawa Timur',), ('Jawa Timur', 'Malang'), ('Jawa Timur', 'Malang', 'Klojen', 'Toko Baru'), ('Jawa Barat', 'Bogor', 'Tanah Sareal', 'Toko D')]
+        check_region_index(df, cached_region_index(df))
+        check_prefix_index(df, cached_prefix_index(df), paths)
+        check_cube(df, cached_cube(df), paths)
+        check_sketch_index(df, cached_sketch_index(df))
+        fresh = PeriodBuckets(df)
+        for code in ('D', 'W'):
+            np.testing.assert_array_equal(cached_period_buckets(df).get(code), fresh.get(code))
+
+
+def test_refresh_interval_follows_longest_request(monkeypatch):
+    dataset = IncrementalDataset('test-refresh-interval', lambda watermark: None)
+    calls = []
+
+    def schedule(interval):
+        calls.append(interval)
+        dataset.interval = interval
+
+    def stop():
+        calls.append('stop')
+        dataset.interval = None
+
+    monkeypatch.setattr(dataset, 'schedule', schedule)
+    monkeypatch.setattr(dataset, 'stop', stop)
+    dataset.request_interval('a', 60)
+    dataset.request_interval('b', 300)
+    dataset.request_interval('a', 120)
+    # One session turning auto refresh off keeps the other session's schedule
+    dataset.request_interval('b', 0)
+    dataset.request_interval('a', 0)
+    assert calls == [60, 300, 120, 'stop']
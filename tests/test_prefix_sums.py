@@ -0,0 +1,76 @@
+# PrefixSumIndex range totals, period comparison, store growth ranking and revenue per
+# period against plain pandas over the filtered rows, for whole-day ranges at every level.
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_loader import prepare_dataframe
+from prefix_sums import PrefixSumIndex
+from reference import raw_sales, reference_revenue_by_period, reference_rows
+from rollup import REGION_LEVELS
+
+RANGES = [(None, None), (pd.Timestamp('2023-01-20'), pd.Timestamp('2023-01-27')), (pd.Timestamp('2023-02-03'), pd.Timestamp('2023-03-01')),
+          (pd.Timestamp('2022-12-01'), pd.Timestamp('2023-01-05')), (pd.Timestamp('2023-03-25'), pd.Timestamp('2023-06-01'))]
+PATHS = [(), ('Jawa Barat',), ('Jawa Barat', 'Bandung'), ('Jawa Barat', 'Bandung', 'Coblong'), ('Jawa Barat', 'Bandung', 'Coblong', 'Toko A'),
+         ('Jawa Barat', 'Bandung', 'Coblong', 'Toko Lain')]
+
+
+@pytest.fixture(scope='module')
+def df():
+    raw = raw_sales(3000)
+    # A row without a store and one without a timestamp count only where they can
+    raw.loc[10, 'nama_toko'] = None
+    raw.loc[20, 'tgl_transaksi'] = pd.NaT
+    return prepare_dataframe(raw)
+
+
+@pytest.fixture(scope='module')
+def index(df):
+    return PrefixSumIndex(df)
+
+
+def test_totals(df, index):
+    for start, end in RANGES:
+        for path in PATHS:
+            rows = reference_rows(df, start, end, path)
+            totals = index.totals(start, end, path)
+            assert totals['total_penghasilan'] == pytest.approx(rows['total_penghasilan'].sum())
+            assert totals['jumlah'] == pytest.approx(rows['jumlah'].sum())
+            assert totals['transaksi'] == len(rows)
+            assert totals['rata_rata_penghasilan'] == pytest.approx(rows['total_penghasilan'].mean() if len(rows) else 0)
+
+
+def test_compare(df, index):
+    current, previous = RANGES[2], (pd.Timestamp('2023-01-06'), pd.Timestamp('2023-02-03'))
+    for path in PATHS[:-1]:
+        now = reference_rows(df, *current, path)['total_penghasilan'].sum()
+        before = reference_rows(df, *previous, path)['total_penghasilan'].sum()
+        comparison = index.compare(current, previous, path)
+        assert comparison.loc['total_penghasilan', 'pertumbuhan_persen'] == pytest.approx((now - before) / before * 100)
+
+
+def test_store_growth(df, index):
+    current, previous = RANGES[2], (pd.Timestamp('2023-01-06'), pd.Timestamp('2023-02-03'))
+    for path in PATHS[:3]:
+        now = reference_rows(df, *current, path).groupby(REGION_LEVELS, observed=True)['total_penghasilan'].sum()
+        before = reference_rows(df, *previous, path).groupby(REGION_LEVELS, observed=True)['total_penghasilan'].sum()
+        growth = ((now - before) / before * 100).dropna().nlargest(3)
+        ranked = index.store_growth(current, previous, path, n=3)
+        assert list(ranked['nama_toko']) == list(growth.index.get_level_values('nama_toko'))
+        np.testing.assert_allclose(ranked['pertumbuhan_persen'], growth.to_numpy())
+
+
+def test_revenue_by_period(df, index):
+    for start, end in RANGES:
+        for path in PATHS:
+            rows = reference_rows(df, start, end, path)
+            for code in ('D', 'W', 'M'):
+                result = index.revenue_by_period(code, start, end, path)
+                result['periode'] = result['periode'].astype('datetime64[ns]')
+                pd.testing.assert_frame_equal(result, reference_revenue_by_period(rows, code))
+
+
+def test_empty_dataset():
+    index = PrefixSumIndex(prepare_dataframe(raw_sales(0)))
+    assert index.totals(None, None)['transaksi'] == 0
+    assert index.revenue_by_period('M', None, None).empty
@@ -0,0 +1,72 @@
+# RollupCube (single process and on day-aligned partitions in a process pool) against
+# plain pandas over the filtered rows: top-5 items and stores, summary, options and
+# revenue per period must come out the same for every date range and region path.
+import pandas as pd
+import pytest
+
+from data_loader import prepare_dataframe
+from parallel import ParallelAggregator
+from reference import raw_sales, reference_revenue_by_period, reference_rows
+from rollup import REGION_LEVELS, RollupCube
+
+RANGES = [(None, None), (pd.Timestamp('2023-01-20'), pd.Timestamp('2023-01-27')), (pd.Timestamp('2023-02-03'), pd.Timestamp('2023-03-01'))]
+PATHS = [(), ('Jawa Barat',), ('Jawa Barat', 'Bandung'), ('Jawa Barat', 'Bandung', 'Coblong'), ('Jawa Barat', 'Bandung', 'Coblong', 'Toko A')]
+
+
+@pytest.fixture(scope='module')
+def df():
+    return prepare_dataframe(raw_sales(3000))
+
+
+@pytest.fixture(scope='module', params=['single', 'parallel'])
+def cube(request, df):
+    if request.param == 'single':
+        yield RollupCube(df)
+        return
+    # Small partitions so the 90 days really are split over the workers
+    aggregator = ParallelAggregator(workers=2, min_rows=500)
+    try:
+        assert len(aggregator.partitions(df['tgl_transaksi'].to_numpy().astype('datetime64[D]'))) == 2
+        yield RollupCube(df, aggregator=aggregator)
+    finally:
+        aggregator.close()
+
+
+def reference_top(rows, label, measure):
+    return rows.groupby(label, observed=True)[measure].sum().nlargest(5).reset_index().astype({label: str})
+
+
+def test_top_items_and_stores(df, cube):
+    for start, end in RANGES:
+        for path in PATHS:
+            rows = reference_rows(df, start, end, path)
+            pd.testing.assert_frame_equal(cube.top_items(start, end, path), reference_top(rows, 'nama_barang', 'jumlah'))
+            if len(path) < len(REGION_LEVELS):
+                pd.testing.assert_frame_equal(cube.top_stores(start, end, path), reference_top(rows, 'nama_toko', 'total_penghasilan'))
+
+
+def test_summary(df, cube):
+    for start, end in RANGES:
+        for path in PATHS:
+            rows = reference_rows(df, start, end, path)
+            summary = cube.summary(start, end, path)
+            assert summary['total_penghasilan'] == pytest.approx(rows['total_penghasilan'].sum())
+            assert summary['rata_rata_penghasilan'] == pytest.approx(rows['total_penghasilan'].mean())
+            assert summary['jumlah_barang'] == rows['nama_barang'].nunique()
+
+
+def test_options(df, cube):
+    for start, end in RANGES:
+        for path in PATHS[:-1]:
+            rows = reference_rows(df, start, end, path)
+            assert sorted(cube.options(path, start, end)) == sorted(rows[REGION_LEVELS[len(path)]].unique())
+
+
+def test_revenue_by_period(df, cube):
+    for start, end in RANGES:
+        for path in PATHS:
+            rows = reference_rows(df, start, end, path)
+            for code in ('D', 'W', 'M'):
+                result = cube.revenue_by_period(code, start, end, path)
+                result['periode'] = result['periode'].astype('datetime64[ns]')
+                pd.testing.assert_frame_equal(result, reference_revenue_by_period(rows, code))
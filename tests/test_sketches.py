@@ -0,0 +1,62 @@
+# SketchIndex against plain pandas over the filtered rows: with room for every item the
+# heavy-hitter top-n is exact, with a small capacity every reported count stays within
+# its 'galat' bound, and the HyperLogLog distinct count stays within its error.
+import pandas as pd
+import pytest
+
+from data_loader import prepare_dataframe
+from reference import raw_sales, reference_rows
+from sketches import SketchIndex
+
+# Whole months only, partial months at both ends, and a range inside one month
+RANGES = [(None, None), (pd.Timestamp('2023-02-01'), pd.Timestamp('2023-03-01')), (pd.Timestamp('2023-01-10'), pd.Timestamp('2023-03-20')),
+          (pd.Timestamp('2023-02-03'), pd.Timestamp('2023-02-17'))]
+PATHS = [(), ('Jawa Barat',), ('Jawa Barat', 'Bandung')]
+
+
+@pytest.fixture(scope='module')
+def df():
+    return prepare_dataframe(raw_sales(6000, items=300, item_skew=1.1))
+
+
+def test_exact_with_enough_capacity(df):
+    index = SketchIndex(df, capacity=400)
+    for start, end in RANGES:
+        for path in PATHS:
+            rows = reference_rows(df, start, end, path)
+            expected = rows.groupby('nama_barang', observed=True)['jumlah'].sum().nlargest(5)
+            top = index.top_items(start, end, path)
+            assert list(top['nama_barang']) == list(expected.index.astype(str))
+            assert list(top['jumlah']) == pytest.approx(list(expected))
+            assert (top['galat'] == 0).all()
+            expected = rows.groupby('nama_toko', observed=True)['total_penghasilan'].sum().nlargest(5)
+            top = index.top_stores(start, end, path)
+            assert list(top['nama_toko']) == list(expected.index.astype(str))
+            assert list(top['total_penghasilan']) == pytest.approx(list(expected))
+
+
+def test_counts_within_error_bound(df):
+    index = SketchIndex(df, capacity=8)
+    bounded = False
+    for start, end in RANGES:
+        for path in PATHS:
+            rows = reference_rows(df, start, end, path)
+            exact = rows.groupby('nama_barang', observed=True)['jumlah'].sum()
+            exact.index = exact.index.astype(str)
+            top = index.top_items(start, end, path)
+            bounded |= bool((top['galat'] > 0).any())
+            # Counters only ever underestimate, by at most the reported galat
+            for item, estimate, galat in top.itertuples(index=False):
+                assert estimate - 1e-6 <= exact[item] <= estimate + galat + 1e-6
+            # With this skew the heaviest item leads the others by more than the bound, so it comes first
+            assert exact.idxmax() == top['nama_barang'].iloc[0]
+    assert bounded
+
+
+def test_distinct_items(df):
+    index = SketchIndex(df)
+    for start, end in RANGES:
+        for path in PATHS:
+            exact = reference_rows(df, start, end, path)['nama_barang'].nunique()
+            result = index.distinct_items(start, end, path)
+            assert abs(result['estimate'] - exact) <= 3 * result['relative_error'] * exact
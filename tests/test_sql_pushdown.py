@@ -0,0 +1,98 @@
+# SqlPushdown against an in-memory SQLite table holding the same rows as a prepared frame:
+# every pushed-down aggregate must match what AnalyticsEngine computes from the frame.
+import sqlite3
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from data_loader import date_bounds, prepare_dataframe
+from engine import AnalyticsEngine, DashboardQuery
+from periods import PERIOD_CODES
+from reference import raw_sales
+from rollup import REGION_LEVELS
+from sql_pushdown import SqlPushdown
+
+TABLE = 'penjualan'
+PERIOD_LABELS = {code: label for label, code in PERIOD_CODES.items()}
+RANGES = [(date(2023, 1, 1), date(2023, 3, 31)), (date(2023, 1, 20), date(2023, 1, 26)), (date(2023, 2, 3), date(2023, 2, 28))]
+PATHS = [(), ('Jawa Barat',), ('Jawa Barat', 'Bandung'), ('Jawa Barat', 'Bandung', 'Coblong'), ('Jawa Barat', 'Bandung', 'Coblong', 'Toko A')]
+
+
+@pytest.fixture(scope='module')
+def sources():
+    raw = raw_sales()
+    conn = sqlite3.connect(':memory:')
+    raw.to_sql(TABLE, conn, index=False)
+    yield conn, AnalyticsEngine(prepare_dataframe(raw.copy())), SqlPushdown(TABLE, 'sqlite')
+    conn.close()
+
+
+def queries():
+    for start_date, end_date in RANGES:
+        for path in PATHS:
+            yield DashboardQuery(start_date, end_date, path), date_bounds(start_date, end_date)
+
+
+def test_date_range(sources):
+    conn, engine, pushdown = sources
+    assert pushdown.fetch_date_range(conn) == engine.date_range()
+
+
+def test_options(sources):
+    conn, engine, pushdown = sources
+    for query, (start, end) in queries():
+        if len(query.path) < len(REGION_LEVELS):
+            assert pushdown.fetch_options(conn, query.path, start, end) == sorted(engine.options(query))
+
+
+def test_top_items_and_stores(sources):
+    conn, engine, pushdown = sources
+    for query, (start, end) in queries():
+        expected = engine.get('top_items', query)
+        result = pushdown.fetch_top_items(conn, start, end, query.path)
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+        if len(query.path) < len(REGION_LEVELS):
+            expected = engine.get('top_stores', query)
+            result = pushdown.fetch_top_stores(conn, start, end, query.path)
+            pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_revenue_by_period(sources):
+    conn, engine, pushdown = sources
+    for query, (start, end) in queries():
+        for code in ('D', 'W', 'M'):
+            expected = engine.get('revenue_by_period', query.with_period(PERIOD_LABELS[code]))
+            result = pushdown.fetch_revenue_by_period(conn, code, start, end, query.path)
+            pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_summary(sources):
+    conn, engine, pushdown = sources
+    for query, (start, end) in queries():
+        expected = engine.get('store_summary', query)
+        result = pushdown.fetch_summary(conn, start, end, query.path)
+        assert result['total_penghasilan'] == pytest.approx(expected['total_revenue'])
+        assert result['rata_rata_penghasilan'] == pytest.approx(expected['avg_revenue_per_transaction'])
+        assert result['jumlah_barang'] == expected['total_unique_items']
+
+
+def test_rows_since(sources):
+    conn, engine, pushdown = sources
+    watermark = pd.Timestamp('2023-03-01')
+    rows = prepare_dataframe(pushdown.fetch_rows_since(conn, watermark))
+    expected = engine.df[engine.df['tgl_transaksi'] >= watermark]
+    assert len(rows) == len(expected)
+    assert rows['jumlah'].sum() == pytest.approx(expected['jumlah'].sum())
+
+
+@pytest.mark.parametrize('arguments', [
+    {'table': 'penjualan; DROP TABLE penjualan'},
+    {'table': 'penjualan', 'revenue_column': 'jumlah * harga'},
+    {'table': 'penjualan', 'time_column': 'tgl transaksi'},
+    {'table': ''},
+    {'table': 'penjualan', 'dialect': 'oracle'},
+])
+def test_invalid_names_are_rejected(arguments):
+    with pytest.raises(ValueError):
+        SqlPushdown(**arguments)
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+TIME_COLUMN = 'tgl_transaksi'
+
+
+# Keep the dataset ordered by transaction time so date ranges become contiguous row ranges
+def sort_by_time(df):
+    if df[TIME_COLUMN].is_monotonic_increasing:
+        return df
+    return df.sort_values(TIME_COLUMN, kind='stable', ignore_index=True)
+
+
+def _times(df):
+    return df[TIME_COLUMN].to_numpy()
+
+
+# Binary search the [start, end) positions in an ascending datetime64 array (None = open end)
+def search_range(times, start, end):
+    lo, hi = 0, len(times)
+    if start is not None:
+        start = np.datetime64(pd.Timestamp(start), 'ns').astype(times.dtype)
+        lo = int(np.searchsorted(times, start, side='left'))
+    if end is not None:
+        end = np.datetime64(pd.Timestamp(end), 'ns').astype(times.dtype)
+        hi = int(np.searchsorted(times, end, side='left'))
+    return lo, max(lo, hi)
+
+
+def date_positions(df, start, end):
+    return search_range(_times(df), start, end)
+
+
+# Zero-copy positional slice of the rows between start (inclusive) and end (exclusive)
+def slice_by_date(df, start, end):
+    lo, hi = date_positions(df, start, end)
+    return df.iloc[lo:hi]
+
+
+# First and last transaction time, read from the ends of the sorted column (NaT sorts last)
+def time_range(df):
+    times = _times(df)
+    last = int(np.searchsorted(times, np.datetime64('NaT'), side='left'))
+    if last == 0:
+        return None, None
+    return pd.Timestamp(times[0]), pd.Timestamp(times[last - 1])
@@ -0,0 +1,154 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_loader import LRUCache
+from engine import AnalyticsEngine
+from region_index import get_region_index
+from rollup import REGION_LEVELS, get_cube
+from sketches import get_sketch_index
+
+# Jumlah kabupaten terbesar (per total penghasilan) yang ikut dihitung di muka
+LARGEST_DISTRICTS = 10
+# Granularitas grafik pendapatan toko yang dihitung di muka
+STORE_PERIOD = 'Bulanan'
+
+
+# Drill-down views to precompute, most likely first: the landing page, every
+# province, then the largest districts and the villages and stores inside them.
+# Entries are (graph node, region path, period label); a label of None means the
+# granularity the dashboard derives from the date range. Store pages also get their
+# monthly revenue and period comparison.
+# In approximate mode the exact cube is never built: districts are ranked by the
+# sketch index's exact per-cell revenue totals and the tree comes from the region index.
+def warmup_plan(df, district_limit=LARGEST_DISTRICTS, approximate=False):
+    if approximate:
+        regions = get_region_index(df, df.attrs.get('dataset_key'))
+        sketch = get_sketch_index(df)
+        revenue = sketch.store_totals.reshape(len(sketch.leaves), sketch.months).sum(axis=1) if sketch.months else np.zeros(len(sketch.leaves))
+        districts = pd.Series(revenue, index=pd.MultiIndex.from_frame(sketch.leaves)).nlargest(district_limit).index
+        provinces = regions.options()
+        villages = [district + (kelurahan,) for district in districts for kelurahan in regions.options(district)]
+        stores = [village + (toko,) for village in villages for toko in regions.options(village)]
+    else:
+        table = get_cube(df).stores[0]
+        provinces = table['propinsi'].unique()
+        districts = table.groupby(['propinsi', 'kabupaten'], observed=True)['total_penghasilan'].sum().nlargest(district_limit).index
+        villages = [path for path in table[REGION_LEVELS[:3]].drop_duplicates().itertuples(index=False, name=None) if path[:2] in districts]
+        stores = [path for path in table[REGION_LEVELS].drop_duplicates().itertuples(index=False, name=None) if path[:2] in districts]
+
+    plan = [('revenue_by_period', (), None), ('options', (), None)]
+    for path in [(propinsi,) for propinsi in provinces] + list(districts) + villages:
+        plan += [('options', path, None), ('top_items', path, None), ('top_stores', path, None)]
+    for path in stores:
+        plan += [('store_summary', path, None), ('top_items', path, None),
+                 ('revenue_by_period', path, STORE_PERIOD), ('period_comparison', path, None)]
+    return plan
+
+
+# One background warm-up run for a dataset. Results go through an analytics engine
+# into the shared result cache, where the UI's graph finds them on its first click.
+# The frame is released as soon as the run ends; `sessions` are the sessions waiting on it.
+class WarmupJob:
+    def __init__(self, df, shared_cache, approximate=False):
+        self.df = df
+        self.shared_cache = shared_cache
+        self.approximate = approximate
+        self.key = (df.attrs.get('dataset_key'), approximate)
+        self.sessions = set()
+        self.total = 0
+        self.done = 0
+        self.error = None
+        self._cancelled = threading.Event()
+        self.future = None
+
+    def run(self):
+        try:
+            engine = AnalyticsEngine(self.df, shared_cache=self.shared_cache)
+            query = engine.default_query(self.approximate)
+            plan = warmup_plan(self.df, approximate=self.approximate)
+            self.total = len(plan)
+            for name, path, period_label in plan:
+                if self._cancelled.is_set():
+                    return
+                view = query.at(tuple(str(value) for value in path))
+                engine.get(name, view.with_period(period_label) if period_label else view)
+                self.done += 1
+        except Exception as e:
+            self.error = e
+        finally:
+            self.df = None
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def finished(self):
+        return self.future is not None and self.future.done()
+
+    def progress(self):
+        return self.done / self.total if self.total else 0.0
+
+
+# Runs warm-up jobs on a small thread pool outside the Streamlit script thread.
+# One job per dataset and mode (exact or approximate): sessions opening a dataset that
+# is already warming share its job,
+# and it is only cancelled once every one of them has released it. Finished jobs leave
+# the running table; a small LRU remembers them (without their frame) so a rerun
+# doesn't warm the same dataset again.
+class Warmer:
+    def __init__(self, workers=2, finished_entries=32):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="warmup")
+        self._jobs = {}
+        self._finished = LRUCache(max_entries=finished_entries)
+        self._lock = threading.Lock()
+
+    def start(self, df, shared_cache, session, approximate=False):
+        dataset_key = df.attrs.get('dataset_key')
+        if dataset_key is None:
+            return None
+        key = (dataset_key, approximate)
+        created = False
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None:
+                finished = self._finished.get(key)
+                if finished is not None:
+                    return finished
+                job = self._jobs[key] = WarmupJob(df, shared_cache, approximate)
+                job.future = self._executor.submit(job.run)
+                created = True
+            job.sessions.add(session)
+        # Outside the lock: the callback runs right away if the job has already finished
+        if created:
+            job.future.add_done_callback(lambda _: self._finish(key, job))
+        return job
+
+    def _finish(self, key, job):
+        with self._lock:
+            if self._jobs.get(key) is job:
+                del self._jobs[key]
+        # Failed or cancelled runs are not remembered, so the next start retries them
+        if job.error is None and not job.cancelled:
+            self._finished.put(key, job)
+
+    # The session no longer shows the dataset; the job is cancelled when no session is left
+    def release(self, key, session):
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None:
+                return
+            job.sessions.discard(session)
+            if job.sessions:
+                return
+            del self._jobs[key]
+        job.cancel()
+
+
+warmer = Warmer()